@@ -0,0 +1,67 @@
+# backend/alembic/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.config import settings
+from app.database import Base, create_database_engine
+from app.models import product, inventory, sale  # Registrar todos los modelos en Base.metadata
+from app.services.product_search import SEARCH_TABLE
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get('configure_logger', True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _include_name(name, type_, parent_names) -> bool:
+    # El índice de búsqueda (y las tablas internas de FTS5) lo manejan sus migraciones, no los modelos
+    if type_ == "table":
+        return not name.startswith(SEARCH_TABLE)
+    return True
+
+
+def _configure(**options) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        # SQLite no soporta ALTER de columnas: batch recrea la tabla
+        render_as_batch=True,
+        compare_type=True,
+        include_name=_include_name,
+        **options
+    )
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL de las migraciones sin conectarse (alembic upgrade head --sql)"""
+    _configure(url=settings.database_url, literal_binds=True, dialect_opts={"paramstyle": "named"})
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplica las migraciones; usa la conexión recibida de app.migrations si la hay"""
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_database_engine(settings.database_url)
+    try:
+        with engine.connect() as connection:
+            _configure(connection=connection)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
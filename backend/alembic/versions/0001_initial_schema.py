@@ -0,0 +1,401 @@
+"""Esquema inicial: tablas e índices de app/models
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 03:34:39.513326
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('locations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('section', sa.String(length=50), nullable=True),
+    sa.Column('shelf_code', sa.String(length=20), nullable=True),
+    sa.Column('is_visible_to_customer', sa.Boolean(), nullable=True),
+    sa.Column('description', sa.String(length=200), nullable=True),
+    sa.Column('led_address', sa.String(length=20), nullable=True),
+    sa.Column('led_enabled', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('max_capacity', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('locations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_locations_id'), ['id'], unique=False)
+
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('category_code', sa.String(length=10), nullable=False),
+    sa.Column('internal_number', sa.String(length=10), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('brand', sa.String(length=100), nullable=True),
+    sa.Column('material', sa.String(length=100), nullable=True),
+    sa.Column('gender', sa.String(length=20), nullable=True),
+    sa.Column('season', sa.String(length=20), nullable=True),
+    sa.Column('base_price', sa.Float(), nullable=False),
+    sa.Column('wholesale_price', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('requires_size', sa.Boolean(), nullable=True),
+    sa.Column('requires_color', sa.Boolean(), nullable=True),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('supplier_info', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('idx_category_active', ['category', 'is_active'], unique=False)
+        batch_op.create_index('idx_category_number', ['category_code', 'internal_number'], unique=False)
+        batch_op.create_index('idx_name_search', ['name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_products_id'), ['id'], unique=False)
+
+    op.create_table('sales',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sale_number', sa.String(length=20), nullable=False),
+    sa.Column('customer_name', sa.String(length=100), nullable=True),
+    sa.Column('customer_phone', sa.String(length=20), nullable=True),
+    sa.Column('customer_email', sa.String(length=100), nullable=True),
+    sa.Column('customer_document', sa.String(length=20), nullable=True),
+    sa.Column('subtotal', sa.Float(), nullable=False),
+    sa.Column('discount_amount', sa.Float(), nullable=False),
+    sa.Column('discount_percentage', sa.Float(), nullable=False),
+    sa.Column('tax_amount', sa.Float(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('payment_status', sa.String(length=20), nullable=True),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('payment_details', sa.JSON(), nullable=True),
+    sa.Column('notes', sa.String(length=500), nullable=True),
+    sa.Column('cashier_id', sa.String(length=50), nullable=True),
+    sa.Column('pos_terminal', sa.String(length=20), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('cancelled_at', sa.DateTime(), nullable=True),
+    sa.Column('refunded_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sale_number')
+    )
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.create_index('idx_cashier_date', ['cashier_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_customer_phone', ['customer_phone'], unique=False)
+        batch_op.create_index('idx_sale_date_status', ['created_at', 'status'], unique=False)
+        batch_op.create_index('idx_sale_number', ['sale_number'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sales_id'), ['id'], unique=False)
+
+    op.create_table('payments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('reference', sa.String(length=50), nullable=True),
+    sa.Column('card_type', sa.String(length=20), nullable=True),
+    sa.Column('card_last_digits', sa.String(length=4), nullable=True),
+    sa.Column('authorization_code', sa.String(length=20), nullable=True),
+    sa.Column('bank_name', sa.String(length=50), nullable=True),
+    sa.Column('account_reference', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('idx_payment_method_date', ['payment_method', 'created_at'], unique=False)
+        batch_op.create_index('idx_payment_sale', ['sale_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_payments_id'), ['id'], unique=False)
+
+    op.create_table('product_variants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('sku', sa.String(length=50), nullable=False),
+    sa.Column('barcode', sa.String(length=20), nullable=True),
+    sa.Column('short_code', sa.String(length=20), nullable=True),
+    sa.Column('size', sa.String(length=10), nullable=False),
+    sa.Column('size_order', sa.Integer(), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=False),
+    sa.Column('color_code', sa.String(length=10), nullable=False),
+    sa.Column('color_hex', sa.String(length=7), nullable=True),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.Column('wholesale_price', sa.Float(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=True),
+    sa.Column('dimensions', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_featured', sa.Boolean(), nullable=True),
+    sa.Column('discontinued', sa.Boolean(), nullable=True),
+    sa.Column('allow_backorder', sa.Boolean(), nullable=True),
+    sa.Column('min_sale_quantity', sa.Integer(), nullable=True),
+    sa.Column('max_sale_quantity', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sku')
+    )
+    with op.batch_alter_table('product_variants', schema=None) as batch_op:
+        batch_op.create_index('idx_active_featured', ['is_active', 'is_featured'], unique=False)
+        batch_op.create_index('idx_barcode_active', ['barcode', 'is_active'], unique=False)
+        batch_op.create_index('idx_product_size_color', ['product_id', 'size', 'color'], unique=False)
+        batch_op.create_index('idx_shortcode_active', ['short_code', 'is_active'], unique=False)
+        batch_op.create_index('idx_sku_search', ['sku'], unique=False)
+        batch_op.create_index(batch_op.f('ix_product_variants_barcode'), ['barcode'], unique=True)
+        batch_op.create_index(batch_op.f('ix_product_variants_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_product_variants_short_code'), ['short_code'], unique=True)
+
+    op.create_table('refunds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('refund_number', sa.String(length=20), nullable=False),
+    sa.Column('reason', sa.String(length=200), nullable=False),
+    sa.Column('refund_amount', sa.Float(), nullable=False),
+    sa.Column('refund_method', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('processed_by', sa.String(length=50), nullable=True),
+    sa.Column('notes', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('refund_number')
+    )
+    with op.batch_alter_table('refunds', schema=None) as batch_op:
+        batch_op.create_index('idx_refund_date', ['created_at'], unique=False)
+        batch_op.create_index('idx_refund_sale', ['sale_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_refunds_id'), ['id'], unique=False)
+
+    op.create_table('inventory',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('variant_id', sa.Integer(), nullable=False),
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('reserved_quantity', sa.Integer(), nullable=True),
+    sa.Column('min_stock', sa.Integer(), nullable=True),
+    sa.Column('max_stock', sa.Integer(), nullable=True),
+    sa.Column('cost_per_unit', sa.Float(), nullable=True),
+    sa.Column('last_purchase_price', sa.Float(), nullable=True),
+    sa.Column('last_purchase_date', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('needs_recount', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+    sa.ForeignKeyConstraint(['variant_id'], ['product_variants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.create_index('idx_location_quantity', ['location_id', 'quantity'], unique=False)
+        batch_op.create_index('idx_variant_active', ['variant_id', 'is_active'], unique=False)
+        batch_op.create_index('idx_variant_location', ['variant_id', 'location_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_inventory_id'), ['id'], unique=False)
+
+    op.create_table('product_images',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('variant_id', sa.Integer(), nullable=True),
+    sa.Column('filename', sa.String(length=200), nullable=False),
+    sa.Column('original_filename', sa.String(length=200), nullable=True),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('file_size', sa.Integer(), nullable=True),
+    sa.Column('image_type', sa.String(length=20), nullable=True),
+    sa.Column('display_order', sa.Integer(), nullable=True),
+    sa.Column('is_primary', sa.Boolean(), nullable=True),
+    sa.Column('alt_text', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['variant_id'], ['product_variants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('product_images', schema=None) as batch_op:
+        batch_op.create_index('idx_product_images', ['product_id', 'display_order'], unique=False)
+        batch_op.create_index('idx_variant_images', ['variant_id', 'is_primary'], unique=False)
+        batch_op.create_index(batch_op.f('ix_product_images_id'), ['id'], unique=False)
+
+    op.create_table('sale_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('variant_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('unit_price', sa.Float(), nullable=False),
+    sa.Column('unit_cost', sa.Float(), nullable=False),
+    sa.Column('discount_amount', sa.Float(), nullable=True),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.Column('product_name', sa.String(length=200), nullable=False),
+    sa.Column('product_sku', sa.String(length=50), nullable=False),
+    sa.Column('product_size', sa.String(length=10), nullable=False),
+    sa.Column('product_color', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales.id'], ),
+    sa.ForeignKeyConstraint(['variant_id'], ['product_variants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sale_items', schema=None) as batch_op:
+        batch_op.create_index('idx_sale_items', ['sale_id'], unique=False)
+        batch_op.create_index('idx_variant_sales', ['variant_id', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sale_items_id'), ['id'], unique=False)
+
+    op.create_table('inventory_movements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('inventory_id', sa.Integer(), nullable=False),
+    sa.Column('movement_type', sa.String(length=20), nullable=False),
+    sa.Column('quantity_change', sa.Integer(), nullable=False),
+    sa.Column('reference_id', sa.Integer(), nullable=True),
+    sa.Column('reference_type', sa.String(length=20), nullable=True),
+    sa.Column('reason', sa.String(length=200), nullable=True),
+    sa.Column('notes', sa.String(length=500), nullable=True),
+    sa.Column('user_id', sa.String(length=50), nullable=True),
+    sa.Column('unit_cost', sa.Float(), nullable=True),
+    sa.Column('total_cost', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['inventory_id'], ['inventory.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('inventory_movements', schema=None) as batch_op:
+        batch_op.create_index('idx_inventory_movement', ['inventory_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_movement_type_date', ['movement_type', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_inventory_movements_id'), ['id'], unique=False)
+
+    op.create_table('refund_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('refund_id', sa.Integer(), nullable=False),
+    sa.Column('sale_item_id', sa.Integer(), nullable=False),
+    sa.Column('quantity_refunded', sa.Integer(), nullable=False),
+    sa.Column('unit_refund_amount', sa.Float(), nullable=False),
+    sa.Column('total_refund_amount', sa.Float(), nullable=False),
+    sa.Column('condition', sa.String(length=20), nullable=True),
+    sa.Column('return_to_inventory', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['refund_id'], ['refunds.id'], ),
+    sa.ForeignKeyConstraint(['sale_item_id'], ['sale_items.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('refund_items', schema=None) as batch_op:
+        batch_op.create_index('idx_refund_items', ['refund_id'], unique=False)
+        batch_op.create_index('idx_sale_item_refund', ['sale_item_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_refund_items_id'), ['id'], unique=False)
+
+    op.create_table('reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('inventory_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('customer_name', sa.String(length=100), nullable=True),
+    sa.Column('customer_phone', sa.String(length=20), nullable=True),
+    sa.Column('customer_email', sa.String(length=100), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('cancelled_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('notes', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['inventory_id'], ['inventory.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.create_index('idx_inventory_reservation', ['inventory_id', 'status'], unique=False)
+        batch_op.create_index('idx_reservation_status_expires', ['status', 'expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_reservations_id'), ['id'], unique=False)
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reservations_id'))
+        batch_op.drop_index('idx_reservation_status_expires')
+        batch_op.drop_index('idx_inventory_reservation')
+
+    op.drop_table('reservations')
+    with op.batch_alter_table('refund_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_refund_items_id'))
+        batch_op.drop_index('idx_sale_item_refund')
+        batch_op.drop_index('idx_refund_items')
+
+    op.drop_table('refund_items')
+    with op.batch_alter_table('inventory_movements', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_movements_id'))
+        batch_op.drop_index('idx_movement_type_date')
+        batch_op.drop_index('idx_inventory_movement')
+
+    op.drop_table('inventory_movements')
+    with op.batch_alter_table('sale_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sale_items_id'))
+        batch_op.drop_index('idx_variant_sales')
+        batch_op.drop_index('idx_sale_items')
+
+    op.drop_table('sale_items')
+    with op.batch_alter_table('product_images', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_images_id'))
+        batch_op.drop_index('idx_variant_images')
+        batch_op.drop_index('idx_product_images')
+
+    op.drop_table('product_images')
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_id'))
+        batch_op.drop_index('idx_variant_location')
+        batch_op.drop_index('idx_variant_active')
+        batch_op.drop_index('idx_location_quantity')
+
+    op.drop_table('inventory')
+    with op.batch_alter_table('refunds', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_refunds_id'))
+        batch_op.drop_index('idx_refund_sale')
+        batch_op.drop_index('idx_refund_date')
+
+    op.drop_table('refunds')
+    with op.batch_alter_table('product_variants', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_variants_short_code'))
+        batch_op.drop_index(batch_op.f('ix_product_variants_id'))
+        batch_op.drop_index(batch_op.f('ix_product_variants_barcode'))
+        batch_op.drop_index('idx_sku_search')
+        batch_op.drop_index('idx_shortcode_active')
+        batch_op.drop_index('idx_product_size_color')
+        batch_op.drop_index('idx_barcode_active')
+        batch_op.drop_index('idx_active_featured')
+
+    op.drop_table('product_variants')
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payments_id'))
+        batch_op.drop_index('idx_payment_sale')
+        batch_op.drop_index('idx_payment_method_date')
+
+    op.drop_table('payments')
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sales_id'))
+        batch_op.drop_index('idx_sale_number')
+        batch_op.drop_index('idx_sale_date_status')
+        batch_op.drop_index('idx_customer_phone')
+        batch_op.drop_index('idx_cashier_date')
+
+    op.drop_table('sales')
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_products_id'))
+        batch_op.drop_index('idx_name_search')
+        batch_op.drop_index('idx_category_number')
+        batch_op.drop_index('idx_category_active')
+
+    op.drop_table('products')
+    with op.batch_alter_table('locations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_locations_id'))
+
+    op.drop_table('locations')
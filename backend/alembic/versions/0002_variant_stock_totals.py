@@ -0,0 +1,53 @@
+"""Totales de stock por variante (variant_stock), calculados desde el inventario existente
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 03:37:21.188949
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    variant_stock = op.create_table('variant_stock',
+    sa.Column('variant_id', sa.Integer(), nullable=False),
+    sa.Column('on_hand', sa.Integer(), nullable=False),
+    sa.Column('reserved', sa.Integer(), nullable=False),
+    sa.Column('available', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['variant_id'], ['product_variants.id'], ),
+    sa.PrimaryKeyConstraint('variant_id')
+    )
+
+    # Backfill: mismas sumas que InventoryManager._stock_totals
+    inventory = sa.table('inventory',
+        sa.column('variant_id', sa.Integer),
+        sa.column('quantity', sa.Integer),
+        sa.column('reserved_quantity', sa.Integer),
+        sa.column('is_active', sa.Boolean)
+    )
+    on_hand = sa.func.coalesce(sa.func.sum(inventory.c.quantity), 0)
+    reserved = sa.func.coalesce(sa.func.sum(inventory.c.reserved_quantity), 0)
+    totals = sa.select(
+        inventory.c.variant_id, on_hand, reserved, on_hand - reserved,
+        sa.func.current_timestamp(), sa.func.current_timestamp()
+    ).where(inventory.c.is_active == sa.true()).group_by(inventory.c.variant_id)
+
+    op.execute(variant_stock.insert().from_select(
+        ['variant_id', 'on_hand', 'reserved', 'available', 'created_at', 'updated_at'], totals
+    ))
+
+
+def downgrade() -> None:
+    op.drop_table('variant_stock')
@@ -0,0 +1,52 @@
+"""Ganancia y cantidad de artículos guardadas en sales, calculadas para las ventas existentes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 03:39:27.307465
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profit', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('total_items', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill con la misma regla que SalesManager: items vendidos menos devoluciones, 0 si se canceló
+    op.execute("""
+        UPDATE sales SET
+            total_items = COALESCE((
+                SELECT SUM(si.quantity) FROM sale_items si WHERE si.sale_id = sales.id
+            ), 0) - COALESCE((
+                SELECT SUM(ri.quantity_refunded)
+                FROM refund_items ri JOIN sale_items si ON si.id = ri.sale_item_id
+                WHERE si.sale_id = sales.id
+            ), 0),
+            profit = COALESCE((
+                SELECT SUM((si.unit_price - si.unit_cost) * si.quantity - COALESCE(si.discount_amount, 0))
+                FROM sale_items si WHERE si.sale_id = sales.id
+            ), 0) - COALESCE((
+                SELECT SUM((ri.unit_refund_amount - si.unit_cost) * ri.quantity_refunded)
+                FROM refund_items ri JOIN sale_items si ON si.id = ri.sale_item_id
+                WHERE si.sale_id = sales.id
+            ), 0)
+        WHERE status IS NULL OR status <> 'cancelled'
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_column('total_items')
+        batch_op.drop_column('profit')
+
@@ -0,0 +1,88 @@
+"""Rollups de ventas por hora y por día (sales_rollup_hourly, sales_rollup_daily), calculados desde sales
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 03:44:27.069212
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    daily = op.create_table('sales_rollup_daily',
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('cashier_id', sa.String(length=50), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('profit', sa.Float(), nullable=False),
+    sa.Column('items', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'payment_method', 'cashier_id')
+    )
+    hourly = op.create_table('sales_rollup_hourly',
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('cashier_id', sa.String(length=50), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('profit', sa.Float(), nullable=False),
+    sa.Column('items', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'payment_method', 'cashier_id')
+    )
+
+    # Backfill: mismos grupos que SalesManager.rebuild_sales_rollups
+    sales = sa.table('sales',
+        sa.column('created_at', sa.DateTime),
+        sa.column('payment_method', sa.String),
+        sa.column('cashier_id', sa.String),
+        sa.column('total_amount', sa.Float),
+        sa.column('profit', sa.Float),
+        sa.column('total_items', sa.Integer),
+        sa.column('status', sa.String)
+    )
+    completed = sa.select(
+        sales.c.created_at, sales.c.payment_method, sales.c.cashier_id,
+        sales.c.total_amount, sales.c.profit, sales.c.total_items
+    ).where(sales.c.status == 'completed')
+
+    buckets = {hourly: {}, daily: {}}
+    for created_at, payment_method, cashier_id, total_amount, profit, items in op.get_bind().execute(completed):
+        hour = created_at.replace(minute=0, second=0, microsecond=0)
+        for table, bucket in ((hourly, hour), (daily, created_at.date())):
+            totals = buckets[table].setdefault((bucket, payment_method, cashier_id or ''), [0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += total_amount
+            totals[2] += profit
+            totals[3] += items
+
+    now = datetime.now()
+    for table, rows in buckets.items():
+        if rows:
+            op.bulk_insert(table, [
+                {
+                    'bucket': bucket, 'payment_method': payment_method, 'cashier_id': cashier_id,
+                    'sales_count': count, 'revenue': revenue, 'profit': profit, 'items': items,
+                    'created_at': now, 'updated_at': now
+                }
+                for (bucket, payment_method, cashier_id), (count, revenue, profit, items) in rows.items()
+            ])
+
+
+def downgrade() -> None:
+    op.drop_table('sales_rollup_hourly')
+    op.drop_table('sales_rollup_daily')
@@ -0,0 +1,40 @@
+"""Índices (created_at, id) y (location_id, id) para la paginación por cursor
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 03:47:45.965104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.create_index('idx_inventory_location_id', ['location_id', 'id'], unique=False)
+
+    with op.batch_alter_table('inventory_movements', schema=None) as batch_op:
+        batch_op.create_index('idx_movement_created_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.create_index('idx_sale_created_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_index('idx_sale_created_id')
+
+    with op.batch_alter_table('inventory_movements', schema=None) as batch_op:
+        batch_op.drop_index('idx_movement_created_id')
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('idx_inventory_location_id')
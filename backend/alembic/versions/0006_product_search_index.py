@@ -0,0 +1,123 @@
+"""Índice de texto completo de las variantes (product_search) y sus triggers
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 09:12:40.318227
+
+SQLite: tabla virtual FTS5. PostgreSQL: tabla con tsvector e índice GIN (requiere la extensión
+unaccent). En ambos casos los triggers la actualizan en cada escritura de products y
+product_variants; la tabla queda fuera de los modelos (alembic/env.py la ignora).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Columnas del documento de una variante: nombre, códigos, marca y atributos
+SQLITE_DOCUMENT = """
+    SELECT v.id, p.name,
+           coalesce(v.sku, '') || ' ' || coalesce(v.short_code, '') || ' ' || coalesce(v.barcode, ''),
+           coalesce(p.brand, ''),
+           v.color || ' ' || v.size || ' ' || p.category
+    FROM product_variants v JOIN products p ON p.id = v.product_id
+"""
+
+SQLITE_UPGRADE = [
+    """CREATE VIRTUAL TABLE product_search USING fts5(
+        name, codes, brand, attributes,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    f"INSERT INTO product_search (rowid, name, codes, brand, attributes) {SQLITE_DOCUMENT}",
+    f"""CREATE TRIGGER product_search_variant_insert AFTER INSERT ON product_variants BEGIN
+        INSERT INTO product_search (rowid, name, codes, brand, attributes) {SQLITE_DOCUMENT} WHERE v.id = new.id;
+    END""",
+    f"""CREATE TRIGGER product_search_variant_update
+    AFTER UPDATE OF sku, short_code, barcode, color, size, product_id ON product_variants BEGIN
+        DELETE FROM product_search WHERE rowid = old.id;
+        INSERT INTO product_search (rowid, name, codes, brand, attributes) {SQLITE_DOCUMENT} WHERE v.id = new.id;
+    END""",
+    """CREATE TRIGGER product_search_variant_delete AFTER DELETE ON product_variants BEGIN
+        DELETE FROM product_search WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER product_search_product_update AFTER UPDATE OF name, brand, category ON products BEGIN
+        DELETE FROM product_search WHERE rowid IN (SELECT id FROM product_variants WHERE product_id = new.id);
+        INSERT INTO product_search (rowid, name, codes, brand, attributes) {SQLITE_DOCUMENT} WHERE p.id = new.id;
+    END""",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS product_search_product_update",
+    "DROP TRIGGER IF EXISTS product_search_variant_delete",
+    "DROP TRIGGER IF EXISTS product_search_variant_update",
+    "DROP TRIGGER IF EXISTS product_search_variant_insert",
+    "DROP TABLE IF EXISTS product_search",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """CREATE TABLE product_search (
+        variant_id integer PRIMARY KEY REFERENCES product_variants (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )""",
+    "CREATE INDEX idx_product_search_document ON product_search USING gin (document)",
+    # Nombre y códigos pesan más (A) que la marca (B) y los atributos (C)
+    """CREATE FUNCTION product_search_refresh(variant_ids integer[]) RETURNS void AS $$
+        INSERT INTO product_search (variant_id, document)
+        SELECT v.id,
+               setweight(to_tsvector('simple', unaccent(coalesce(p.name, ''))), 'A') ||
+               setweight(to_tsvector('simple', concat_ws(' ', v.sku, v.short_code, v.barcode)), 'A') ||
+               setweight(to_tsvector('simple', unaccent(coalesce(p.brand, ''))), 'B') ||
+               setweight(to_tsvector('simple', unaccent(concat_ws(' ', v.color, v.size, p.category))), 'C')
+        FROM product_variants v JOIN products p ON p.id = v.product_id
+        WHERE v.id = ANY(variant_ids)
+        ON CONFLICT (variant_id) DO UPDATE SET document = excluded.document
+    $$ LANGUAGE sql""",
+    """CREATE FUNCTION product_search_variant_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM product_search_refresh(ARRAY[NEW.id]);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE FUNCTION product_search_product_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM product_search_refresh(ARRAY(SELECT id FROM product_variants WHERE product_id = NEW.id));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER product_search_variant
+    AFTER INSERT OR UPDATE OF sku, short_code, barcode, color, size, product_id ON product_variants
+    FOR EACH ROW EXECUTE FUNCTION product_search_variant_trigger()""",
+    """CREATE TRIGGER product_search_product
+    AFTER UPDATE OF name, brand, category ON products
+    FOR EACH ROW EXECUTE FUNCTION product_search_product_trigger()""",
+    "SELECT product_search_refresh(ARRAY(SELECT id FROM product_variants))",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS product_search_product ON products",
+    "DROP TRIGGER IF EXISTS product_search_variant ON product_variants",
+    "DROP FUNCTION IF EXISTS product_search_product_trigger()",
+    "DROP FUNCTION IF EXISTS product_search_variant_trigger()",
+    "DROP FUNCTION IF EXISTS product_search_refresh(integer[])",
+    "DROP TABLE IF EXISTS product_search",
+]
+
+
+def upgrade() -> None:
+    statements = POSTGRES_UPGRADE if op.get_context().dialect.name == 'postgresql' else SQLITE_UPGRADE
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    statements = POSTGRES_DOWNGRADE if op.get_context().dialect.name == 'postgresql' else SQLITE_DOWNGRADE
+    for statement in statements:
+        op.execute(statement)
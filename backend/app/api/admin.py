@@ -0,0 +1,71 @@
+# backend/app/api/admin.py
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..services.cache_service import CacheService, get_cache
+from ..services.cache_metrics import format_prometheus
+from ..services.inventory_manager import InventoryManager
+from ..services.product_search import rebuild_product_search
+from ..services.sales_manager import SalesManager
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/cache/stats")
+async def get_cache_stats(cache: CacheService = Depends(get_cache)):
+    """Aciertos, fallos, escrituras, invalidaciones, ocupación y latencias del caché por namespace"""
+    return {
+        'backend': cache.health_check(),
+        **cache.metrics_snapshot()
+    }
+
+@router.delete("/cache/stats")
+async def reset_cache_stats(cache: CacheService = Depends(get_cache)):
+    """Reinicia los contadores (por ejemplo, antes de probar un nuevo TTL)"""
+    cache.metrics.reset()
+    return {"message": "Cache statistics reset"}
+
+@router.get("/cache/metrics", response_class=PlainTextResponse)
+async def get_cache_metrics(cache: CacheService = Depends(get_cache)):
+    """Métricas del caché en formato de texto de Prometheus"""
+    return PlainTextResponse(
+        format_prometheus(cache.metrics_snapshot()),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@router.post("/stock/reconcile")
+def reconcile_variant_stock(
+    fix: bool = True,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
+):
+    """Verifica los totales de variant_stock contra el inventario por ubicación (y los corrige)"""
+    try:
+        return InventoryManager(db, cache).reconcile_variant_stock(fix=fix)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Stock reconciliation error: {str(e)}")
+
+@router.post("/sales/rollups/rebuild")
+def rebuild_sales_rollups(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
+):
+    """Recalcula sales_rollup_hourly y sales_rollup_daily desde las ventas (días completos del rango)"""
+    try:
+        return SalesManager(db, cache).rebuild_sales_rollups(start_date, end_date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sales rollup rebuild error: {str(e)}")
+
+@router.post("/search/rebuild")
+def rebuild_search_index(db: Session = Depends(get_db), cache: CacheService = Depends(get_cache)):
+    """Regenera el índice de texto completo de productos (los triggers lo mantienen al día)"""
+    try:
+        result = rebuild_product_search(db)
+        cache.invalidate_tag("search")
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search index rebuild error: {str(e)}")
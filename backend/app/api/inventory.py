@@ -1,9 +1,9 @@
 # backend/app/api/inventory.py
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..schemas.inventory import (
     LocationCreate, LocationUpdate, LocationResponse,
     InventoryCreate, InventoryUpdate, InventoryResponse,
@@ -16,9 +16,11 @@ from ..schemas.inventory import (
     LEDControlRequest, LEDControlResponse
 )
 from ..services.inventory_manager import InventoryManager
-from ..services.cache_service import CacheService
+from ..services.cache_service import CacheService, get_cache
 from ..models.inventory import Location, Inventory, InventoryMovement, Reservation
 from ..models.product import ProductVariant, Product
+from ..models.profiles import inventory_with_variant_product_location
+from ..utils.pagination import keyset_page, InvalidCursorError
 from sqlalchemy import and_, or_, func
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
@@ -26,7 +28,7 @@ router = APIRouter(prefix="/inventory", tags=["inventory"])
 # === UBICACIONES ===
 
 @router.post("/locations", response_model=LocationResponse)
-async def create_location(location: LocationCreate, db: Session = Depends(get_db)):
+def create_location(location: LocationCreate, db: Session = Depends(get_db)):
     """Crear nueva ubicación"""
     try:
         # Verificar que no exista una ubicación con el mismo nombre
@@ -46,7 +48,7 @@ async def create_location(location: LocationCreate, db: Session = Depends(get_db
         raise HTTPException(status_code=500, detail=f"Location creation error: {str(e)}")
 
 @router.get("/locations", response_model=List[LocationResponse])
-async def get_locations(
+def get_locations(
     location_type: Optional[str] = None,
     section: Optional[str] = None,
     is_active: bool = True,
@@ -80,7 +82,7 @@ async def get_locations(
     return locations
 
 @router.get("/locations/{location_id}", response_model=LocationResponse)
-async def get_location(location_id: int, db: Session = Depends(get_db)):
+def get_location(location_id: int, db: Session = Depends(get_db)):
     """Obtener ubicación específica"""
     location = db.query(Location).get(location_id)
     if not location:
@@ -99,7 +101,7 @@ async def get_location(location_id: int, db: Session = Depends(get_db)):
     return location
 
 @router.put("/locations/{location_id}", response_model=LocationResponse)
-async def update_location(
+def update_location(
     location_id: int, 
     location_update: LocationUpdate, 
     db: Session = Depends(get_db)
@@ -126,7 +128,7 @@ async def update_location(
 # === INVENTARIO ===
 
 @router.get("/search", response_model=InventorySearchResponse)
-async def search_inventory(
+def search_inventory(
     location_id: Optional[int] = None,
     location_type: Optional[str] = None,
     section: Optional[str] = None,
@@ -140,9 +142,16 @@ async def search_inventory(
     is_active: bool = True,
     limit: int = Query(50, le=200),
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: Session = Depends(get_read_db),
+    cache: CacheService = Depends(get_cache)
 ):
-    """Búsqueda avanzada de inventario"""
+    """Búsqueda avanzada de inventario (por ubicación)
+    
+    Para paginar se envía el next_cursor de la respuesta anterior en `cursor` (offset se mantiene
+    por compatibilidad). Con include_total=false no se cuenta el total.
+    """
     try:
         query = db.query(Inventory).join(ProductVariant).join(Product).join(Location)
         
@@ -184,11 +193,28 @@ async def search_inventory(
                 Location.is_active == True
             )
         
-        # Contar total
-        total_count = query.count()
+        filters = InventorySearchFilters(
+            location_id=location_id,
+            location_type=location_type,
+            section=section,
+            variant_id=variant_id,
+            product_name=product_name,
+            sku=sku,
+            low_stock_only=low_stock_only,
+            out_of_stock_only=out_of_stock_only,
+            overstocked_only=overstocked_only,
+            needs_recount=needs_recount,
+            is_active=is_active
+        )
+        
+        # Contar total (una vez por filtros, no en cada página)
+        total_count = cache.get_or_count("inventory", filters.dict(), query.count, ["inventory"]) if include_total else None
         
         # Obtener resultados paginados
-        inventory_items = query.offset(offset).limit(limit).all()
+        inventory_items, next_cursor = keyset_page(
+            query.options(*inventory_with_variant_product_location(joined=True)),
+            (Inventory.location_id, Inventory.id), cursor, limit, offset=offset
+        )
         
         # Formatear resultados
         results = []
@@ -225,43 +251,35 @@ async def search_inventory(
         return InventorySearchResponse(
             total_results=total_count,
             results=results,
-            filters_applied=InventorySearchFilters(
-                location_id=location_id,
-                location_type=location_type,
-                section=section,
-                variant_id=variant_id,
-                product_name=product_name,
-                sku=sku,
-                low_stock_only=low_stock_only,
-                out_of_stock_only=out_of_stock_only,
-                overstocked_only=overstocked_only,
-                needs_recount=needs_recount,
-                is_active=is_active
-            ),
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None,
+            filters_applied=filters,
             summary=summary
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Inventory search error: {str(e)}")
 
 @router.get("/alerts", response_model=StockAlertsResponse)
-async def get_stock_alerts(
+def get_stock_alerts(
     location_id: Optional[int] = None,
     severity: Optional[str] = Query(None, pattern=r'^(low|medium|high|critical)$'),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
 ):
     """Obtener alertas de stock"""
     try:
-        cache = CacheService()
         cache_key = f"stock_alerts:{location_id or 'all'}:{severity or 'all'}"
         
-        # Verificar caché
-        cached_alerts = cache.get(cache_key)
-        if cached_alerts:
-            return StockAlertsResponse(**json.loads(cached_alerts))
+        # Verificar caché: el JSON guardado se responde tal cual
+        cached_alerts = cache.get_json(cache_key)
+        if cached_alerts is not None:
+            return Response(content=cached_alerts, media_type="application/json")
         
         # Obtener alertas del servicio
-        inventory_manager = InventoryManager(db)
+        inventory_manager = InventoryManager(db, cache)
         alerts_data = inventory_manager.get_low_stock_alerts(location_id)
         
         alerts = []
@@ -302,7 +320,7 @@ async def get_stock_alerts(
         )
         
         # Cachear por 10 minutos
-        cache.setex(cache_key, 600, json.dumps(response.dict(), default=str))
+        cache.set_value(cache_key, response.dict(), 600, ["inventory"])
         
         return response
         
@@ -310,7 +328,7 @@ async def get_stock_alerts(
         raise HTTPException(status_code=500, detail=f"Alerts error: {str(e)}")
 
 @router.post("/transfer", response_model=InventoryTransferResponse)
-async def transfer_inventory(
+def transfer_inventory(
     transfer_request: InventoryTransferRequest,
     db: Session = Depends(get_db)
 ):
@@ -345,7 +363,7 @@ async def transfer_inventory(
         raise HTTPException(status_code=500, detail=f"Transfer error: {str(e)}")
 
 @router.post("/adjust", response_model=InventoryAdjustmentResponse)
-async def adjust_inventory(
+def adjust_inventory(
     adjustment_request: InventoryAdjustmentRequest,
     db: Session = Depends(get_db)
 ):
@@ -394,7 +412,7 @@ async def adjust_inventory(
 # === RESERVAS ===
 
 @router.post("/reservations", response_model=ReservationResponse)
-async def create_reservation(
+def create_reservation(
     reservation: ReservationCreate,
     db: Session = Depends(get_db)
 ):
@@ -432,7 +450,7 @@ async def create_reservation(
         raise HTTPException(status_code=500, detail=f"Reservation error: {str(e)}")
 
 @router.get("/reservations/active")
-async def get_active_reservations(db: Session = Depends(get_db)):
+def get_active_reservations(db: Session = Depends(get_db)):
     """Obtener reservas activas"""
     reservations = db.query(Reservation).filter(
         Reservation.status == 'active',
@@ -442,7 +460,7 @@ async def get_active_reservations(db: Session = Depends(get_db)):
     return reservations
 
 @router.post("/reservations/{reservation_id}/complete")
-async def complete_reservation(reservation_id: int, db: Session = Depends(get_db)):
+def complete_reservation(reservation_id: int, db: Session = Depends(get_db)):
     """Completar reserva (convertir en venta)"""
     try:
         inventory_manager = InventoryManager(db)
@@ -460,7 +478,7 @@ async def complete_reservation(reservation_id: int, db: Session = Depends(get_db
         raise HTTPException(status_code=500, detail=f"Complete reservation error: {str(e)}")
 
 @router.post("/reservations/{reservation_id}/cancel")
-async def cancel_reservation(reservation_id: int, db: Session = Depends(get_db)):
+def cancel_reservation(reservation_id: int, db: Session = Depends(get_db)):
     """Cancelar reserva"""
     try:
         inventory_manager = InventoryManager(db)
@@ -480,7 +498,7 @@ async def cancel_reservation(reservation_id: int, db: Session = Depends(get_db))
 # === SISTEMA LED ===
 
 @router.post("/led/control", response_model=LEDControlResponse)
-async def control_leds(
+def control_leds(
     led_request: LEDControlRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -517,10 +535,10 @@ async def control_leds(
         raise HTTPException(status_code=500, detail=f"LED control error: {str(e)}")
 
 @router.get("/report")
-async def get_inventory_report(
+def get_inventory_report(
     location_id: Optional[int] = None,
     include_movements: bool = False,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Generar reporte completo de inventario"""
     try:
@@ -1,94 +1,108 @@
 # backend/app/api/products.py - VERSIÓN CORREGIDA
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from ..database import get_db
+from ..config import settings
 from ..schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse,
     ProductVariantCreate, ProductVariantUpdate, ProductVariantResponse,
     ScanInput, ProductScanResponse, QuickSearchResponse,
+    BatchScanInput, BatchScanResult, BatchScanResponse,
     ProductSearchFilters, ProductSearchResult, ShortCodeValidation
 )
 from ..services.product_handler import ProductCodeHandler
+from ..services.code_index import VariantCode, get_code_index
+from ..services.product_search import search_ranking
 from ..services.inventory_manager import InventoryManager
-from ..services.cache_service import CacheService
+from ..services.cache_service import CacheService, get_cache
+from ..services.cache_codec import dumps_json
 from ..models.product import Product, ProductVariant
-from ..models.inventory import Inventory, Location
-from sqlalchemy import or_, and_, func
+from ..models.inventory import Inventory, Location, VariantStock
+from ..models.profiles import variant_with_product, variant_with_product_and_stock
+from sqlalchemy import or_, func, false
 import json
 import time
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 @router.post("/scan", response_model=ProductScanResponse)
-async def scan_product(scan_input: ScanInput, db: Session = Depends(get_db)):
+def scan_product(
+    scan_input: ScanInput,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
+):
     """Escanear producto por código de barras o código corto"""
     start_time = time.time()
     
     try:
-        cache = CacheService()
-        handler = ProductCodeHandler(db)
+        handler = ProductCodeHandler(db, cache)
         
-        # Verificar caché primero
-        cached_result = cache.get_cached_scan(scan_input.code)
-        if cached_result:
-            return cached_result
+        # Verificar caché primero: el JSON guardado se responde tal cual
+        cached_result = cache.get_cached_scan_json(scan_input.code)
+        if cached_result is not None:
+            return Response(content=cached_result, media_type="application/json")
         
         # Procesar código
         result = handler.process_code(scan_input.code)
-        
-        if result['found']:
-            if result['type'] == 'flexible' and result.get('count', 0) > 1:
-                # Múltiples resultados
-                response = ProductScanResponse(
-                    success=True,
-                    scan_type=result['type'],
-                    suggestions=[
-                        _format_variant_for_response(v, db) 
-                        for v in result['variants'][:5]
-                    ]
-                )
-            else:
-                # Resultado único
-                variant = result.get('variant') or result.get('variants', [None])[0]
-                if variant:
-                    product_result = _format_variant_for_response(variant, db)
-                    response = ProductScanResponse(
-                        success=True,
-                        scan_type=result['type'],
-                        product=product_result
-                    )
-                else:
-                    response = ProductScanResponse(
-                        success=False,
-                        scan_type=result['type'],
-                        message="Product data not found"
-                    )
-        else:
-            # No encontrado
-            suggestions = []
-            if result.get('suggestions'):
-                suggestions = [
-                    _format_suggestion(s) for s in result['suggestions']
-                ]
-            
-            response = ProductScanResponse(
-                success=False,
-                scan_type=result['type'],
-                message="Product not found",
-                suggestions=suggestions
-            )
-        
-        # Guardar en caché por 5 minutos
-        cache.cache_product_scan(scan_input.code, response.dict())
+        response = _scan_response(result, db)
+        
+        # Guardar en caché por 5 minutos (poco tiempo si no se encontró), etiquetado con las variantes incluidas
+        variant_ids = [item.variant_id for item in ([response.product] if response.product else []) + response.suggestions]
+        cache.cache_product_scan(
+            scan_input.code, response.dict(),
+            expire=300 if response.success else settings.scan_negative_ttl,
+            tags=[f"inventory:variant:{variant_id}" for variant_id in variant_ids]
+        )
         
         return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scan error: {str(e)}")
 
+@router.post("/scan/batch", response_model=BatchScanResponse)
+def scan_products_batch(
+    scan_input: BatchScanInput,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
+):
+    """Escanear muchos códigos en una sola llamada (recepción de mercancía, conteos)
+    
+    Los códigos se resuelven en bloque y el inventario de todas las variantes encontradas se
+    consulta junto; cada resultado es el mismo que daría /scan con ese código, en el mismo orden.
+    """
+    start_time = time.time()
+    
+    try:
+        handler = ProductCodeHandler(db, cache)
+        results = handler.process_codes(scan_input.codes)
+        
+        variant_ids = []
+        for result in results:
+            if result.get('variant'):
+                variant_ids.append(result['variant'].id)
+            variant_ids.extend(v.id for v in result.get('variants', [])[:5])
+        inventory = handler.inventory_manager.get_inventory_info_many(variant_ids)
+        
+        responses = [
+            BatchScanResult(code=code, **_scan_response(result, db, inventory).dict())
+            for code, result in zip(scan_input.codes, results)
+        ]
+        found = sum(1 for response in responses if response.success)
+        
+        return BatchScanResponse(
+            results=responses,
+            total_codes=len(responses),
+            found=found,
+            not_found=len(responses) - found,
+            scan_time_ms=round((time.time() - start_time) * 1000, 2)
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch scan error: {str(e)}")
+
 @router.get("/search", response_model=QuickSearchResponse)
-async def search_products(
+def search_products(
     query: Optional[str] = Query(None, min_length=1),
     category: Optional[str] = None,
     brand: Optional[str] = None,
@@ -103,7 +117,8 @@ async def search_products(
     max_price: Optional[float] = None,
     location_id: Optional[int] = None,
     limit: int = Query(20, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
 ):
     """Búsqueda avanzada de productos"""
     start_time = time.time()
@@ -124,46 +139,57 @@ async def search_products(
             min_price=min_price,
             max_price=max_price,
             location_id=location_id
+        ).normalized()
+        
+        # La consulta usa los filtros normalizados para que coincida con la clave de caché
+        search_query = query
+        query, category, brand, size, color, gender, season = (
+            filters.query, filters.category, filters.brand, filters.size,
+            filters.color, filters.gender, filters.season
         )
+        cache_filters = {**filters.dict(), 'limit': limit}
         
         # Verificar caché
-        cache = CacheService()
-        cached_result = cache.get_cached_search(query or "", filters.dict())
+        cached_result = cache.get_cached_search(query or "", cache_filters)
         if cached_result:
+            # Los resultados ya se validaron al cachearlos; solo cambian la consulta y el tiempo
             search_time = (time.time() - start_time) * 1000
-            cached_result['search_time_ms'] = search_time
-            return QuickSearchResponse(**cached_result)
+            return Response(content=dumps_json({
+                'query': search_query or "",
+                'total_results': len(cached_result['results']),
+                'results': cached_result['results'],
+                'search_time_ms': round(search_time, 2),
+                'suggested_filters': cached_result.get('suggested_filters')
+            }), media_type="application/json")
         
         # Construir consulta
         query_builder = db.query(ProductVariant).join(Product)
         
-        if in_stock:
-            query_builder = query_builder.join(Inventory).filter(
-                Inventory.quantity > 0,
+        if location_id:
+            # Stock en una ubicación específica (EXISTS: una fila por variante, sin DISTINCT)
+            location_stock = db.query(Inventory.id).filter(
+                Inventory.variant_id == ProductVariant.id,
+                Inventory.location_id == location_id,
                 Inventory.is_active == True
             )
-        
-        if location_id:
-            query_builder = query_builder.filter(Inventory.location_id == location_id)
-        
-        # Aplicar filtros
+            if in_stock:
+                location_stock = location_stock.filter(Inventory.quantity > 0)
+            query_builder = query_builder.filter(location_stock.exists())
+        elif in_stock:
+            # Totales por variante: una fila en vez de todas sus ubicaciones. Con existencias
+            # (on_hand), como antes: una variante con todo su stock reservado sigue apareciendo
+            query_builder = query_builder.join(VariantStock).filter(VariantStock.on_hand > 0)
+        
+        # Aplicar filtros: el índice de texto completo da las variantes que coinciden y su relevancia
         if query:
-            search_terms = query.strip().split()
-            conditions = []
-            for term in search_terms:
-                term_condition = or_(
-                    Product.name.ilike(f'%{term}%'),
-                    ProductVariant.sku.ilike(f'%{term}%'),
-                    ProductVariant.short_code.ilike(f'%{term}%'),
-                    ProductVariant.barcode.ilike(f'%{term}%'),
-                    Product.brand.ilike(f'%{term}%'),
-                    ProductVariant.color.ilike(f'%{term}%'),
-                    ProductVariant.size.ilike(f'%{term}%')
+            matches = search_ranking(db, query)
+            if matches is None:
+                # Solo signos de puntuación: nada que buscar
+                query_builder = query_builder.filter(false())
+            else:
+                query_builder = query_builder.join(matches, matches.c.variant_id == ProductVariant.id).order_by(
+                    matches.c.rank, ProductVariant.id
                 )
-                conditions.append(term_condition)
-            
-            if conditions:
-                query_builder = query_builder.filter(and_(*conditions))
         
         if category:
             query_builder = query_builder.filter(Product.category.ilike(f'%{category}%'))
@@ -199,7 +225,7 @@ async def search_products(
             query_builder = query_builder.filter(ProductVariant.price <= max_price)
         
         # Obtener resultados
-        variants = query_builder.distinct().limit(limit).all()
+        variants = query_builder.options(*variant_with_product(joined=True)).limit(limit).all()
         
         # Formatear resultados - AQUÍ ESTÁ LA CORRECCIÓN PRINCIPAL
         results = []
@@ -214,31 +240,50 @@ async def search_products(
         search_time = (time.time() - start_time) * 1000
         
         response_data = {
-            'query': query or "",
+            'query': search_query or "",
             'total_results': len(results),
             'results': results,
             'search_time_ms': round(search_time, 2),
             'suggested_filters': suggested_filters
         }
         
-        # Cachear resultados por 3 minutos
-        cache.cache_search_results(query or "", filters.dict(), results, 180)
+        response = QuickSearchResponse(**response_data)
         
-        return QuickSearchResponse(**response_data)
+        # Cachear por 3 minutos los resultados ya validados
+        cached_results = [result.dict() for result in response.results]
+        cache.cache_search_results(query or "", cache_filters, cached_results, 180, suggested_filters)
+        
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 @router.get("/quick-search/{search_term}")
-async def ultra_fast_search(
+def ultra_fast_search(
     search_term: str,
     limit: int = Query(10, le=20),
     db: Session = Depends(get_db)
 ):
-    """Búsqueda ultra rápida para autocompletado"""
+    """Búsqueda ultra rápida para autocompletado
+
+    Con el índice de códigos cargado se responde desde memoria: prefijo de SKU, código corto,
+    código de barras o de una palabra del nombre, con el stock disponible que lleva el índice.
+    """
     try:
+        index = get_code_index()
+        if settings.code_index_enabled and index.loaded:
+            results = [
+                _format_autocomplete(record, index.available(record.id))
+                for record in index.autocomplete(search_term, limit)
+            ]
+            return {
+                'term': search_term,
+                'results': results,
+                'count': len(results)
+            }
+        
         # Búsqueda optimizada en campos principales
-        variants = db.query(ProductVariant).join(Product).filter(
+        variants = db.query(ProductVariant).join(Product).outerjoin(VariantStock).filter(
             or_(
                 ProductVariant.sku.ilike(f'{search_term}%'),
                 ProductVariant.short_code.ilike(f'{search_term}%'),
@@ -247,26 +292,12 @@ async def ultra_fast_search(
             ),
             ProductVariant.is_active == True,
             Product.is_active == True
-        ).limit(limit).all()
+        ).options(*variant_with_product_and_stock(joined=True)).limit(limit).all()
         
-        results = []
-        inventory_manager = InventoryManager(db)
-        
-        for variant in variants:
-            inventory_info = inventory_manager.get_inventory_info(variant.id)
-            
-            results.append({
-                'variant_id': variant.id,
-                'product_name': variant.product.name,
-                'sku': variant.sku,
-                'short_code': variant.short_code,
-                'barcode': variant.barcode,
-                'size': variant.size,
-                'color': variant.color,
-                'price': float(variant.price),
-                'available_stock': inventory_info['total_available'],
-                'display_text': f"{variant.product.name} - {variant.size} - {variant.color}"
-            })
+        results = [
+            _format_autocomplete(VariantCode.from_variant(variant), variant.stock.available if variant.stock else 0)
+            for variant in variants
+        ]
         
         return {
             'term': search_term,
@@ -278,7 +309,7 @@ async def ultra_fast_search(
         raise HTTPException(status_code=500, detail=f"Quick search error: {str(e)}")
 
 @router.get("/validate-code/{code}")
-async def validate_short_code(code: str, db: Session = Depends(get_db)):
+def validate_short_code(code: str, db: Session = Depends(get_db)):
     """Valida formato de código corto"""
     try:
         handler = ProductCodeHandler(db)
@@ -290,7 +321,7 @@ async def validate_short_code(code: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Validation error: {str(e)}")
 
 @router.get("/{variant_id}/locations")
-async def get_product_locations(
+def get_product_locations(
     variant_id: int,
     customer_visible_only: bool = True,
     db: Session = Depends(get_db)
@@ -313,7 +344,7 @@ async def get_product_locations(
         raise HTTPException(status_code=500, detail=f"Location search error: {str(e)}")
 
 @router.get("/{variant_id}/alternatives")
-async def get_product_alternatives(
+def get_product_alternatives(
     variant_id: int,
     limit: int = Query(10, le=20),
     db: Session = Depends(get_db)
@@ -390,7 +421,11 @@ async def get_product_alternatives(
         raise HTTPException(status_code=500, detail=f"Alternatives search error: {str(e)}")
 
 @router.post("/", response_model=ProductResponse)
-async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+def create_product(
+    product: ProductCreate,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
+):
     """Crear nuevo producto con variante e inventario inicial"""
     try:
         # Verificar que no exista un producto con el mismo código
@@ -452,9 +487,14 @@ async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
             is_active=True
         )
         db.add(initial_inventory)
+        db.add(VariantStock(variant_id=default_variant.id, on_hand=1, reserved=0, available=1))
         
         # Commit final de toda la transacción
         db.commit()
+        # Cambian las búsquedas, los conteos de inventario y los escaneos que no encontraban la
+        # variante; los escaneos de otros códigos siguen valiendo
+        cache.invalidate_tags(["search", "inventory"])
+        cache.forget_scan_misses()
         
         # Refrescar objetos
         db.refresh(db_product)
@@ -472,10 +512,11 @@ async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Product creation error: {str(e)}")
 
 @router.post("/{product_id}/variants", response_model=ProductVariantResponse)
-async def create_product_variant(
+def create_product_variant(
     product_id: int,
     variant: ProductVariantCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
 ):
     """Crear nueva variante de producto"""
     try:
@@ -514,6 +555,10 @@ async def create_product_variant(
         db.add(db_variant)
         db.commit()
         db.refresh(db_variant)
+        # La variante nueva puede aparecer en las búsquedas; los escaneos de otros códigos siguen valiendo
+        cache.invalidate_tag("search")
+        # Sus códigos (escritos de cualquier forma) pudieron quedar cacheados como inexistentes
+        cache.forget_scan_misses()
         
         return db_variant
         
@@ -522,29 +567,96 @@ async def create_product_variant(
         raise HTTPException(status_code=500, detail=f"Variant creation error: {str(e)}")
 
 # Funciones auxiliares - CORRECCIÓN PRINCIPAL AQUÍ
-def _format_variant_for_response(variant: ProductVariant, db: Session) -> dict:
+def _scan_response(result: dict, db: Session, inventory: Optional[dict] = None) -> ProductScanResponse:
+    """Arma la respuesta de un escaneo a partir del resultado de ProductCodeHandler
+    
+    inventory: inventory_info por variante ya consultado en bloque; las que falten se consultan.
+    """
+    inventory = inventory or {}
+    if result['found']:
+        if result['type'] == 'flexible' and result.get('count', 0) > 1:
+            # Múltiples resultados
+            return ProductScanResponse(
+                success=True,
+                scan_type=result['type'],
+                suggestions=[
+                    _format_variant_for_response(v, db, inventory.get(v.id))
+                    for v in result['variants'][:5]
+                ]
+            )
+        
+        # Resultado único
+        variant = result.get('variant') or result.get('variants', [None])[0]
+        if variant:
+            product_result = _format_variant_for_response(
+                variant, db, result.get('inventory') or inventory.get(variant.id)
+            )
+            return ProductScanResponse(
+                success=True,
+                scan_type=result['type'],
+                product=product_result
+            )
+        return ProductScanResponse(
+            success=False,
+            scan_type=result['type'],
+            message="Product data not found"
+        )
+    
+    # No encontrado
+    suggestions = []
+    if result.get('suggestions'):
+        suggestions = [
+            _format_suggestion(s) for s in result['suggestions']
+        ]
+    
+    return ProductScanResponse(
+        success=False,
+        scan_type=result['type'],
+        message="Product not found",
+        suggestions=suggestions
+    )
+
+def _format_variant_for_response(variant: Union[ProductVariant, VariantCode], db: Session,
+                                 inventory_info: Optional[dict] = None) -> dict:
     """Formatea una variante para respuesta de API - RETORNA DICCIONARIO"""
-    inventory_manager = InventoryManager(db)
-    inventory_info = inventory_manager.get_inventory_info(variant.id)
+    if isinstance(variant, ProductVariant):
+        variant = VariantCode.from_variant(variant)
+    if inventory_info is None:
+        inventory_info = InventoryManager(db).get_inventory_info(variant.id)
     
     # Retornar diccionario plano en lugar de objeto Pydantic
     return {
         'variant_id': variant.id,
-        'product_name': variant.product.name,
-        'variant_name': f"{variant.product.name} - {variant.size} - {variant.color}",
+        'product_name': variant.product_name,
+        'variant_name': f"{variant.product_name} - {variant.size} - {variant.color}",
         'sku': variant.sku,
         'barcode': variant.barcode,
         'short_code': variant.short_code,
         'size': variant.size,
         'color': variant.color,
         'color_hex': variant.color_hex,
-        'price': float(variant.price),  # Convertir a float para evitar problemas de serialización
+        'price': variant.price,
         'available_stock': inventory_info['total_available'],
         'total_stock': inventory_info['total_stock'],
         'locations': inventory_info['locations'],
         'is_featured': variant.is_featured
     }
 
+def _format_autocomplete(variant: VariantCode, available: int) -> dict:
+    """Formatea una variante para el autocompletado"""
+    return {
+        'variant_id': variant.id,
+        'product_name': variant.product_name,
+        'sku': variant.sku,
+        'short_code': variant.short_code,
+        'barcode': variant.barcode,
+        'size': variant.size,
+        'color': variant.color,
+        'price': variant.price,
+        'available_stock': available,
+        'display_text': f"{variant.product_name} - {variant.size} - {variant.color}"
+    }
+
 def _format_suggestion(suggestion: dict) -> dict:
     """Formatea una sugerencia para respuesta - YA RETORNA DICCIONARIO"""
     return {
@@ -582,4 +694,62 @@ def _generate_suggested_filters(variants: List[ProductVariant]) -> dict:
         'brands': sorted(list(brands)),
         'sizes': sorted(list(sizes)),
         'colors': sorted(list(colors))
-    }
\ No newline at end of file
+    }
+
+def warm_scan_cache(db: Session, cache: CacheService, limit: int) -> dict:
+    """Precarga los escaneos por código de barras y código corto del catálogo activo
+
+    Usa una consulta para las variantes y consultas en bloque para su inventario, de modo
+    que los primeros escaneos después de un despliegue ya encuentren el caché caliente.
+    """
+    start_time = time.time()
+    handler = ProductCodeHandler(db, cache)
+    inventory_manager = InventoryManager(db, cache)
+    
+    variants = db.query(ProductVariant).join(Product).options(
+        *variant_with_product(joined=True)
+    ).filter(
+        ProductVariant.is_active == True
+    ).order_by(ProductVariant.is_featured.desc(), ProductVariant.id).limit(limit).all()
+    
+    inventory_entries = inventory_manager.preload_inventory_info([variant.id for variant in variants])
+    
+    scan_entries = 0
+    for variant in variants:
+        # Solo códigos que process_code resolvería a esta misma variante
+        codes = []
+        if variant.barcode and handler._identify_code_type(variant.barcode) == 'barcode':
+            codes.append((variant.barcode, 'barcode'))
+        if variant.short_code and _short_code_resolves_to(handler, variant):
+            codes.append((variant.short_code, 'shortcode'))
+        if not codes:
+            continue
+        
+        product_result = _format_variant_for_response(variant, db)
+        for code, scan_type in codes:
+            response = ProductScanResponse(success=True, scan_type=scan_type, product=product_result)
+            cache.cache_product_scan(code, response.dict(), tags=[f"inventory:variant:{variant.id}"])
+            scan_entries += 1
+    
+    return {
+        'variants': len(variants),
+        'entries': inventory_entries + scan_entries,
+        'scan_entries': scan_entries,
+        'inventory_entries': inventory_entries,
+        'duration_ms': round((time.time() - start_time) * 1000, 2)
+    }
+
+def _short_code_resolves_to(handler: ProductCodeHandler, variant: ProductVariant) -> bool:
+    """Indica si el código corto de la variante la encuentra en el escaneo"""
+    code = variant.short_code.strip().upper()
+    match = handler.patterns['shortcode'].match(code)
+    if not match:
+        return False
+    
+    category, number, size, color = match.groups()
+    return (
+        variant.product.category_code == category and
+        variant.product.internal_number == number and
+        variant.size == handler.size_map.get(size, size) and
+        variant.color == handler.color_map.get(color, color)
+    )
@@ -1,202 +1,207 @@
 # backend/app/api/reports.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from ..database import get_db
-from ..services.sales_manager import SalesManager
+from ..database import get_read_db, run_with_session
+from ..config import settings
+from ..services.sales_manager import SalesManager, sales_rollup, sales_rollup_totals
 from ..services.inventory_manager import InventoryManager
-from ..services.cache_service import CacheService
+from ..services.cache_service import CacheService, get_cache
 from ..models.sale import Sale, SaleItem
 from ..models.product import Product, ProductVariant
 from ..models.inventory import Inventory, Location, InventoryMovement
-from sqlalchemy import func, and_, or_, desc, asc
+from ..models.profiles import inventory_with_variant_product_location, sale_with_items
+from ..utils.pagination import InvalidCursorError
+from sqlalchemy import Integer, cast, func, and_, or_, desc, asc
 import json
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 @router.get("/dashboard")
-async def get_dashboard_data(
+def get_dashboard_data(
     period_days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
+    cache: CacheService = Depends(get_cache)
 ):
     """Datos para el dashboard principal"""
     try:
-        cache = CacheService()
-        cache_key = f"dashboard_data:{period_days}"
-        
-        # Verificar caché
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return json.loads(cached_data)
-        
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=period_days)
-        
-        # === MÉTRICAS DE VENTAS ===
-        sales_query = db.query(Sale).filter(
-            Sale.created_at >= start_date,
-            Sale.created_at <= end_date,
-            Sale.status == 'completed'
+        # Cachear por 15 minutos; al vencer se sirve el valor anterior mientras se recalcula
+        payload = cache.get_or_compute(
+            f"dashboard_data:{period_days}",
+            lambda: _build_dashboard_data(db, cache, period_days),
+            expire=900,
+            stale_ttl=settings.dashboard_stale_ttl,
+            refresh=lambda: run_with_session(lambda session: _build_dashboard_data(session, cache, period_days), read_only=True),
+            raw=True
         )
-        
-        sales = sales_query.all()
-        total_sales = len(sales)
-        total_revenue = sum(sale.total_amount for sale in sales)
-        total_profit = sum(sale.profit for sale in sales)
-        total_items_sold = sum(sale.total_items for sale in sales)
-        
-        avg_sale_amount = total_revenue / total_sales if total_sales > 0 else 0
-        profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-        
-        # Comparación con período anterior
-        prev_start = start_date - timedelta(days=period_days)
-        prev_end = start_date
-        
-        prev_sales = db.query(Sale).filter(
-            Sale.created_at >= prev_start,
-            Sale.created_at < prev_end,
-            Sale.status == 'completed'
-        ).all()
-        
-        prev_revenue = sum(sale.total_amount for sale in prev_sales)
-        revenue_change = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
-        
-        # === PRODUCTOS MÁS VENDIDOS ===
-        top_products_query = db.query(
-            SaleItem.variant_id,
-            ProductVariant.sku,
-            Product.name.label('product_name'),
-            ProductVariant.size,
-            ProductVariant.color,
-            func.sum(SaleItem.quantity).label('total_sold'),
-            func.sum(SaleItem.total_price).label('total_revenue')
-        ).join(Sale).join(ProductVariant).join(Product).filter(
-            Sale.created_at >= start_date,
-            Sale.created_at <= end_date,
-            Sale.status == 'completed'
-        ).group_by(
-            SaleItem.variant_id,
-            ProductVariant.sku,
-            Product.name,
-            ProductVariant.size,
-            ProductVariant.color
-        ).order_by(desc('total_sold')).limit(10)
-        
-        top_products = []
-        for item in top_products_query.all():
-            top_products.append({
-                'variant_id': item.variant_id,
-                'sku': item.sku,
-                'product_name': item.product_name,
-                'size': item.size,
-                'color': item.color,
-                'quantity_sold': item.total_sold,
-                'revenue': float(item.total_revenue)
-            })
-        
-        # === VENTAS POR DÍA ===
-        daily_sales = {}
-        for i in range(period_days):
-            date = (end_date - timedelta(days=i)).strftime('%Y-%m-%d')
-            daily_sales[date] = {'sales': 0, 'revenue': 0}
-        
-        for sale in sales:
-            date_key = sale.created_at.strftime('%Y-%m-%d')
-            if date_key in daily_sales:
-                daily_sales[date_key]['sales'] += 1
-                daily_sales[date_key]['revenue'] += sale.total_amount
-        
-        # Convertir a lista ordenada
-        daily_sales_list = []
-        for date in sorted(daily_sales.keys()):
-            daily_sales_list.append({
-                'date': date,
-                'sales_count': daily_sales[date]['sales'],
-                'revenue': daily_sales[date]['revenue']
-            })
-        
-        # === INVENTARIO ===
-        inventory_manager = InventoryManager(db)
-        stock_value = inventory_manager.get_stock_value_report()
-        low_stock_alerts = inventory_manager.get_low_stock_alerts()
-        
-        total_products = db.query(Product).filter(Product.is_active == True).count()
-        total_variants = db.query(ProductVariant).filter(ProductVariant.is_active == True).count()
-        
-        # === MÉTODOS DE PAGO ===
-        payment_methods = {}
-        for sale in sales:
-            method = sale.payment_method
-            if method not in payment_methods:
-                payment_methods[method] = {'count': 0, 'amount': 0}
-            payment_methods[method]['count'] += 1
-            payment_methods[method]['amount'] += sale.total_amount
-        
-        # === VENTAS POR HORA ===
-        hourly_sales = {}
-        for hour in range(24):
-            hourly_sales[f"{hour:02d}:00"] = 0
-        
-        for sale in sales:
-            hour_key = f"{sale.created_at.hour:02d}:00"
-            hourly_sales[hour_key] += 1
-        
-        hourly_sales_list = [
-            {'hour': hour, 'sales': count}
-            for hour, count in hourly_sales.items()
-        ]
-        
-        dashboard_data = {
-            'period_days': period_days,
-            'generated_at': datetime.now().isoformat(),
-            
-            # Métricas principales
-            'sales_metrics': {
-                'total_sales': total_sales,
-                'total_revenue': round(total_revenue, 2),
-                'total_profit': round(total_profit, 2),
-                'total_items_sold': total_items_sold,
-                'avg_sale_amount': round(avg_sale_amount, 2),
-                'profit_margin': round(profit_margin, 2),
-                'revenue_change_percent': round(revenue_change, 2)
-            },
-            
-            # Inventario
-            'inventory_metrics': {
-                'total_products': total_products,
-                'total_variants': total_variants,
-                'total_stock_value': round(stock_value['total_retail_value'], 2),
-                'low_stock_alerts': len(low_stock_alerts),
-                'out_of_stock_items': len([a for a in low_stock_alerts if a['current_quantity'] == 0])
-            },
-            
-            # Gráficos y listas
-            'top_products': top_products,
-            'daily_sales': daily_sales_list,
-            'payment_methods': payment_methods,
-            'hourly_distribution': hourly_sales_list
-        }
-        
-        # Cachear por 15 minutos
-        cache.setex(cache_key, 900, json.dumps(dashboard_data, default=str))
-        
-        return dashboard_data
+        return Response(content=payload, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Dashboard data error: {str(e)}")
 
+def _build_dashboard_data(db: Session, cache: CacheService, period_days: int) -> Dict[str, Any]:
+    """Calcula los datos del dashboard para el período"""
+    # Días calendario completos (hoy incluido): se leen de sales_rollup_daily, una fila por día
+    end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start_date = end_date - timedelta(days=period_days)
+    
+    # === MÉTRICAS DE VENTAS ===
+    totals = sales_rollup_totals(db, start_date, end_date)
+    total_sales = totals['count']
+    total_revenue = totals['revenue']
+    total_profit = totals['profit']
+    total_items_sold = totals['items']
+    
+    avg_sale_amount = total_revenue / total_sales if total_sales > 0 else 0
+    profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+    
+    # Comparación con período anterior
+    prev_start = start_date - timedelta(days=period_days)
+    prev_end = start_date
+    
+    prev_revenue = sales_rollup_totals(db, prev_start, prev_end)['revenue']
+    revenue_change = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
+    
+    # === PRODUCTOS MÁS VENDIDOS ===
+    top_products_query = db.query(
+        SaleItem.variant_id,
+        ProductVariant.sku,
+        Product.name.label('product_name'),
+        ProductVariant.size,
+        ProductVariant.color,
+        func.sum(SaleItem.quantity).label('total_sold'),
+        func.sum(SaleItem.total_price).label('total_revenue')
+    ).join(Sale).join(ProductVariant).join(Product).filter(
+        Sale.created_at >= start_date,
+        Sale.created_at < end_date,
+        Sale.status == 'completed'
+    ).group_by(
+        SaleItem.variant_id,
+        ProductVariant.sku,
+        Product.name,
+        ProductVariant.size,
+        ProductVariant.color
+    ).order_by(desc('total_sold')).limit(10)
+    
+    top_products = []
+    for item in top_products_query.all():
+        top_products.append({
+            'variant_id': item.variant_id,
+            'sku': item.sku,
+            'product_name': item.product_name,
+            'size': item.size,
+            'color': item.color,
+            'quantity_sold': item.total_sold,
+            'revenue': float(item.total_revenue)
+        })
+    
+    # === VENTAS POR DÍA ===
+    daily_sales = {}
+    for i in range(period_days):
+        date = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
+        daily_sales[date] = {'sales': 0, 'revenue': 0}
+    
+    for row in sales_rollup(db, start_date, end_date, ('day',)):
+        date_key = row['day'].strftime('%Y-%m-%d')
+        if date_key in daily_sales:
+            daily_sales[date_key]['sales'] += row['count']
+            daily_sales[date_key]['revenue'] += row['revenue']
+    
+    # Convertir a lista ordenada
+    daily_sales_list = []
+    for date in sorted(daily_sales.keys()):
+        daily_sales_list.append({
+            'date': date,
+            'sales_count': daily_sales[date]['sales'],
+            'revenue': daily_sales[date]['revenue']
+        })
+    
+    # === INVENTARIO ===
+    inventory_manager = InventoryManager(db, cache)
+    stock_value = inventory_manager.get_stock_value_report()
+    low_stock_alerts = inventory_manager.get_low_stock_alerts()
+    
+    total_products = db.query(Product).filter(Product.is_active == True).count()
+    total_variants = db.query(ProductVariant).filter(ProductVariant.is_active == True).count()
+    
+    # === MÉTODOS DE PAGO ===
+    payment_methods = {
+        row['payment_method']: {'count': row['count'], 'amount': row['revenue']}
+        for row in sales_rollup(db, start_date, end_date, ('payment_method',))
+    }
+    
+    # === VENTAS POR HORA ===
+    hourly_sales = {}
+    for hour in range(24):
+        hourly_sales[f"{hour:02d}:00"] = 0
+    
+    for row in sales_rollup(db, start_date, end_date, ('hour_of_day',)):
+        hourly_sales[f"{row['hour_of_day']:02d}:00"] += row['count']
+    
+    hourly_sales_list = [
+        {'hour': hour, 'sales': count}
+        for hour, count in hourly_sales.items()
+    ]
+    
+    dashboard_data = {
+        'period_days': period_days,
+        'generated_at': datetime.now().isoformat(),
+        
+        # Métricas principales
+        'sales_metrics': {
+            'total_sales': total_sales,
+            'total_revenue': round(total_revenue, 2),
+            'total_profit': round(total_profit, 2),
+            'total_items_sold': total_items_sold,
+            'avg_sale_amount': round(avg_sale_amount, 2),
+            'profit_margin': round(profit_margin, 2),
+            'revenue_change_percent': round(revenue_change, 2)
+        },
+        
+        # Inventario
+        'inventory_metrics': {
+            'total_products': total_products,
+            'total_variants': total_variants,
+            'total_stock_value': round(stock_value['total_retail_value'], 2),
+            'low_stock_alerts': len(low_stock_alerts),
+            'out_of_stock_items': len([a for a in low_stock_alerts if a['current_quantity'] == 0])
+        },
+        
+        # Gráficos y listas
+        'top_products': top_products,
+        'daily_sales': daily_sales_list,
+        'payment_methods': payment_methods,
+        'hourly_distribution': hourly_sales_list
+    }
+
+    return dashboard_data
+
 @router.get("/sales/summary")
-async def get_sales_summary(
+def get_sales_summary(
     start_date: datetime,
     end_date: datetime,
     group_by: str = Query("day", pattern=r'^(hour|day|week|month)$'),
     category: Optional[str] = None,
     cashier_id: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Resumen de ventas por período"""
     try:
+        grouped_data = {}
+        
+        def period_entry(key):
+            if key not in grouped_data:
+                grouped_data[key] = {
+                    'period': key,
+                    'sales_count': 0,
+                    'total_revenue': 0,
+                    'total_profit': 0,
+                    'total_items': 0,
+                    'unique_customers': set()
+                }
+            return grouped_data[key]
+        
         # Construir consulta base
         query = db.query(Sale).filter(
             Sale.created_at >= start_date,
@@ -207,52 +212,47 @@ async def get_sales_summary(
         if cashier_id:
             query = query.filter(Sale.cashier_id == cashier_id)
         
-        # Si se filtra por categoría, necesitamos unir con items
         if category:
+            # Si se filtra por categoría, necesitamos unir con items
             query = query.join(SaleItem).join(ProductVariant).join(Product).filter(
                 Product.category.ilike(f'%{category}%')
             ).distinct()
-        
-        sales = query.all()
-        
-        # Agrupar datos
-        grouped_data = {}
-        
-        for sale in sales:
-            # Determinar la clave de agrupación
-            if group_by == 'hour':
-                key = sale.created_at.strftime('%Y-%m-%d %H:00')
-            elif group_by == 'day':
-                key = sale.created_at.strftime('%Y-%m-%d')
-            elif group_by == 'week':
-                # Primer día de la semana (lunes)
-                monday = sale.created_at - timedelta(days=sale.created_at.weekday())
-                key = monday.strftime('%Y-%m-%d')
-            elif group_by == 'month':
-                key = sale.created_at.strftime('%Y-%m')
             
-            if key not in grouped_data:
-                grouped_data[key] = {
-                    'period': key,
-                    'sales_count': 0,
-                    'total_revenue': 0,
-                    'total_profit': 0,
-                    'total_items': 0,
-                    'unique_customers': set()
-                }
-            
-            grouped_data[key]['sales_count'] += 1
-            grouped_data[key]['total_revenue'] += sale.total_amount
-            grouped_data[key]['total_profit'] += sale.profit
-            grouped_data[key]['total_items'] += sale.total_items
+            for sale in query.all():
+                entry = period_entry(_summary_period(sale.created_at, group_by))
+                entry['sales_count'] += 1
+                entry['total_revenue'] += sale.total_amount
+                entry['total_profit'] += sale.profit
+                entry['total_items'] += sale.total_items
+                if sale.customer_phone:
+                    entry['unique_customers'].add(sale.customer_phone)
+        else:
+            # Totales desde los rollups (end_date es inclusivo)
+            rows = sales_rollup(
+                db, start_date, end_date + timedelta(microseconds=1),
+                ('hour',) if group_by == 'hour' else ('day',),
+                cashier_id=cashier_id
+            )
+            for row in rows:
+                entry = period_entry(_summary_period(row.get('hour') or row.get('day'), group_by))
+                entry['sales_count'] += row['count']
+                entry['total_revenue'] += row['revenue']
+                entry['total_profit'] += row['profit']
+                entry['total_items'] += row['items']
             
-            if sale.customer_phone:
-                grouped_data[key]['unique_customers'].add(sale.customer_phone)
+            # Clientes distintos no se pueden sumar entre períodos: se cuentan en SQL por período
+            period = _summary_period_sql(Sale.created_at, group_by, db.get_bind().dialect.name)
+            customers = query.filter(Sale.customer_phone.isnot(None)).with_entities(
+                period, func.count(func.distinct(Sale.customer_phone))
+            ).group_by(period)
+            for key, count in customers:
+                period_entry(key)['unique_customers'] = count
         
         # Convertir sets a counts y formatear
         result = []
         for period_data in grouped_data.values():
-            period_data['unique_customers'] = len(period_data['unique_customers'])
+            if isinstance(period_data['unique_customers'], set):
+                period_data['unique_customers'] = len(period_data['unique_customers'])
             period_data['avg_sale_amount'] = (
                 period_data['total_revenue'] / period_data['sales_count']
                 if period_data['sales_count'] > 0 else 0
@@ -284,12 +284,39 @@ async def get_sales_summary(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sales summary error: {str(e)}")
 
+def _summary_period(moment, group_by: str) -> str:
+    """Clave del período de una fecha (o datetime) según group_by"""
+    if group_by == 'hour':
+        return moment.strftime('%Y-%m-%d %H:00')
+    if group_by == 'week':
+        # Primer día de la semana (lunes)
+        monday = moment - timedelta(days=moment.weekday())
+        return monday.strftime('%Y-%m-%d')
+    if group_by == 'month':
+        return moment.strftime('%Y-%m')
+    return moment.strftime('%Y-%m-%d')
+
+def _summary_period_sql(column, group_by: str, dialect: str):
+    """Expresión SQL con la misma clave de período que _summary_period"""
+    if dialect == 'postgresql':
+        if group_by == 'week':
+            return func.to_char(func.date_trunc('week', column), 'YYYY-MM-DD')
+        formats = {'hour': 'YYYY-MM-DD HH24:00', 'month': 'YYYY-MM'}
+        return func.to_char(column, formats.get(group_by, 'YYYY-MM-DD'))
+    
+    if group_by == 'week':
+        # Lunes de la semana: %w es 0 el domingo
+        days_since_monday = (cast(func.strftime('%w', column), Integer) + 6) % 7
+        return func.date(column, func.printf('-%d days', days_since_monday))
+    formats = {'hour': '%Y-%m-%d %H:00', 'month': '%Y-%m'}
+    return func.strftime(formats.get(group_by, '%Y-%m-%d'), column)
+
 @router.get("/inventory/status")
-async def get_inventory_status_report(
+def get_inventory_status_report(
     location_id: Optional[int] = None,
     category: Optional[str] = None,
     low_stock_threshold: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Reporte de estado del inventario"""
     try:
@@ -308,7 +335,7 @@ async def get_inventory_status_report(
         if category:
             query = query.filter(Product.category.ilike(f'%{category}%'))
         
-        inventory_items = query.all()
+        inventory_items = query.options(*inventory_with_variant_product_location(joined=True)).all()
         
         # Calcular métricas
         total_items = len(inventory_items)
@@ -437,12 +464,12 @@ async def get_inventory_status_report(
         raise HTTPException(status_code=500, detail=f"Inventory status error: {str(e)}")
 
 @router.get("/products/performance")
-async def get_product_performance_report(
+def get_product_performance_report(
     start_date: datetime,
     end_date: datetime,
     category: Optional[str] = None,
     top_n: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Reporte de rendimiento de productos"""
     try:
@@ -531,26 +558,28 @@ async def get_product_performance_report(
         raise HTTPException(status_code=500, detail=f"Product performance error: {str(e)}")
 
 @router.get("/movements/history")
-async def get_inventory_movements_report(
+def get_inventory_movements_report(
     start_date: datetime,
     end_date: datetime,
     movement_type: Optional[str] = None,
     location_id: Optional[int] = None,
     variant_id: Optional[int] = None,
     limit: int = Query(100, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Reporte de movimientos de inventario"""
+    """Reporte de movimientos de inventario (paginado con el next_cursor de la respuesta)"""
     try:
         inventory_manager = InventoryManager(db)
         
-        movements = inventory_manager.get_movement_history(
+        movements, next_cursor = inventory_manager.get_movement_page(
             variant_id=variant_id,
             location_id=location_id,
             start_date=start_date,
             end_date=end_date,
             movement_type=movement_type,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
         # Agrupar por tipo de movimiento
@@ -583,27 +612,33 @@ async def get_inventory_movements_report(
                 'movement_types': len(movement_summary),
                 'by_type': list(movement_summary.values())
             },
-            'movements': movements
+            'movements': movements,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Movements report error: {str(e)}")
 
 @router.get("/export/sales")
-async def export_sales_data(
+def export_sales_data(
     start_date: datetime,
     end_date: datetime,
     format: str = Query("json", pattern=r'^(json|csv)$'),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Exportar datos de ventas"""
     try:
         # Obtener datos de ventas
-        sales = db.query(Sale).filter(
+        sales_query = db.query(Sale).filter(
             Sale.created_at >= start_date,
             Sale.created_at <= end_date,
             Sale.status == 'completed'
-        ).all()
+        )
+        # El CSV solo usa columnas de la venta; el JSON incluye los items
+        sales = (sales_query if format == "csv" else sales_query.options(*sale_with_items())).all()
         
         if format == "csv":
             # Generar CSV
@@ -1,9 +1,10 @@
 # backend/app/api/sales.py
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
-from ..database import get_db
+from ..database import get_db, get_read_db, run_with_session
+from ..config import settings
 from ..schemas.sale import (
     SaleCreate, SaleUpdate, SaleResponse,
     QuickSaleRequest, QuickSaleResponse,
@@ -13,11 +14,12 @@ from ..schemas.sale import (
     RealTimeMetrics, ReceiptData,
     CartItem, Cart, CartSummary
 )
-from ..services.sales_manager import SalesManager
+from ..services.sales_manager import SalesManager, sales_rollup_totals
 from ..services.inventory_manager import InventoryManager
-from ..services.cache_service import CacheService
+from ..services.cache_service import CacheService, get_cache
 from ..models.sale import Sale, SaleItem, Payment, Refund
 from ..models.product import ProductVariant
+from ..utils.pagination import keyset_page, InvalidCursorError
 from sqlalchemy import and_, or_, func, desc
 import json
 
@@ -26,7 +28,7 @@ router = APIRouter(prefix="/sales", tags=["sales"])
 # === VENTAS ===
 
 @router.post("/", response_model=SaleResponse)
-async def create_sale(
+def create_sale(
     sale_data: SaleCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -57,7 +59,7 @@ async def create_sale(
         raise HTTPException(status_code=500, detail=f"Sale creation error: {str(e)}")
 
 @router.post("/quick", response_model=QuickSaleResponse)
-async def quick_sale(
+def quick_sale(
     quick_sale_data: QuickSaleRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -100,7 +102,7 @@ async def quick_sale(
         raise HTTPException(status_code=500, detail=f"Quick sale error: {str(e)}")
 
 @router.get("/search", response_model=SaleSearchResponse)
-async def search_sales(
+def search_sales(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     customer_phone: Optional[str] = None,
@@ -113,9 +115,16 @@ async def search_sales(
     sale_number: Optional[str] = None,
     limit: int = Query(50, le=200),
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: Session = Depends(get_read_db),
+    cache: CacheService = Depends(get_cache)
 ):
-    """Búsqueda avanzada de ventas"""
+    """Búsqueda avanzada de ventas (más recientes primero)
+    
+    Para paginar se envía el next_cursor de la respuesta anterior en `cursor` (offset se mantiene
+    por compatibilidad). Con include_total=false no se cuenta el total.
+    """
     try:
         query = db.query(Sale)
         
@@ -150,11 +159,26 @@ async def search_sales(
         if sale_number:
             query = query.filter(Sale.sale_number.ilike(f'%{sale_number}%'))
         
-        # Contar total
-        total_count = query.count()
+        filters = SaleSearchFilters(
+            start_date=start_date,
+            end_date=end_date,
+            customer_phone=customer_phone,
+            customer_name=customer_name,
+            cashier_id=cashier_id,
+            payment_method=payment_method,
+            status=status,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            sale_number=sale_number
+        )
+        
+        # Contar total (una vez por filtros, no en cada página)
+        total_count = cache.get_or_count("sales", filters.dict(), query.count, ["sales"]) if include_total else None
         
         # Obtener resultados paginados
-        sales = query.order_by(desc(Sale.created_at)).offset(offset).limit(limit).all()
+        sales, next_cursor = keyset_page(
+            query, (Sale.created_at, Sale.id), cursor, limit, descending=True, offset=offset
+        )
         
         # Formatear resultados
         results = []
@@ -184,26 +208,19 @@ async def search_sales(
         return SaleSearchResponse(
             total_results=total_count,
             results=results,
-            filters_applied=SaleSearchFilters(
-                start_date=start_date,
-                end_date=end_date,
-                customer_phone=customer_phone,
-                customer_name=customer_name,
-                cashier_id=cashier_id,
-                payment_method=payment_method,
-                status=status,
-                min_amount=min_amount,
-                max_amount=max_amount,
-                sale_number=sale_number
-            ),
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None,
+            filters_applied=filters,
             summary=summary
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sales search error: {str(e)}")
 
 @router.get("/{sale_id}", response_model=SaleResponse)
-async def get_sale(sale_id: int, db: Session = Depends(get_db)):
+def get_sale(sale_id: int, db: Session = Depends(get_db)):
     """Obtener venta específica"""
     sale = db.query(Sale).get(sale_id)
     if not sale:
@@ -212,7 +229,7 @@ async def get_sale(sale_id: int, db: Session = Depends(get_db)):
     return sale
 
 @router.put("/{sale_id}", response_model=SaleResponse)
-async def update_sale(
+def update_sale(
     sale_id: int,
     sale_update: SaleUpdate,
     db: Session = Depends(get_db)
@@ -226,13 +243,19 @@ async def update_sale(
         if sale.status in ['cancelled', 'refunded']:
             raise HTTPException(status_code=400, detail="Cannot update cancelled or refunded sale")
         
+        previous_status = sale.status
         update_data = sale_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(sale, field, value)
         
+        sales_manager = SalesManager(db)
+        sales_manager.sync_sale_rollups(sale, previous_status)
         db.commit()
+
+        # Un cambio de estado mueve los agregados: los reportes y métricas cacheados quedan viejos
+        sales_manager._clear_sales_cache()
         db.refresh(sale)
-        
+
         return sale
         
     except Exception as e:
@@ -240,7 +263,7 @@ async def update_sale(
         raise HTTPException(status_code=500, detail=f"Sale update error: {str(e)}")
 
 @router.post("/{sale_id}/cancel")
-async def cancel_sale(
+def cancel_sale(
     sale_id: int,
     reason: str,
     user_id: Optional[str] = None,
@@ -263,7 +286,7 @@ async def cancel_sale(
 # === DEVOLUCIONES ===
 
 @router.post("/refunds", response_model=RefundResponse)
-async def create_refund(
+def create_refund(
     refund_data: RefundCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -291,7 +314,7 @@ async def create_refund(
         raise HTTPException(status_code=500, detail=f"Refund creation error: {str(e)}")
 
 @router.get("/refunds/{refund_id}", response_model=RefundResponse)
-async def get_refund(refund_id: int, db: Session = Depends(get_db)):
+def get_refund(refund_id: int, db: Session = Depends(get_db)):
     """Obtener devolución específica"""
     refund = db.query(Refund).get(refund_id)
     if not refund:
@@ -302,7 +325,7 @@ async def get_refund(refund_id: int, db: Session = Depends(get_db)):
 # === CARRITO DE COMPRAS ===
 
 @router.post("/cart/validate")
-async def validate_cart(cart: Cart, db: Session = Depends(get_db)):
+def validate_cart(cart: Cart, db: Session = Depends(get_db)):
     """Validar carrito antes de procesar venta"""
     try:
         inventory_manager = InventoryManager(db)
@@ -376,9 +399,9 @@ async def validate_cart(cart: Cart, db: Session = Depends(get_db)):
 # === REPORTES ===
 
 @router.get("/reports/daily")
-async def get_daily_sales_report(
+def get_daily_sales_report(
     date: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Reporte de ventas diarias"""
     try:
@@ -395,9 +418,9 @@ async def get_daily_sales_report(
         raise HTTPException(status_code=500, detail=f"Daily report error: {str(e)}")
 
 @router.post("/reports/custom", response_model=SalesReportResponse)
-async def get_custom_sales_report(
+def get_custom_sales_report(
     report_filters: SalesReportFilters,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Reporte personalizado de ventas"""
     try:
@@ -418,74 +441,71 @@ async def get_custom_sales_report(
         raise HTTPException(status_code=500, detail=f"Custom report error: {str(e)}")
 
 @router.get("/metrics/realtime", response_model=RealTimeMetrics)
-async def get_realtime_metrics(db: Session = Depends(get_db)):
+def get_realtime_metrics(
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache)
+):
     """Métricas en tiempo real"""
     try:
-        cache = CacheService()
-        
-        # Verificar caché
-        cached_metrics = cache.get("realtime_metrics")
-        if cached_metrics:
-            return RealTimeMetrics(**json.loads(cached_metrics))
-        
-        # Calcular métricas
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow = today + timedelta(days=1)
-        current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
-        next_hour = current_hour + timedelta(hours=1)
-        
-        # Ventas de hoy
-        today_sales = db.query(Sale).filter(
-            Sale.created_at >= today,
-            Sale.created_at < tomorrow,
-            Sale.status == 'completed'
-        ).all()
-        
-        # Ventas de la hora actual
-        current_hour_sales = db.query(Sale).filter(
-            Sale.created_at >= current_hour,
-            Sale.created_at < next_hour,
-            Sale.status == 'completed'
-        ).count()
-        
-        # Reservas pendientes
-        from ..models.inventory import Reservation
-        pending_reservations = db.query(Reservation).filter(
-            Reservation.status == 'active',
-            Reservation.expires_at > datetime.now()
-        ).count()
-        
-        # Alertas de stock bajo
-        inventory_manager = InventoryManager(db)
-        low_stock_alerts = len(inventory_manager.get_low_stock_alerts())
-        
-        # Calcular métricas
-        today_revenue = sum(sale.total_amount for sale in today_sales)
-        today_profit = sum(sale.profit for sale in today_sales)
-        avg_sale_amount = today_revenue / len(today_sales) if today_sales else 0
-        
-        metrics = RealTimeMetrics(
-            today_sales_count=len(today_sales),
-            today_revenue=today_revenue,
-            today_profit=today_profit,
-            current_hour_sales=current_hour_sales,
-            average_sale_amount=avg_sale_amount,
-            pending_reservations=pending_reservations,
-            low_stock_alerts=low_stock_alerts,
-            active_cashiers=1,  # Se puede calcular dinámicamente
-            last_updated=datetime.now()
+        # Cachear por 1 minuto; al vencer se sirve el valor anterior mientras se recalcula
+        payload = cache.get_or_compute(
+            "realtime_metrics",
+            lambda: _build_realtime_metrics(db, cache),
+            expire=60,
+            tags=["sales"],
+            stale_ttl=settings.realtime_metrics_stale_ttl,
+            refresh=lambda: run_with_session(lambda session: _build_realtime_metrics(session, cache)),
+            raw=True
         )
         
-        # Cachear por 1 minuto
-        cache.setex("realtime_metrics", 60, json.dumps(metrics.dict(), default=str))
-        
-        return metrics
+        # _build_realtime_metrics ya validó con RealTimeMetrics; el JSON se responde tal cual
+        return Response(content=payload, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Metrics error: {str(e)}")
 
+def _build_realtime_metrics(db: Session, cache: CacheService) -> dict:
+    """Calcula las métricas del día y la hora actual"""
+    # Calcular métricas
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today + timedelta(days=1)
+    current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+    next_hour = current_hour + timedelta(hours=1)
+    
+    # Ventas de hoy y de la hora actual (una fila de rollup por método de pago y cajero)
+    today_totals = sales_rollup_totals(db, today, tomorrow)
+    current_hour_sales = sales_rollup_totals(db, current_hour, next_hour)['count']
+    
+    # Reservas pendientes
+    from ..models.inventory import Reservation
+    pending_reservations = db.query(Reservation).filter(
+        Reservation.status == 'active',
+        Reservation.expires_at > datetime.now()
+    ).count()
+    
+    # Alertas de stock bajo
+    inventory_manager = InventoryManager(db, cache)
+    low_stock_alerts = len(inventory_manager.get_low_stock_alerts())
+    
+    # Calcular métricas
+    avg_sale_amount = today_totals['revenue'] / today_totals['count'] if today_totals['count'] else 0
+    
+    metrics = RealTimeMetrics(
+        today_sales_count=today_totals['count'],
+        today_revenue=today_totals['revenue'],
+        today_profit=today_totals['profit'],
+        current_hour_sales=current_hour_sales,
+        average_sale_amount=avg_sale_amount,
+        pending_reservations=pending_reservations,
+        low_stock_alerts=low_stock_alerts,
+        active_cashiers=1,  # Se puede calcular dinámicamente
+        last_updated=datetime.now()
+    )
+
+    return metrics.dict()
+
 @router.get("/{sale_id}/receipt")
-async def get_sale_receipt(sale_id: int, db: Session = Depends(get_db)):
+def get_sale_receipt(sale_id: int, db: Session = Depends(get_db)):
     """Obtener datos para generar recibo"""
     try:
         sale = db.query(Sale).get(sale_id)
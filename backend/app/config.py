@@ -8,13 +8,61 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:///./inventario_ropa.db"
     database_test_url: str = "sqlite:///./inventario_test.db"
 
+    # Pool de conexiones (el de lectura atiende los reportes)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_read_pool_enabled: bool = True
+    db_read_pool_size: int = 5
+    db_read_max_overflow: int = 10
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 500       # Sentencias compiladas que SQLAlchemy reutiliza
+    db_application_name: str = "inventario_backend"
+
+    # Réplica de lectura opcional (reportes, búsqueda de ventas e inventario). Vacío = base principal
+    database_read_url: str = ""
+
+    # PostgreSQL: "postgresql://" usa este driver; psycopg 3 prepara consultas repetidas en el servidor
+    postgres_driver: str = "psycopg"
+    postgres_prepare_threshold: int = 5
+
+    # Perfil SQLite aplicado a cada conexión
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"       # Seguro con WAL; FULL solo sincroniza más a menudo
+    sqlite_cache_size_kb: int = 20000        # Caché de páginas por conexión
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout_ms: int = 5000       # Espera a que termine otro escritor en vez de fallar con "database is locked"
+
     # Redis
     redis_url: str = ""
 
+    # Caché: "auto" usa Redis si hay redis_url, si no memoria; también "memory", "redis" o "fake"
+    cache_backend: str = "auto"
+    cache_max_entries: int = 20000           # Límite de entradas del caché en memoria (0 = sin límite)
+    cache_max_bytes: int = 64 * 1024 * 1024  # Límite aproximado de bytes (0 = sin límite)
+    cache_eviction_policy: str = "lru"       # "lru" o "lfu"
+    cache_codec: str = "auto"                # "auto", "json", "orjson" o "msgpack"
+    cache_l1_enabled: bool = True            # Caché local por worker delante de Redis
+    cache_l1_max_entries: int = 5000
+    cache_l1_ttl: int = 30                   # Desactualización máxima si se pierde una invalidación
+    cache_invalidation_channel: str = "cache:invalidate"
+    cache_warmup_enabled: bool = True        # Precargar escaneos e inventario al iniciar
+    cache_warmup_limit: int = 5000           # Máximo de variantes precargadas (destacadas primero)
+    scan_negative_ttl: int = 60              # Segundos que se recuerda un código inexistente
+    code_index_enabled: bool = True          # Índice de códigos en memoria para los escaneos
+    code_index_max_age: int = 300            # Recarga completa periódica (respaldo si se pierde un aviso; 0 = nunca)
+    code_index_channel: str = "code_index:refresh"  # Avisos de cambios entre workers (con Redis)
+    # Segundos que se sirve un valor vencido mientras se recalcula en segundo plano (0 = desactivado)
+    dashboard_stale_ttl: int = 300
+    realtime_metrics_stale_ttl: int = 30
+
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     api_secret_key: str = "tu-clave-secreta-super-segura"
+    # Hilos para los handlers síncronos (cada uno usa una conexión de la base de datos)
+    threadpool_size: int = 40
 
     # Aplicación
     environment: str = "development"
@@ -23,6 +71,7 @@ class Settings(BaseSettings):
 
     # Paginación
     default_pagination_limit: int = 50
+    search_count_ttl: int = 60               # Segundos que se reutiliza el total exacto de un listado entre páginas
 
     # Seguridad
     access_token_expire_minutes: int = 30
@@ -33,6 +82,10 @@ class Settings(BaseSettings):
 
     # Campos adicionales del .env
     log_level: str = "INFO"
+    # Conteo de sentencias y tiempo de DB por petición (headers X-DB-* y log)
+    db_query_stats_enabled: bool = True
+    # Advertir cuando la misma forma de sentencia se repite más veces en una petición (N+1)
+    db_repeated_query_threshold: int = 10
     default_reservation_minutes: int = 30
     low_stock_threshold_percent: int = 20
     pos_terminal_id: str = "tablet-centro-bogota"
@@ -1,18 +1,109 @@
 # backend/app/database.py
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from .config import settings
 
-# Crear engine para SQLite
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False},  # Solo para SQLite
-    echo=settings.debug  # Mostrar SQL queries en desarrollo
-)
+
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _apply_sqlite_profile(engine: Engine, read_only: bool = False) -> None:
+    """Aplica los PRAGMA del perfil SQLite a cada conexión nueva"""
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # busy_timeout primero: los demás PRAGMA pueden esperar a un escritor
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        if not read_only:
+            # WAL queda guardado en el archivo: los lectores ya no se bloquean con cada venta
+            cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        # Valor negativo = KiB de caché de páginas por conexión
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA temp_store={settings.sqlite_temp_store}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _postgres_connect_args(url, read_only: bool) -> Dict[str, Any]:
+    connect_args = {'application_name': settings.db_application_name}
+    if url.get_driver_name() == "psycopg":
+        # psycopg 3 prepara en el servidor las consultas que se repiten en una conexión
+        connect_args['prepare_threshold'] = settings.postgres_prepare_threshold
+    if read_only:
+        connect_args['options'] = "-c default_transaction_read_only=on"
+    return connect_args
+
+
+def create_database_engine(database_url: str, read_only: bool = False) -> Engine:
+    """Crea el engine con el perfil y el pool del dialecto (SQLite o PostgreSQL)
+
+    Con read_only=True las sesiones no pueden escribir (pool aparte para reportes o réplica).
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    options = {
+        'echo': settings.debug,  # Mostrar SQL queries en desarrollo
+        'query_cache_size': settings.db_statement_cache_size
+    }
+    pool_options = {
+        'pool_size': settings.db_read_pool_size if read_only else settings.db_pool_size,
+        'max_overflow': settings.db_read_max_overflow if read_only else settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout
+    }
+
+    if backend == "sqlite":
+        options['connect_args'] = {"check_same_thread": False}
+        if _is_file_sqlite(url):
+            options.update(pool_options)
+            if read_only:
+                url = url.set(database=f"file:{url.database}", query={**url.query, 'mode': 'ro', 'uri': 'true'})
+    elif backend == "postgresql":
+        if url.drivername == "postgresql" and settings.postgres_driver:
+            url = url.set(drivername=f"postgresql+{settings.postgres_driver}")
+        options.update(pool_options)
+        options.update(
+            pool_pre_ping=True,  # Descarta conexiones que el servidor cerró
+            pool_recycle=settings.db_pool_recycle,
+            connect_args=_postgres_connect_args(url, read_only)
+        )
+
+    engine = create_engine(url, **options)
+    if backend == "sqlite":
+        _apply_sqlite_profile(engine, read_only)
+    return engine
+
+
+def _create_read_engine() -> Engine:
+    """Engine para sesiones de solo lectura: la réplica si hay una, si no un pool aparte del principal"""
+    if not settings.db_read_pool_enabled:
+        return engine
+    if settings.database_read_url:
+        return create_database_engine(settings.database_read_url, read_only=True)
+
+    url = make_url(settings.database_url)
+    if _is_file_sqlite(url) or url.get_backend_name() == "postgresql":
+        return create_database_engine(settings.database_url, read_only=True)
+    # Una base en memoria no se comparte entre conexiones
+    return engine
+
+
+# Engine principal (lecturas y escrituras)
+engine = create_database_engine(settings.database_url)
+
+# Engine de solo lectura para reportes y búsquedas: sus consultas no esperan conexiones ocupadas por ventas
+read_engine = _create_read_engine()
 
 # Crear SessionLocal
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base para los modelos
 Base = declarative_base()
@@ -23,4 +114,20 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Dependency para obtener sesión de solo lectura (reportes)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def run_with_session(func, read_only: bool = False):
+    """Ejecuta func(db) con una sesión propia (para tareas fuera de la petición)"""
+    db = ReadSessionLocal() if read_only else SessionLocal()
+    try:
+        return func(db)
+    finally:
+        db.close()
@@ -1,13 +1,19 @@
 # backend/app/main.py
+import asyncio
+import logging
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .database import engine
+from .database import engine, read_engine, run_with_session
+from .migrations import verify_schema_revision
 from .models import base  # Importar todos los modelos
-from .api import products, inventory, sales, reports
+from .api import products, inventory, sales, reports, admin
+from .services.cache_service import create_pubsub, get_cache_service
+from .services.code_index import connect_code_index_bus, get_code_index, install_code_index_hooks
+from .utils.query_stats import install_query_instrumentation, query_stats_middleware
 
-# Crear tablas si no existen
-base.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -25,13 +31,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-Repeated-Queries"],
 )
 
+# Sentencias y tiempo de base de datos por petición
+if settings.db_query_stats_enabled:
+    install_query_instrumentation(engine, read_engine)
+    app.middleware("http")(query_stats_middleware)
+
+# Los cambios confirmados en variantes y productos actualizan el índice de códigos
+if settings.code_index_enabled:
+    install_code_index_hooks()
+
 # Registrar routers
 app.include_router(products.router, prefix="/api")
 app.include_router(inventory.router, prefix="/api")
 app.include_router(sales.router, prefix="/api")
 app.include_router(reports.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 @app.on_event("startup")
 async def startup_event():
@@ -39,6 +56,55 @@ async def startup_event():
     print(f"✓ Sistema iniciado en {settings.api_host}:{settings.api_port}")
     print(f"✓ Entorno: {settings.environment}")
     print(f"✓ Debug: {settings.debug}")
+    
+    # El esquema lo crean las migraciones (alembic upgrade head); aquí solo se verifica la revisión
+    revision = verify_schema_revision()
+    print(f"✓ Esquema de base de datos en la revisión {revision}")
+    
+    # Los handlers con acceso a la base de datos son síncronos y corren en este threadpool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    
+    # La carga del índice y la precarga corren en hilos aparte para no retrasar que el servidor
+    # acepte peticiones; mientras tanto los escaneos consultan la base de datos
+    app.state.code_index = {'status': 'pending'}
+    if settings.code_index_enabled:
+        # Con Redis los workers se avisan los cambios confirmados del catálogo
+        bus = create_pubsub(settings.code_index_channel)
+        if bus is not None:
+            connect_code_index_bus(bus)
+        app.state.code_index_task = asyncio.get_running_loop().run_in_executor(None, load_code_index)
+    else:
+        app.state.code_index = {'status': 'disabled'}
+    
+    app.state.cache_warmup = {'status': 'pending'}
+    if settings.cache_warmup_enabled:
+        app.state.cache_warmup_task = asyncio.get_running_loop().run_in_executor(None, warm_up_cache)
+    else:
+        app.state.cache_warmup = {'status': 'disabled'}
+
+def load_code_index():
+    """Carga el índice de códigos de las variantes activas"""
+    app.state.code_index = {'status': 'running'}
+    try:
+        result = run_with_session(get_code_index().load, read_only=True)
+        app.state.code_index = {'status': 'completed', **result}
+        print(f"✓ Índice de códigos: {result['variants']} variantes en {result['duration_ms']} ms")
+    except Exception as e:
+        app.state.code_index = {'status': 'failed', 'error': str(e)}
+        logger.error(f"Code index load failed: {e}")
+
+def warm_up_cache():
+    """Precarga el caché de escaneos e inventario del catálogo activo"""
+    app.state.cache_warmup = {'status': 'running'}
+    try:
+        result = run_with_session(
+            lambda db: products.warm_scan_cache(db, get_cache_service(), settings.cache_warmup_limit)
+        )
+        app.state.cache_warmup = {'status': 'completed', **result}
+        print(f"✓ Caché precargado: {result['entries']} entradas en {result['duration_ms']} ms")
+    except Exception as e:
+        app.state.cache_warmup = {'status': 'failed', 'error': str(e)}
+        logger.error(f"Cache warm-up failed: {e}")
 
 @app.get("/")
 async def root():
@@ -53,10 +119,14 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Verificación de salud del sistema"""
+    cache_health = get_cache_service().health_check()
     return {
         "status": "healthy",
         "database": "connected",
-        "cache": "connected"
+        "cache": "connected" if cache_health['status'] == 'healthy' else "error",
+        "cache_storage": cache_health['storage_type'],
+        "cache_warmup": getattr(app.state, 'cache_warmup', None),
+        "code_index": {**(getattr(app.state, 'code_index', None) or {}), **get_code_index().stats()}
     }
 
 @app.get("/api/health")
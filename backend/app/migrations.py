@@ -0,0 +1,59 @@
+# backend/app/migrations.py
+"""Migraciones del esquema con Alembic
+
+El esquema se crea y actualiza con `alembic -c alembic/alembic.ini upgrade head` (o upgrade_to_head()).
+Al arrancar, la aplicación solo compara la revisión de la base con la última del repositorio.
+"""
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+from .database import engine as default_engine
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic" / "alembic.ini"
+
+
+class SchemaRevisionError(RuntimeError):
+    """La base de datos no está en la última revisión de las migraciones"""
+
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    # La aplicación configura su propio logging
+    config.attributes['configure_logger'] = False
+    return config
+
+
+def head_revision() -> Optional[str]:
+    """Última revisión en alembic/versions"""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine: Engine = default_engine) -> Optional[str]:
+    """Revisión registrada en la tabla alembic_version (None si la base no tiene migraciones)"""
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def verify_schema_revision(engine: Engine = default_engine) -> str:
+    """Falla si la base no está en la última revisión; no toca el esquema"""
+    current = current_revision(engine)
+    head = head_revision()
+    if current != head:
+        raise SchemaRevisionError(
+            f"Database schema is at revision {current or 'none'}, expected {head}. "
+            f"Run: alembic -c alembic/alembic.ini upgrade head "
+            f"(for a database created before migrations existed: alembic -c alembic/alembic.ini stamp 0001)"
+        )
+    return current
+
+
+def upgrade_to_head(engine: Engine = default_engine) -> None:
+    """Aplica las migraciones pendientes usando el engine de la aplicación"""
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes['connection'] = connection
+        command.upgrade(config, "head")
@@ -63,6 +63,7 @@ class Inventory(TimeStampedModel):
         Index('idx_variant_location', 'variant_id', 'location_id'),
         Index('idx_location_quantity', 'location_id', 'quantity'),
         Index('idx_variant_active', 'variant_id', 'is_active'),
+        Index('idx_inventory_location_id', 'location_id', 'id'),  # Paginación por cursor
     )
     
     @property
@@ -80,6 +81,26 @@ class Inventory(TimeStampedModel):
         """Indica si está sobrecargado"""
         return self.quantity >= self.max_stock
 
+class VariantStock(TimeStampedModel):
+    """Totales de stock por variante (todas las ubicaciones activas)
+
+    InventoryManager los actualiza en la misma transacción que cada movimiento, así que un
+    escaneo o un filtro "en stock" lee una fila en vez de sumar el inventario por ubicación.
+    reconcile_variant_stock() los compara con el inventario y corrige diferencias.
+    """
+    __tablename__ = "variant_stock"
+    
+    variant_id = Column(Integer, ForeignKey("product_variants.id"), primary_key=True)
+    on_hand = Column(Integer, default=0, nullable=False)     # Suma de quantity
+    reserved = Column(Integer, default=0, nullable=False)    # Suma de reserved_quantity
+    available = Column(Integer, default=0, nullable=False)   # on_hand - reserved
+    
+    # Relaciones
+    variant = relationship("ProductVariant", back_populates="stock")
+    
+    def __repr__(self):
+        return f"<VariantStock(variant_id={self.variant_id}, on_hand={self.on_hand}, available={self.available})>"
+
 class InventoryMovement(TimeStampedModel):
     """Modelo para movimientos de inventario"""
     __tablename__ = "inventory_movements"
@@ -109,6 +130,7 @@ class InventoryMovement(TimeStampedModel):
     __table_args__ = (
         Index('idx_inventory_movement', 'inventory_id', 'created_at'),
         Index('idx_movement_type_date', 'movement_type', 'created_at'),
+        Index('idx_movement_created_id', 'created_at', 'id'),  # Paginación por cursor
     )
 
 class Reservation(TimeStampedModel):
@@ -87,6 +87,7 @@ class ProductVariant(TimeStampedModel):
     # Relaciones
     product = relationship("Product", back_populates="variants")
     inventory = relationship("Inventory", back_populates="variant", cascade="all, delete-orphan")
+    stock = relationship("VariantStock", back_populates="variant", uselist=False, cascade="all, delete-orphan")
     
     # Índices optimizados para búsquedas frecuentes
     __table_args__ = (
@@ -112,11 +113,15 @@ class ProductVariant(TimeStampedModel):
     @property
     def total_stock(self):
         """Stock total en todas las ubicaciones"""
+        if self.stock is not None:
+            return self.stock.on_hand
         return sum(inv.quantity for inv in self.inventory if inv.is_active)
     
     @property
     def available_stock(self):
         """Stock disponible (no reservado)"""
+        if self.stock is not None:
+            return self.stock.available
         return sum(inv.available_quantity for inv in self.inventory if inv.is_active)
     
     def __repr__(self):
@@ -0,0 +1,64 @@
+# backend/app/models/profiles.py
+"""Perfiles de carga de relaciones para los listados
+
+Cada perfil retorna las opciones de carga de un grafo de modelos, para que un listado haga
+un número fijo de consultas en vez de una por fila:
+
+    db.query(Inventory).options(*inventory_with_variant_product_location())
+
+Si la consulta ya hace join con las tablas del grafo, joined=True reutiliza ese join
+(contains_eager) en lugar de agregar otro.
+"""
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from .product import ProductVariant
+from .inventory import Inventory, InventoryMovement, VariantStock
+from .sale import Sale, SaleItem
+
+
+def inventory_with_variant_product_location(joined: bool = False) -> tuple:
+    """Inventory -> variant -> product, e Inventory -> location (muchos a uno: un solo SELECT)"""
+    if joined:
+        return (
+            contains_eager(Inventory.variant).contains_eager(ProductVariant.product),
+            contains_eager(Inventory.location)
+        )
+    return (
+        joinedload(Inventory.variant).joinedload(ProductVariant.product),
+        joinedload(Inventory.location)
+    )
+
+
+def variant_with_product(joined: bool = False) -> tuple:
+    """ProductVariant -> product"""
+    if joined:
+        return (contains_eager(ProductVariant.product),)
+    return (joinedload(ProductVariant.product),)
+
+
+def variant_with_product_and_stock(joined: bool = False) -> tuple:
+    """ProductVariant -> product y sus totales de stock (joined=True espera un outerjoin a VariantStock)"""
+    if joined:
+        return (contains_eager(ProductVariant.product), contains_eager(ProductVariant.stock))
+    return (joinedload(ProductVariant.product), joinedload(ProductVariant.stock))
+
+
+def inventory_with_location(joined: bool = False) -> tuple:
+    """Inventory -> location"""
+    if joined:
+        return (contains_eager(Inventory.location),)
+    return (joinedload(Inventory.location),)
+
+
+def movement_with_inventory(joined: bool = False) -> tuple:
+    """InventoryMovement -> inventory_item"""
+    if joined:
+        return (contains_eager(InventoryMovement.inventory_item),)
+    return (joinedload(InventoryMovement.inventory_item),)
+
+
+def sale_with_items(with_variants: bool = False) -> tuple:
+    """Sale -> items en un SELECT ... IN adicional; con with_variants también variante y producto"""
+    items = selectinload(Sale.items)
+    if with_variants:
+        return (items.joinedload(SaleItem.variant).joinedload(ProductVariant.product),)
+    return (items,)
@@ -1,5 +1,5 @@
 # backend/app/models/sale.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Index, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Index, DateTime, Date, JSON, PrimaryKeyConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import TimeStampedModel
@@ -23,6 +23,9 @@ class Sale(TimeStampedModel):
     discount_percentage = Column(Float, nullable=False, default=0)
     tax_amount = Column(Float, nullable=False, default=0)
     total_amount = Column(Float, nullable=False)
+    # Guardados al crear la venta y netos de devoluciones y cancelación: los reportes los suman en SQL
+    profit = Column(Float, nullable=False, default=0)
+    total_items = Column(Integer, nullable=False, default=0)
     
     # Estado de la venta
     status = Column(String(20), default="completed")  # "pending", "completed", "cancelled", "refunded"
@@ -52,18 +55,9 @@ class Sale(TimeStampedModel):
         Index('idx_sale_number', 'sale_number'),
         Index('idx_customer_phone', 'customer_phone'),
         Index('idx_cashier_date', 'cashier_id', 'created_at'),
+        Index('idx_sale_created_id', 'created_at', 'id'),  # Paginación por cursor
     )
     
-    @property
-    def total_items(self):
-        """Total de artículos vendidos"""
-        return sum(item.quantity for item in self.items)
-    
-    @property
-    def profit(self):
-        """Ganancia total de la venta"""
-        return sum(item.profit for item in self.items)
-    
     def __repr__(self):
         return f"<Sale(number='{self.sale_number}', total={self.total_amount})>"
 
@@ -198,4 +192,41 @@ class RefundItem(TimeStampedModel):
     __table_args__ = (
         Index('idx_refund_items', 'refund_id'),
         Index('idx_sale_item_refund', 'sale_item_id'),
-    )
\ No newline at end of file
+    )
+
+class SalesRollup(TimeStampedModel):
+    """Totales de ventas completadas por período, método de pago y cajero
+
+    SalesManager los actualiza en la misma transacción que cada venta, cancelación y devolución
+    (por created_at de la venta), así que un reporte de un año lee filas por día en vez de
+    todas las ventas. rebuild_sales_rollups() los recalcula desde sales.
+    """
+    __abstract__ = True
+    
+    payment_method = Column(String(20), nullable=False)
+    cashier_id = Column(String(50), nullable=False, default='')  # '' = sin cajero (NULL no sirve en la clave)
+    
+    sales_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)  # Suma de total_amount
+    profit = Column(Float, nullable=False, default=0)
+    items = Column(Integer, nullable=False, default=0)
+
+class SalesRollupHourly(SalesRollup):
+    """Totales por hora"""
+    __tablename__ = "sales_rollup_hourly"
+    
+    bucket = Column(DateTime, nullable=False)  # Inicio de la hora
+    
+    __table_args__ = (
+        PrimaryKeyConstraint('bucket', 'payment_method', 'cashier_id'),
+    )
+
+class SalesRollupDaily(SalesRollup):
+    """Totales por día"""
+    __tablename__ = "sales_rollup_daily"
+    
+    bucket = Column(Date, nullable=False)
+    
+    __table_args__ = (
+        PrimaryKeyConstraint('bucket', 'payment_method', 'cashier_id'),
+    )
@@ -167,8 +167,10 @@ class InventorySearchResult(BaseModel):
     last_movement_date: Optional[datetime] = None
 
 class InventorySearchResponse(BaseModel):
-    total_results: int
+    total_results: Optional[int] = None  # None con include_total=false
     results: List[InventorySearchResult]
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (None en la última)
+    has_more: bool = False
     filters_applied: InventorySearchFilters
     summary: Dict[str, Any]
 
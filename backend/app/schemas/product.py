@@ -2,6 +2,7 @@
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import unicodedata
 
 # Esquemas base
 class ProductBase(BaseModel):
@@ -122,6 +123,9 @@ class ScanInput(BaseModel):
     code: str = Field(..., min_length=1, max_length=50)
     scan_type: Optional[str] = None  # "barcode", "shortcode", "manual"
 
+class BatchScanInput(BaseModel):
+    codes: List[str] = Field(..., min_items=1, max_items=500)
+
 class ProductSearchFilters(BaseModel):
     query: Optional[str] = None
     category: Optional[str] = None
@@ -137,6 +141,20 @@ class ProductSearchFilters(BaseModel):
     max_price: Optional[float] = None
     location_id: Optional[int] = None
 
+    def normalized(self) -> "ProductSearchFilters":
+        """Forma canónica: búsquedas equivalentes (mayúsculas, espacios, orden de términos) quedan iguales"""
+        data = self.dict()
+        for field, value in data.items():
+            if isinstance(value, str):
+                value = ' '.join(unicodedata.normalize('NFC', value).lower().split())
+                data[field] = value or None
+
+        # Los términos se combinan con AND, así que el orden y los repetidos no cambian el resultado
+        if data['query']:
+            data['query'] = ' '.join(sorted(set(data['query'].split())))
+
+        return ProductSearchFilters(**data)
+
 class ProductSearchResult(BaseModel):
     variant_id: int
     product_name: str
@@ -161,6 +179,16 @@ class ProductScanResponse(BaseModel):
     suggestions: List[ProductSearchResult] = []
     alternatives: List[ProductSearchResult] = []
 
+class BatchScanResult(ProductScanResponse):
+    code: str
+
+class BatchScanResponse(BaseModel):
+    results: List[BatchScanResult]  # Uno por código, en el mismo orden
+    total_codes: int
+    found: int
+    not_found: int
+    scan_time_ms: float
+
 class QuickSearchResponse(BaseModel):
     query: str
     total_results: int
@@ -157,8 +157,10 @@ class SaleSearchResult(BaseModel):
     completed_at: Optional[datetime] = None
 
 class SaleSearchResponse(BaseModel):
-    total_results: int
+    total_results: Optional[int] = None  # None con include_total=false
     results: List[SaleSearchResult]
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (None en la última)
+    has_more: bool = False
     filters_applied: SaleSearchFilters
     summary: Dict[str, Any]
 
@@ -0,0 +1,128 @@
+# backend/app/services/cache_codec.py
+import json
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+try:  # Dependencias opcionales: se usan si están instaladas
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def _default(value: Any) -> Any:
+    """Convierte los tipos que los serializadores no conocen (mismo formato que la respuesta JSON)"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def dumps_json(value: Any) -> bytes:
+    """Serializa a JSON en bytes con el codificador más rápido disponible"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class CacheCodec:
+    """Formato en que se guardan los valores del caché"""
+
+    name = "abstract"
+    # Si el payload guardado ya es JSON puede enviarse al cliente sin decodificarlo
+    is_json = False
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+    def to_json(self, payload: bytes) -> bytes:
+        """Payload listo para responder como application/json"""
+        if self.is_json:
+            return payload
+        return dumps_json(self.decode(payload))
+
+
+class JsonCodec(CacheCodec):
+    """JSON de la librería estándar (siempre disponible)"""
+
+    name = "json"
+    is_json = True
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec(CacheCodec):
+    """JSON con orjson: mismo formato, varias veces más rápido"""
+
+    name = "orjson"
+    is_json = True
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(CacheCodec):
+    """MessagePack: más compacto, pero requiere convertir a JSON al responder"""
+
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_default, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+_CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+    'msgpack': MsgpackCodec
+}
+
+
+def create_codec(name: Optional[str] = None) -> CacheCodec:
+    """Crea el codec configurado ("auto", "json", "orjson" o "msgpack")"""
+    name = (name or "auto").lower()
+
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+
+    codec_class = _CODECS.get(name)
+    if codec_class is None:
+        raise ValueError(f"Unknown cache codec: {name}")
+
+    try:
+        return codec_class()
+    except ImportError as e:
+        logger.warning(f"Cache codec {name} unavailable ({e}), falling back to json")
+        return JsonCodec()
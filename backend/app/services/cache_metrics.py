@@ -0,0 +1,209 @@
+# backend/app/services/cache_metrics.py
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple
+
+# Límites superiores (segundos) de los buckets de latencia
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25
+)
+
+
+def key_namespace(key: str) -> str:
+    """Prefijo de la clave ("scan", "search", "inventory_info"...) usado para agrupar métricas"""
+    return key.split(':', 1)[0]
+
+
+class LatencyHistogram:
+    """Histograma acumulativo de latencias con buckets fijos"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # El último bucket es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cota superior del bucket donde cae el cuantil q (None si no hay datos)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = []
+        seen = 0
+        for bucket_count in self.counts:
+            seen += bucket_count
+            cumulative.append(seen)
+        return {
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], cumulative)),
+            'sum': self.sum,
+            'count': self.count,
+            'p50_ms': _to_ms(self.quantile(0.5)),
+            'p99_ms': _to_ms(self.quantile(0.99))
+        }
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    if seconds is None or seconds == float('inf'):
+        return None
+    return round(seconds * 1000, 3)
+
+
+class _NamespaceMetrics:
+    """Contadores e histogramas de un prefijo de clave"""
+
+    COUNTERS = ('hits', 'misses', 'sets', 'invalidations')
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.bytes_written = 0
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+
+
+class CacheMetrics:
+    """Métricas del caché por namespace de clave, dentro del proceso
+
+    Con varios workers cada uno reporta sus propias cifras; Prometheus las suma al agregarlas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, _NamespaceMetrics] = {}
+        self._tag_invalidations: Dict[str, int] = {}
+
+    def _namespace(self, key: str) -> _NamespaceMetrics:
+        namespace = key_namespace(key)
+        metrics = self._namespaces.get(namespace)
+        if metrics is None:
+            metrics = self._namespaces.setdefault(namespace, _NamespaceMetrics())
+        return metrics
+
+    def observe_get(self, key: str, seconds: float, hit: bool) -> None:
+        with self._lock:
+            metrics = self._namespace(key)
+            metrics.counters['hits' if hit else 'misses'] += 1
+            metrics.get_latency.observe(seconds)
+
+    def observe_set(self, key: str, seconds: float, size: int) -> None:
+        with self._lock:
+            metrics = self._namespace(key)
+            metrics.counters['sets'] += 1
+            metrics.bytes_written += size
+            metrics.set_latency.observe(seconds)
+
+    def record_invalidation(self, key: str) -> None:
+        """Una entrada borrada o descartada porque alguna de sus etiquetas cambió"""
+        with self._lock:
+            self._namespace(key).counters['invalidations'] += 1
+
+    def record_tag_invalidation(self, tag: str) -> None:
+        with self._lock:
+            family = key_namespace(tag)
+            self._tag_invalidations[family] = self._tag_invalidations.get(family, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._namespaces.clear()
+            self._tag_invalidations.clear()
+
+    def snapshot(self, usage: Optional[Dict[str, Dict[str, int]]] = None,
+                 histograms: bool = True) -> Dict[str, Any]:
+        """Cifras por namespace, combinadas con la ocupación que reporta el backend"""
+        usage = usage or {}
+        with self._lock:
+            names = set(self._namespaces) | set(usage)
+            namespaces = {}
+            for name in sorted(names):
+                metrics = self._namespaces.get(name) or _NamespaceMetrics()
+                held = usage.get(name, {})
+                lookups = metrics.counters['hits'] + metrics.counters['misses']
+                entry = {
+                    **metrics.counters,
+                    'hit_ratio': round(metrics.counters['hits'] / lookups, 4) if lookups else 0.0,
+                    'evictions': held.get('evictions', 0),
+                    'entries': held.get('entries'),
+                    'bytes': held.get('bytes'),
+                    'bytes_written': metrics.bytes_written
+                }
+                if histograms:
+                    entry['get_latency'] = metrics.get_latency.snapshot()
+                    entry['set_latency'] = metrics.set_latency.snapshot()
+                namespaces[name] = entry
+
+            return {
+                'namespaces': namespaces,
+                'tag_invalidations': dict(self._tag_invalidations)
+            }
+
+
+def _labels(**labels: Any) -> str:
+    body = ','.join(f'{name}="{str(value)}"' for name, value in labels.items())
+    return f'{{{body}}}'
+
+
+def format_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Convierte un snapshot de CacheMetrics al formato de texto de Prometheus"""
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+
+    namespaces = snapshot['namespaces']
+
+    metric("cache_requests_total", "counter", "Cache lookups by key namespace and result", [
+        (_labels(namespace=ns, result=result), data[counter])
+        for ns, data in namespaces.items()
+        for result, counter in (('hit', 'hits'), ('miss', 'misses'))
+    ])
+    for counter, help_text in (
+        ('sets', "Cache writes by key namespace"),
+        ('invalidations', "Entries deleted or discarded by a tag invalidation"),
+        ('evictions', "Entries evicted by the size limit of the in-process store"),
+        ('bytes_written', "Serialized bytes written by key namespace")
+    ):
+        metric(f"cache_{counter}_total", "counter", help_text, [
+            (_labels(namespace=ns), data[counter]) for ns, data in namespaces.items()
+        ])
+    for gauge, help_text in (
+        ('entries', "Entries held in the in-process store"),
+        ('bytes', "Approximate bytes held in the in-process store")
+    ):
+        metric(f"cache_{gauge}", "gauge", help_text, [
+            (_labels(namespace=ns), data[gauge]) for ns, data in namespaces.items() if data[gauge] is not None
+        ])
+
+    lines.append("# HELP cache_operation_duration_seconds Cache get/set latency")
+    lines.append("# TYPE cache_operation_duration_seconds histogram")
+    for ns, data in namespaces.items():
+        for operation in ('get', 'set'):
+            histogram = data.get(f'{operation}_latency')
+            if not histogram:
+                continue
+            for bound, count in histogram['buckets'].items():
+                labels = _labels(namespace=ns, operation=operation, le=bound)
+                lines.append(f"cache_operation_duration_seconds_bucket{labels} {count}")
+            labels = _labels(namespace=ns, operation=operation)
+            lines.append(f"cache_operation_duration_seconds_sum{labels} {histogram['sum']}")
+            lines.append(f"cache_operation_duration_seconds_count{labels} {histogram['count']}")
+
+    metric("cache_tag_invalidations_total", "counter", "Tag generation bumps by tag family", [
+        (_labels(tag=tag), count) for tag, count in snapshot['tag_invalidations'].items()
+    ])
+
+    return '\n'.join(lines) + '\n'
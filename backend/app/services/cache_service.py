@@ -1,170 +1,1108 @@
 # backend/app/services/cache_service.py
 import json
 import time
-from typing import Any, Optional, Dict, List, Union
+import uuid
+import hashlib
+import fnmatch
+import threading
+from typing import Any, Optional, Dict, List, Union, Callable
 from datetime import datetime, timedelta
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
 import logging
 
+from ..config import settings
+from .cache_codec import CacheCodec, JsonCodec, create_codec, dumps_json
+from .cache_metrics import CacheMetrics, key_namespace
+
 logger = logging.getLogger(__name__)
 
-class CacheService:
-    """Servicio de caché usando memoria local (sin Redis para desarrollo)"""
-    
+
+class CacheBackend:
+    """Interfaz común para los almacenamientos del caché"""
+
+    storage_type = "abstract"
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        """Establece el valor solo si la clave no existe"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def expire(self, key: str, seconds: int) -> bool:
+        raise NotImplementedError
+
+    def ttl(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        return {}
+
+    def namespace_usage(self) -> Dict[str, Dict[str, int]]:
+        """Entradas, bytes y desalojos por namespace de clave (si el almacenamiento los conoce)"""
+        return {}
+
+
+class _LRUPolicy:
+    """Orden de desalojo por uso más reciente (O(1))"""
+
     def __init__(self):
-        # Cache en memoria para desarrollo
+        self._order = OrderedDict()
+
+    def add(self, key: str):
+        self._order[key] = None
+
+    def touch(self, key: str):
+        self._order.move_to_end(key)
+
+    def remove(self, key: str):
+        self._order.pop(key, None)
+
+    def victim(self) -> Optional[str]:
+        return next(iter(self._order), None)
+
+    def clear(self):
+        self._order.clear()
+
+
+class _LFUPolicy:
+    """Orden de desalojo por frecuencia de uso, con LRU dentro de cada frecuencia (O(1))"""
+
+    def __init__(self):
+        self._freq = {}
+        self._buckets = {}
+        self._min_freq = 0
+
+    def add(self, key: str):
+        self._freq[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_freq = 1
+
+    def touch(self, key: str):
+        freq = self._freq[key]
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def remove(self, key: str):
+        freq = self._freq.pop(key, None)
+        if freq is None:
+            return
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = min(self._buckets) if self._buckets else 0
+
+    def victim(self) -> Optional[str]:
+        bucket = self._buckets.get(self._min_freq)
+        return next(iter(bucket), None) if bucket else None
+
+    def clear(self):
+        self._freq.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+
+
+class _TimingWheel:
+    """Rueda de tiempo para encontrar claves expiradas en O(1) amortizado"""
+
+    def __init__(self, slots: int = 3600, tick: float = 1.0):
+        self._slots = [set() for _ in range(slots)]
+        self._tick = tick
+        self._cursor = None
+
+    def _slot_of(self, expires_at: float) -> int:
+        return int(expires_at // self._tick) % len(self._slots)
+
+    def schedule(self, key: str, expires_at: float):
+        self._slots[self._slot_of(expires_at)].add(key)
+
+    def advance(self, now: float, expiry: Dict[str, float]) -> List[str]:
+        """Recorre los slots vencidos desde la última llamada y devuelve las claves expiradas"""
+        current = int(now // self._tick)
+        if self._cursor is None:
+            self._cursor = current
+        if current <= self._cursor:
+            # El tick actual aún no termina; get() verifica la expiración de forma perezosa
+            return []
+
+        expired = []
+        steps = min(current - self._cursor, len(self._slots))
+        for step in range(steps):
+            index = (self._cursor + step) % len(self._slots)
+            slot = self._slots[index]
+            for key in list(slot):
+                expires_at = expiry.get(key)
+                if expires_at is None or self._slot_of(expires_at) != index:
+                    # La clave se borró o se reprogramó en otro slot
+                    slot.discard(key)
+                elif expires_at <= now:
+                    slot.discard(key)
+                    expired.append(key)
+        self._cursor = current
+        return expired
+
+    def clear(self):
+        for slot in self._slots:
+            slot.clear()
+        self._cursor = None
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Almacenamiento en memoria del proceso, acotado por entradas/bytes y con expiración activa"""
+
+    storage_type = "memory"
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 policy: str = "lru", clock: Callable[[], float] = time.time,
+                 wheel_slots: int = 3600, wheel_tick: float = 1.0):
         self._cache = {}
         self._expiry = {}
-        self.is_available = True
-        logger.info("Cache service initialized with memory storage")
-    
-    def get(self, key: str) -> Optional[str]:
-        """Obtiene un valor del caché"""
-        try:
+        self._sizes = {}
+        self._bytes = 0
+        self._usage = {}
+        self._clock = clock
+        self._lock = threading.RLock()
+        self.max_entries = max_entries or None
+        self.max_bytes = max_bytes or None
+        self.policy_name = policy.lower()
+        if self.policy_name not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache eviction policy: {policy}")
+        self._policy = _LFUPolicy() if self.policy_name == "lfu" else _LRUPolicy()
+        self._wheel = _TimingWheel(wheel_slots, wheel_tick)
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_size(key: str, value: bytes) -> int:
+        """Tamaño aproximado en bytes de una entrada"""
+        return len(key) + len(value)
+
+    def _is_expired(self, key: str) -> bool:
+        return key in self._expiry and self._clock() >= self._expiry[key]
+
+    def _namespace_usage(self, key: str) -> Dict[str, int]:
+        namespace = key_namespace(key)
+        usage = self._usage.get(namespace)
+        if usage is None:
+            usage = self._usage[namespace] = {'entries': 0, 'bytes': 0, 'evictions': 0}
+        return usage
+
+    def _remove(self, key: str) -> bool:
+        if key not in self._cache:
+            return False
+        del self._cache[key]
+        self._expiry.pop(key, None)
+        size = self._sizes.pop(key, 0)
+        self._bytes -= size
+        usage = self._namespace_usage(key)
+        usage['entries'] -= 1
+        usage['bytes'] -= size
+        self._policy.remove(key)
+        return True
+
+    def _sweep(self):
+        """Elimina las claves cuyo slot de expiración ya pasó"""
+        for key in self._wheel.advance(self._clock(), self._expiry):
+            if self._remove(key):
+                self.expirations += 1
+
+    def _evict_if_needed(self):
+        """Desaloja entradas según la política hasta respetar los límites"""
+        while self._cache and (
+            (self.max_entries and len(self._cache) > self.max_entries) or
+            (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            victim = self._policy.victim()
+            if victim is None:
+                break
+            self._remove(victim)
+            self.evictions += 1
+            self._namespace_usage(victim)['evictions'] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            self._sweep()
+            if key not in self._cache:
+                return None
             # Verificar si la clave ha expirado
-            if key in self._expiry and time.time() > self._expiry[key]:
-                self.delete(key)
+            if self._is_expired(key):
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._policy.touch(key)
+            return self._cache[key]
+
+    def set(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        with self._lock:
+            self._sweep()
+            usage = self._namespace_usage(key)
+            if key in self._cache:
+                self._bytes -= self._sizes[key]
+                usage['bytes'] -= self._sizes[key]
+                self._policy.touch(key)
+            else:
+                self._policy.add(key)
+                usage['entries'] += 1
+
+            self._cache[key] = value
+            self._sizes[key] = self._entry_size(key, value)
+            self._bytes += self._sizes[key]
+            usage['bytes'] += self._sizes[key]
+
+            if expire:
+                self._expiry[key] = self._clock() + expire
+                self._wheel.schedule(key, self._expiry[key])
+            else:
+                self._expiry.pop(key, None)
+
+            self._evict_if_needed()
+            return True
+
+    def add(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        with self._lock:
+            if self.exists(key):
+                return False
+            return self.set(key, value, expire)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        with self._lock:
+            return [key for key in self._cache if fnmatch.fnmatch(key, pattern) and not self._is_expired(key)]
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self._cache and not self._is_expired(key)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if key in self._cache:
+                self._expiry[key] = self._clock() + seconds
+                self._wheel.schedule(key, self._expiry[key])
+                return True
+            return False
+
+    def ttl(self, key: str) -> int:
+        with self._lock:
+            if key in self._expiry:
+                remaining = self._expiry[key] - self._clock()
+                return int(remaining) if remaining > 0 else -1
+            return -1
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            new_value = int(self.get(key) or 0) + amount
+            remaining = self._expiry.get(key)
+            self.set(key, str(new_value).encode())
+            if remaining is not None:
+                # INCR conserva la expiración, igual que en Redis
+                self._expiry[key] = remaining
+                self._wheel.schedule(key, remaining)
+            return new_value
+
+    def sweep_expired(self) -> int:
+        """Fuerza una pasada de la rueda de expiración y retorna cuántas claves eliminó"""
+        with self._lock:
+            before = self.expirations
+            self._sweep()
+            return self.expirations - before
+
+    def size(self) -> int:
+        return len(self._cache)
+
+    def memory_usage(self) -> int:
+        """Bytes aproximados ocupados por claves y valores"""
+        return self._bytes
+
+    def namespace_usage(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {namespace: dict(usage) for namespace, usage in self._usage.items()}
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._cache),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'eviction_policy': self.policy_name,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def flush(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._expiry.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._usage.clear()
+            self._policy.clear()
+            self._wheel.clear()
+
+
+class FakeCacheBackend(MemoryCacheBackend):
+    """Backend en memoria con reloj manual, pensado para pruebas"""
+
+    storage_type = "fake"
+
+    def __init__(self, start: float = 0.0, **kwargs):
+        self.now = start
+        super().__init__(clock=lambda: self.now, **kwargs)
+
+    def advance(self, seconds: float) -> None:
+        """Avanza el reloj simulado"""
+        self.now += seconds
+
+
+class RedisCacheBackend(CacheBackend):
+    """Almacenamiento compartido en Redis"""
+
+    storage_type = "redis"
+
+    def __init__(self, url: str):
+        import redis  # Dependencia opcional: solo se necesita con Redis
+
+        # Los valores son bytes (pueden no ser UTF-8, p. ej. msgpack)
+        self._client = redis.Redis.from_url(url, decode_responses=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        return bool(self._client.set(key, value, ex=expire or None))
+
+    def add(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        return bool(self._client.set(key, value, ex=expire or None, nx=True))
+
+    def delete(self, key: str) -> bool:
+        return bool(self._client.delete(key))
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        return [key.decode('utf-8') for key in self._client.scan_iter(match=pattern, count=500)]
+
+    def exists(self, key: str) -> bool:
+        return bool(self._client.exists(key))
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return bool(self._client.expire(key, seconds))
+
+    def ttl(self, key: str) -> int:
+        remaining = self._client.ttl(key)
+        return remaining if remaining > 0 else -1
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return int(self._client.incrby(key, amount))
+
+    def size(self) -> int:
+        return int(self._client.dbsize())
+
+    def flush(self) -> None:
+        self._client.flushdb()
+
+    def ping(self) -> bool:
+        return bool(self._client.ping())
+
+    def info(self) -> Dict[str, Any]:
+        memory = self._client.info('memory')
+        return {
+            'entries': self.size(),
+            'bytes': memory.get('used_memory'),
+            'max_bytes': memory.get('maxmemory') or None,
+            'eviction_policy': memory.get('maxmemory_policy')
+        }
+
+
+class LocalPubSub:
+    """Canal de invalidación dentro del proceso (sustituto de Redis pub/sub para pruebas)"""
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def publish(self, message: bytes) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(message)
+
+    def subscribe(self, callback: Callable[[bytes], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def close(self) -> None:
+        with self._lock:
+            self._subscribers.clear()
+
+
+class RedisPubSub:
+    """Canal de invalidación sobre Redis pub/sub, compartido por todos los workers"""
+
+    def __init__(self, client, channel: str):
+        self._client = client
+        self._channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def publish(self, message: bytes) -> None:
+        self._client.publish(self._channel, message)
+
+    def subscribe(self, callback: Callable[[bytes], None]) -> None:
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self._channel: lambda event: callback(event['data'])})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+class TieredCacheBackend(CacheBackend):
+    """Caché en dos niveles: memoria del worker (L1) delante de un almacenamiento compartido (L2)
+
+    Las escrituras van a L2 y se anuncian por el canal de invalidación para que los
+    demás workers descarten su copia en L1. Las copias en L1 viven como máximo
+    `l1_ttl` segundos, lo que acota la desactualización si se pierde un mensaje.
+    """
+
+    storage_type = "tiered"
+    FLUSH_ALL = "*"
+
+    def __init__(self, l1: MemoryCacheBackend, l2: CacheBackend, bus, l1_ttl: int = 30):
+        self.l1 = l1
+        self.l2 = l2
+        self.bus = bus
+        self.l1_ttl = l1_ttl
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self._origin = uuid.uuid4().hex[:12]
+        self.bus.subscribe(self._on_invalidation)
+
+    def _publish(self, *keys: str) -> None:
+        """Anuncia a los demás workers las claves que deben salir de su L1"""
+        try:
+            self.bus.publish(json.dumps({'origin': self._origin, 'keys': list(keys)}).encode())
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
+    def _on_invalidation(self, message: bytes) -> None:
+        event = json.loads(message)
+        if event.get('origin') == self._origin:
+            return
+        for key in event.get('keys', []):
+            if key == self.FLUSH_ALL:
+                self.l1.flush()
+            else:
+                self.l1.delete(key)
+
+    def _fill_l1(self, key: str, value: bytes) -> None:
+        remaining = self.l2.ttl(key)
+        self.l1.set(key, value, min(remaining, self.l1_ttl) if remaining > 0 else self.l1_ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.l1.get(key)
+        if value is not None:
+            self.l1_hits += 1
+            return value
+
+        value = self.l2.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.l2_hits += 1
+        self._fill_l1(key, value)
+        return value
+
+    def set(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        result = self.l2.set(key, value, expire)
+        self.l1.set(key, value, min(expire, self.l1_ttl) if expire else self.l1_ttl)
+        self._publish(key)
+        return result
+
+    def add(self, key: str, value: bytes, expire: Optional[int] = None) -> bool:
+        # Solo L2 decide quién gana (locks y generaciones compartidos entre workers)
+        if not self.l2.add(key, value, expire):
+            return False
+        self.l1.delete(key)
+        return True
+
+    def delete(self, key: str) -> bool:
+        self.l1.delete(key)
+        result = self.l2.delete(key)
+        self._publish(key)
+        return result
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        return self.l2.keys(pattern)
+
+    def exists(self, key: str) -> bool:
+        return self.l1.exists(key) or self.l2.exists(key)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        self.l1.delete(key)
+        result = self.l2.expire(key, seconds)
+        self._publish(key)
+        return result
+
+    def ttl(self, key: str) -> int:
+        return self.l2.ttl(key)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        self.l1.delete(key)
+        result = self.l2.incr(key, amount)
+        self._publish(key)
+        return result
+
+    def size(self) -> int:
+        return self.l2.size()
+
+    def flush(self) -> None:
+        self.l1.flush()
+        self.l2.flush()
+        self._publish(self.FLUSH_ALL)
+
+    def ping(self) -> bool:
+        return self.l2.ping()
+
+    def namespace_usage(self) -> Dict[str, Dict[str, int]]:
+        # Lo que ocupa este worker; Redis no lleva la cuenta por prefijo
+        return self.l1.namespace_usage()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'l1': self.l1.info(),
+            'l2': {'storage_type': self.l2.storage_type, **self.l2.info()},
+            'l1_hits': self.l1_hits,
+            'l2_hits': self.l2_hits,
+            'misses': self.misses
+        }
+
+
+def stable_digest(payload: Any) -> str:
+    """Huella estable entre procesos y reinicios (blake2b sobre JSON canónico)"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _SingleFlight:
+    """Agrupa cálculos concurrentes de la misma clave para que solo uno se ejecute"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    @contextmanager
+    def hold(self, key: str):
+        with self._lock:
+            entry = self._calls.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._calls.pop(key, None)
+
+
+def create_cache_backend(backend: Optional[str] = None, redis_url: Optional[str] = None) -> CacheBackend:
+    """Crea el backend configurado ("auto", "memory", "redis" o "fake")"""
+    backend = (backend or settings.cache_backend).lower()
+    redis_url = redis_url if redis_url is not None else settings.redis_url
+
+    if backend == "auto":
+        backend = "redis" if redis_url else "memory"
+
+    if backend == "fake":
+        return FakeCacheBackend(max_entries=settings.cache_max_entries, max_bytes=settings.cache_max_bytes,
+                                policy=settings.cache_eviction_policy)
+
+    if backend == "redis":
+        try:
+            redis_backend = RedisCacheBackend(redis_url)
+            redis_backend.ping()
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable ({e}), falling back to memory storage")
+        else:
+            if not settings.cache_l1_enabled:
+                return redis_backend
+            # Cada worker sirve primero desde su memoria y escucha las invalidaciones de los demás
+            return TieredCacheBackend(
+                MemoryCacheBackend(max_entries=settings.cache_l1_max_entries,
+                                   policy=settings.cache_eviction_policy),
+                redis_backend,
+                RedisPubSub(redis_backend._client, settings.cache_invalidation_channel),
+                l1_ttl=settings.cache_l1_ttl
+            )
+
+    return MemoryCacheBackend(
+        max_entries=settings.cache_max_entries,
+        max_bytes=settings.cache_max_bytes,
+        policy=settings.cache_eviction_policy
+    )
+
+
+def create_pubsub(channel: str, redis_url: Optional[str] = None) -> Optional[RedisPubSub]:
+    """Canal pub/sub entre workers sobre Redis; None sin Redis (un solo proceso no lo necesita)"""
+    redis_url = redis_url if redis_url is not None else settings.redis_url
+    if not redis_url:
+        return None
+    try:
+        redis_backend = RedisCacheBackend(redis_url)
+        redis_backend.ping()
+    except Exception as e:
+        logger.warning(f"Redis pub/sub unavailable on {channel} ({e})")
+        return None
+    return RedisPubSub(redis_backend._client, channel)
+
+
+class CacheService:
+    """Servicio de caché sobre un backend intercambiable (memoria, Redis o fake)
+
+    Las entradas pueden llevar etiquetas ("sales", "inventory:variant:12"...). Cada
+    etiqueta tiene una generación guardada en el backend; la entrada recuerda las
+    generaciones con que se escribió y deja de ser válida cuando alguna cambia, así
+    que invalidar una etiqueta es O(1) y las entradas viejas salen por desalojo o TTL.
+    """
+
+    GENERATION_PREFIX = "gen:"
+    FRESH_PREFIX = "fresh:"
+    REFRESH_LOCK_PREFIX = "refresh_lock:"
+    # Ningún payload JSON ni msgpack de un objeto/lista empieza con este byte
+    TAG_MARK = b"\x1e"
+    # Escaneos de códigos inexistentes y de búsquedas flexibles
+    SCAN_MISS_TAG = "scan-miss"
+    SCAN_FLEXIBLE_TAG = "scan-flexible"
+    # Claves de control que no interesan en las estadísticas
+    INTERNAL_NAMESPACES = ("gen", "fresh", "refresh_lock")
+
+    def __init__(self, backend: Optional[CacheBackend] = None, codec: Optional[CacheCodec] = None):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.codec = codec if codec is not None else JsonCodec()
+        self.is_available = True
+        self.metrics = CacheMetrics()
+        self._single_flight = _SingleFlight()
+        logger.info(f"Cache service initialized with {self.backend.storage_type} storage and {self.codec.name} codec")
+
+    def _generation(self, tag: str) -> bytes:
+        """Generación actual de una etiqueta (se crea si no existe)"""
+        generation_key = f"{self.GENERATION_PREFIX}{tag}"
+        generation = self.backend.get(generation_key)
+        if generation is None:
+            # Un token nuevo (no un contador) evita reutilizar generaciones si la clave fue desalojada
+            self.backend.add(generation_key, uuid.uuid4().hex[:12].encode())
+            generation = self.backend.get(generation_key)
+        return generation
+
+    def _wrap_tags(self, value: bytes, tags: List[str]) -> bytes:
+        """Antepone al valor las generaciones vigentes de sus etiquetas"""
+        generations = {tag: self._generation(tag).decode() for tag in tags}
+        header = json.dumps(generations, separators=(',', ':')).encode()
+        return self.TAG_MARK + header + self.TAG_MARK + value
+
+    def _unwrap_tags(self, value: bytes) -> Optional[bytes]:
+        """Retorna el valor si sus etiquetas siguen vigentes, None si alguna fue invalidada"""
+        if not value.startswith(self.TAG_MARK):
+            return value
+        header_end = value.index(self.TAG_MARK, 1)
+        generations = json.loads(value[1:header_end])
+        for tag, generation in generations.items():
+            current = self.backend.get(f"{self.GENERATION_PREFIX}{tag}")
+            if current is None or current.decode() != generation:
                 return None
-            
-            return self._cache.get(key)
+        return value[header_end + 1:]
+
+    def _lookup(self, key: str) -> Optional[bytes]:
+        """Lee una clave validando sus etiquetas, sin contar aciertos ni fallos
+
+        Una entrada con etiquetas invalidadas se borra al verla (y se cuenta esa sola vez): si no,
+        cada lectura volvería a traerla y a consultar la generación de cada etiqueta.
+        """
+        value = self.backend.get(key)
+        if value is not None:
+            value = self._unwrap_tags(value)
+            if value is None:
+                self.backend.delete(key)
+                self.metrics.record_invalidation(key)
+        return value
+
+    def _read(self, key: str) -> Optional[bytes]:
+        """Lee el payload de una clave y registra el acierto o fallo con su latencia"""
+        try:
+            started = time.perf_counter()
+            value = self._lookup(key)
+            self.metrics.observe_get(key, time.perf_counter() - started, value is not None)
+            return value
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return None
-    
-    def set(self, key: str, value: str, expire: Optional[int] = None) -> bool:
-        """Establece un valor en el caché"""
+
+    def get(self, key: str) -> Optional[str]:
+        """Obtiene un valor de texto del caché"""
+        value = self._read(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key: str, value: Union[str, bytes], expire: Optional[int] = None,
+            tags: Optional[List[str]] = None) -> bool:
+        """Establece un valor en el caché, opcionalmente etiquetado"""
         try:
-            self._cache[key] = value
-            if expire:
-                self._expiry[key] = time.time() + expire
-            return True
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            started = time.perf_counter()
+            if tags:
+                value = self._wrap_tags(value, tags)
+            result = self.backend.set(key, value, expire)
+            self.metrics.observe_set(key, time.perf_counter() - started, len(value))
+            return result
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
             return False
-    
-    def setex(self, key: str, expire: int, value: str) -> bool:
+
+    def setex(self, key: str, expire: int, value: Union[str, bytes], tags: Optional[List[str]] = None) -> bool:
         """Establece un valor con expiración"""
-        return self.set(key, value, expire)
-    
+        return self.set(key, value, expire, tags)
+
+    def get_value(self, key: str) -> Optional[Any]:
+        """Obtiene un objeto guardado con set_value"""
+        payload = self._read(key)
+        if payload is None:
+            return None
+        try:
+            return self.codec.decode(payload)
+        except Exception as e:
+            logger.error(f"Cache decode error for key {key}: {e}")
+            self.delete(key)
+            return None
+
+    def get_json(self, key: str) -> Optional[bytes]:
+        """Obtiene un objeto guardado con set_value como JSON listo para responder
+
+        Con un codec JSON el payload se retorna tal cual, sin decodificarlo ni validarlo.
+        """
+        payload = self._read(key)
+        if payload is None:
+            return None
+        try:
+            return self.codec.to_json(payload)
+        except Exception as e:
+            logger.error(f"Cache decode error for key {key}: {e}")
+            self.delete(key)
+            return None
+
+    def set_value(self, key: str, value: Any, expire: Optional[int] = None,
+                  tags: Optional[List[str]] = None) -> bool:
+        """Serializa un objeto con el codec configurado y lo guarda"""
+        try:
+            payload = self.codec.encode(value)
+        except Exception as e:
+            logger.error(f"Cache encode error for key {key}: {e}")
+            return False
+        return self.set(key, payload, expire, tags)
+
+    def invalidate_tag(self, tag: str) -> bool:
+        """Invalida en O(1) todas las entradas con la etiqueta"""
+        try:
+            self.metrics.record_tag_invalidation(tag)
+            return self.backend.set(f"{self.GENERATION_PREFIX}{tag}", uuid.uuid4().hex[:12].encode())
+        except Exception as e:
+            logger.error(f"Cache invalidate error for tag {tag}: {e}")
+            return False
+
+    def invalidate_tags(self, tags: List[str]) -> None:
+        """Invalida varias etiquetas"""
+        for tag in tags:
+            self.invalidate_tag(tag)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], expire: int,
+                       tags: Optional[List[str]] = None, stale_ttl: int = 0,
+                       refresh: Optional[Callable[[], Any]] = None, raw: bool = False) -> Any:
+        """Obtiene un valor del caché o lo calcula una sola vez aunque haya peticiones concurrentes
+
+        Con stale_ttl > 0 la entrada se conserva ese tiempo adicional después de vencer: se sirve
+        el valor anterior mientras un único hilo en segundo plano lo recalcula con `refresh`
+        (por defecto `compute`, que no debe depender de la sesión de la petición).
+        Con raw=True retorna el JSON en bytes para responderlo sin volver a serializarlo.
+        """
+        cached = self._read(key)
+        if cached is not None:
+            if stale_ttl and not self.backend.exists(f"{self.FRESH_PREFIX}{key}"):
+                self._refresh_in_background(key, refresh or compute, expire, tags, stale_ttl)
+            return self.codec.to_json(cached) if raw else self.codec.decode(cached)
+
+        with self._single_flight.hold(key):
+            # Otra petición pudo haberlo calculado mientras esperábamos
+            cached = self._lookup(key)
+            if cached is not None:
+                return self.codec.to_json(cached) if raw else self.codec.decode(cached)
+
+            value = compute()
+            payload = self._store_computed(key, value, expire, tags, stale_ttl)
+            if raw:
+                return self.codec.to_json(payload) if payload is not None else dumps_json(value)
+            return value
+
+    def _store_computed(self, key: str, value: Any, expire: int,
+                        tags: Optional[List[str]], stale_ttl: int) -> Optional[bytes]:
+        """Guarda un valor calculado y su marca de frescura; retorna el payload serializado"""
+        try:
+            payload = self.codec.encode(value)
+        except Exception as e:
+            logger.error(f"Cache encode error for key {key}: {e}")
+            return None
+        self.set(key, payload, expire + stale_ttl, tags)
+        if stale_ttl:
+            self.backend.set(f"{self.FRESH_PREFIX}{key}", b"1", expire)
+        return payload
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any], expire: int,
+                               tags: Optional[List[str]], stale_ttl: int):
+        """Lanza un único recálculo de una entrada vencida (también entre procesos vía el backend)"""
+        lock_key = f"{self.REFRESH_LOCK_PREFIX}{key}"
+        if not self.backend.add(lock_key, b"1", max(expire, 30)):
+            return
+
+        def run():
+            try:
+                self._store_computed(key, compute(), expire, tags, stale_ttl)
+            except Exception as e:
+                logger.error(f"Cache background refresh error for key {key}: {e}")
+            finally:
+                self.backend.delete(lock_key)
+
+        threading.Thread(target=run, name=f"cache-refresh:{key}", daemon=True).start()
+
     def delete(self, key: str) -> bool:
         """Elimina una clave del caché"""
         try:
-            self._cache.pop(key, None)
-            self._expiry.pop(key, None)
+            if self.backend.delete(key):
+                self.metrics.record_invalidation(key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
-    
+
     def delete_pattern(self, pattern: str) -> int:
-        """Elimina todas las claves que coincidan con un patrón"""
-        try:
-            import fnmatch
-            pattern = pattern.replace('*', '*')
-            
-            keys_to_delete = []
-            for key in self._cache.keys():
-                if fnmatch.fnmatch(key, pattern):
-                    keys_to_delete.append(key)
-            
+        """Elimina todas las claves que coincidan con un patrón (O(total de claves), preferir invalidate_tag)"""
+        try:
+            keys_to_delete = self.backend.keys(pattern)
             for key in keys_to_delete:
-                self.delete(key)
-            
+                self.backend.delete(key)
+
             return len(keys_to_delete)
         except Exception as e:
             logger.error(f"Cache delete pattern error for pattern {pattern}: {e}")
             return 0
-    
+
     def exists(self, key: str) -> bool:
         """Verifica si una clave existe"""
-        return key in self._cache and (key not in self._expiry or time.time() <= self._expiry[key])
-    
+        try:
+            return self.backend.exists(key)
+        except Exception as e:
+            logger.error(f"Cache exists error for key {key}: {e}")
+            return False
+
     def expire(self, key: str, seconds: int) -> bool:
         """Establece tiempo de expiración para una clave"""
         try:
-            if key in self._cache:
-                self._expiry[key] = time.time() + seconds
-                return True
-            return False
+            return self.backend.expire(key, seconds)
         except Exception as e:
             logger.error(f"Cache expire error for key {key}: {e}")
             return False
-    
+
     def ttl(self, key: str) -> int:
         """Obtiene el tiempo de vida restante de una clave"""
         try:
-            if key in self._expiry:
-                remaining = self._expiry[key] - time.time()
-                return int(remaining) if remaining > 0 else -1
-            return -1
+            return self.backend.ttl(key)
         except Exception as e:
             logger.error(f"Cache ttl error for key {key}: {e}")
             return -1
-    
+
     def incr(self, key: str, amount: int = 1) -> Optional[int]:
         """Incrementa un valor numérico"""
         try:
-            current = int(self.get(key) or 0)
-            new_value = current + amount
-            self.set(key, str(new_value))
-            return new_value
+            return self.backend.incr(key, amount)
         except Exception as e:
             logger.error(f"Cache incr error for key {key}: {e}")
             return None
-    
+
     def decr(self, key: str, amount: int = 1) -> Optional[int]:
         """Decrementa un valor numérico"""
         return self.incr(key, -amount)
-    
+
+    def clear(self) -> None:
+        """Vacía el caché y reinicia las estadísticas"""
+        self.backend.flush()
+        self.metrics.reset()
+
+    def metrics_snapshot(self, histograms: bool = True) -> Dict[str, Any]:
+        """Contadores, ocupación y latencias por namespace de clave"""
+        snapshot = self.metrics.snapshot(self.backend.namespace_usage(), histograms)
+        for namespace in self.INTERNAL_NAMESPACES:
+            snapshot['namespaces'].pop(namespace, None)
+        return snapshot
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Resumen por namespace de clave (sin los buckets de latencia)"""
+        return self.metrics_snapshot(histograms=False)['namespaces']
+
     # Métodos específicos del negocio
-    def cache_product_scan(self, code: str, result: Dict[str, Any], expire: int = 300) -> bool:
-        """Cachea resultado de escaneo de producto"""
-        key = f"scan:{code}"
-        return self.setex(key, expire, json.dumps(result))
-    
+    @staticmethod
+    def _scan_key(code: str) -> str:
+        # Mismo formato que ProductCodeHandler.process_code
+        return f"scan:{code.strip().upper()}"
+
+    @staticmethod
+    def _search_key(query: str, filters: Dict[str, Any]) -> str:
+        # hash() cambia en cada proceso; la huella estable se comparte entre workers y Redis
+        return f"search:{stable_digest({'query': query, 'filters': filters})}"
+
+    def cache_product_scan(self, code: str, result: Dict[str, Any], expire: int = 300,
+                           tags: Optional[List[str]] = None) -> bool:
+        """Cachea resultado de escaneo de producto
+
+        Los no encontrados y los resultados de búsquedas flexibles llevan además una etiqueta
+        propia: son los que una variante nueva puede cambiar (ver forget_scan_misses).
+        """
+        tags = ["catalog"] + (tags or [])
+        if not result.get('success'):
+            tags.append(self.SCAN_MISS_TAG)
+        elif result.get('scan_type') == 'flexible':
+            tags.append(self.SCAN_FLEXIBLE_TAG)
+        return self.set_value(self._scan_key(code), result, expire, tags)
+
     def get_cached_scan(self, code: str) -> Optional[Dict[str, Any]]:
         """Obtiene resultado de escaneo cacheado"""
-        key = f"scan:{code}"
-        cached = self.get(key)
-        if cached:
-            try:
-                return json.loads(cached)
-            except json.JSONDecodeError:
-                self.delete(key)
-        return None
-    
-    def cache_search_results(self, query: str, filters: Dict[str, Any], 
-                           results: List[Dict[str, Any]], expire: int = 180) -> bool:
+        return self.get_value(self._scan_key(code))
+
+    def get_cached_scan_json(self, code: str) -> Optional[bytes]:
+        """Obtiene el escaneo cacheado como JSON listo para responder"""
+        return self.get_json(self._scan_key(code))
+
+    @staticmethod
+    def _scan_miss_key(code: str) -> str:
+        return f"scan_miss:{code.strip().upper()}"
+
+    def cache_scan_miss(self, code: str, result: Dict[str, Any], expire: Optional[int] = None,
+                        tags: Optional[List[str]] = None) -> bool:
+        """Recuerda por poco tiempo que un código no existe, para no volver a consultarlo"""
+        return self.set_value(self._scan_miss_key(code), result, expire or settings.scan_negative_ttl,
+                              [self.SCAN_MISS_TAG] + (tags or []))
+
+    def get_cached_scan_miss(self, code: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el resultado "no encontrado" cacheado de un código"""
+        return self.get_value(self._scan_miss_key(code))
+
+    def forget_scan_codes(self, *codes: Optional[str]) -> None:
+        """Descarta los escaneos cacheados (positivos y negativos) de esos códigos tal como se escriben"""
+        for code in codes:
+            if code:
+                self.delete(self._scan_miss_key(code))
+                self.delete(self._scan_key(code))
+
+    def forget_scan_misses(self) -> None:
+        """Descarta los escaneos que una variante nueva puede cambiar: los códigos inexistentes
+        (escritos de cualquier forma que resuelva a ella) y los resultados de búsquedas flexibles"""
+        self.invalidate_tags([self.SCAN_MISS_TAG, self.SCAN_FLEXIBLE_TAG])
+
+    def cache_search_results(self, query: str, filters: Dict[str, Any],
+                           results: List[Dict[str, Any]], expire: int = 180,
+                           suggested_filters: Optional[Dict[str, List[str]]] = None) -> bool:
         """Cachea resultados de búsqueda"""
-        filters_str = json.dumps(filters, sort_keys=True)
-        key = f"search:{hash(query + filters_str)}"
-        
+        key = self._search_key(query, filters)
+
         data = {
             'query': query,
             'filters': filters,
             'results': results,
+            'suggested_filters': suggested_filters,
             'cached_at': datetime.now().isoformat()
         }
-        
-        return self.setex(key, expire, json.dumps(data))
-    
+
+        return self.set_value(key, data, expire, ["search", "catalog"])
+
     def get_cached_search(self, query: str, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Obtiene resultados de búsqueda cacheados"""
-        filters_str = json.dumps(filters, sort_keys=True)
-        key = f"search:{hash(query + filters_str)}"
-        
-        cached = self.get(key)
-        if cached:
-            try:
-                return json.loads(cached)
-            except json.JSONDecodeError:
-                self.delete(key)
-        return None
-    
+        return self.get_value(self._search_key(query, filters))
+
+    def get_or_count(self, namespace: str, filters: Dict[str, Any], count: Callable[[], int],
+                     tags: Optional[List[str]] = None) -> int:
+        """Total exacto de un listado con esos filtros, calculado una vez y reutilizado entre páginas"""
+        return self.get_or_compute(f"count:{namespace}:{stable_digest(filters)}", count,
+                                   settings.search_count_ttl, tags)
+
+    def cache_daily_stats(self, date_str: str, summary: Dict[str, Any], expire: int = 3600) -> bool:
+        """Cachea el resumen de ventas de un día"""
+        return self.set_value(f"daily_stats:{date_str}", summary, expire, ["sales"])
+
+    def get_cached_daily_stats(self, date_str: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el resumen de ventas diario cacheado"""
+        return self.get_value(f"daily_stats:{date_str}")
+
     def health_check(self) -> Dict[str, Any]:
         """Verifica la salud del servicio de caché"""
-        return {
-            'status': 'healthy',
-            'message': 'Memory cache service is working properly',
-            'keys_count': len(self._cache),
-            'storage_type': 'memory'
-        }
\ No newline at end of file
+        try:
+            self.backend.ping()
+            return {
+                'status': 'healthy',
+                'message': f'{self.backend.storage_type.capitalize()} cache service is working properly',
+                'keys_count': self.backend.size(),
+                'storage_type': self.backend.storage_type,
+                'codec': self.codec.name,
+                'backend': self.backend.info()
+            }
+        except Exception as e:
+            return {
+                'status': 'unhealthy',
+                'message': f'Cache backend error: {e}',
+                'storage_type': self.backend.storage_type
+            }
+
+
+@lru_cache()
+def get_cache_service() -> CacheService:
+    """Obtener la instancia de caché compartida por todo el proceso"""
+    return CacheService(create_cache_backend(), create_codec(settings.cache_codec))
+
+
+def get_cache() -> CacheService:
+    """Dependency para obtener el caché compartido"""
+    return get_cache_service()
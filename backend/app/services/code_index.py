@@ -0,0 +1,540 @@
+# backend/app/services/code_index.py
+"""Índice en memoria de los códigos de las variantes activas
+
+Cada proceso carga una vez (en bloque) un registro compacto por variante y lo indexa por código
+de barras, SKU, código corto y componentes del código corto, así que un escaneo se resuelve con
+una búsqueda en un diccionario en vez de un SELECT con join.
+
+Para el autocompletado guarda además una lista ordenada de (clave, variante) con los códigos y
+las palabras del nombre (en minúsculas y sin tildes), donde un prefijo se busca con bisect, y el
+stock disponible de cada variante. Para los escaneos con errores de digitación ("CH-01-M-NEG",
+"chaketa") tiene índices de búsqueda aproximada (app/utils/fuzzy.py) de los SKU y códigos cortos
+(sin separadores) y de las palabras del nombre.
+
+Se mantiene al día con eventos de la sesión: al confirmar una transacción que creó, modificó o
+desactivó variantes (o modificó productos) se recargan solo esas variantes, y los movimientos de
+stock anotados en la transacción se aplican sin consultar la base de datos. Con Redis, cada
+proceso anuncia además por pub/sub (code_index_channel) qué variantes, productos y totales de
+stock confirmó, y los demás los recargan de la base de datos: un cambio de precio, de código o
+una desactivación hecha en otro worker o en un script llega en cuanto se confirma. La recarga
+completa cada code_index_max_age segundos queda como respaldo si se pierde un aviso; un código
+que no está en el índice se busca en la base de datos.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.product import Product, ProductVariant
+from ..models.inventory import VariantStock
+from ..utils.fuzzy import FuzzyIndex
+
+logger = logging.getLogger(__name__)
+
+
+class VariantCode(NamedTuple):
+    """Lo necesario para resolver un código y responder el escaneo"""
+    id: int
+    product_id: int
+    product_name: str
+    category_code: str
+    internal_number: str
+    sku: str
+    barcode: Optional[str]
+    short_code: Optional[str]
+    size: str
+    color: str
+    color_hex: Optional[str]
+    price: float
+    is_featured: bool
+    product_active: bool
+
+    @classmethod
+    def from_variant(cls, variant: ProductVariant) -> "VariantCode":
+        product = variant.product
+        return cls(
+            variant.id, variant.product_id, product.name, product.category_code, product.internal_number,
+            variant.sku, variant.barcode, variant.short_code, variant.size, variant.color,
+            variant.color_hex, float(variant.price), bool(variant.is_featured), product.is_active is not False
+        )
+
+
+# Mismas columnas y orden que VariantCode, más el stock disponible
+_COLUMNS = (
+    ProductVariant.id, ProductVariant.product_id, Product.name, Product.category_code, Product.internal_number,
+    ProductVariant.sku, ProductVariant.barcode, ProductVariant.short_code, ProductVariant.size,
+    ProductVariant.color, ProductVariant.color_hex, ProductVariant.price, ProductVariant.is_featured,
+    Product.is_active, VariantStock.available
+)
+
+_WORD_RE = re.compile(r'\w+')
+
+# Palabras más cortas no se buscan aproximadas: casi cualquier término estaría a 1 o 2 ediciones
+FUZZY_MIN_LENGTH = 4
+
+
+def _normalize(code: Optional[str]) -> Optional[str]:
+    return code.strip().upper() if code else None
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes ("Térmica" -> "termica")"""
+    decomposed = unicodedata.normalize('NFKD', text.strip().lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _record(row) -> Tuple[VariantCode, int]:
+    *fields, product_active, available = row
+    return VariantCode(*fields, product_active is not False), available or 0
+
+
+def _prefix_keys(record: VariantCode) -> Tuple[str, ...]:
+    """Claves de autocompletado: los códigos completos y cada palabra del nombre"""
+    codes = (fold(code) for code in (record.sku, record.short_code, record.barcode) if code)
+    return tuple(dict.fromkeys(chain(codes, _WORD_RE.findall(fold(record.product_name)))))
+
+
+def _is_code(term: str) -> bool:
+    """Los códigos (SKU, código corto) llevan números; las palabras del nombre, en general no"""
+    return any(char.isdigit() for char in term)
+
+
+def _fuzzy_term(word: str) -> str:
+    """Término de la búsqueda aproximada: los códigos sin separadores ("ch-001-m-neg" -> "ch001mneg")"""
+    return ''.join(char for char in word if char.isalnum()) if _is_code(word) else word
+
+
+def _fuzzy_terms(record: VariantCode) -> Tuple[str, ...]:
+    """Términos de la búsqueda aproximada: SKU, código corto y palabras del nombre"""
+    codes = (fold(code) for code in (record.sku, record.short_code) if code)
+    words = (word for word in _WORD_RE.findall(fold(record.product_name)) if len(word) >= FUZZY_MIN_LENGTH)
+    return tuple(dict.fromkeys(_fuzzy_term(term) for term in chain(codes, words)))
+
+
+def _max_distance(term: str) -> int:
+    """Ediciones toleradas: 1 en códigos y palabras cortas, 2 en palabras desde 6 letras"""
+    return 1 if _is_code(term) or len(term) < 6 else 2
+
+
+class CodeIndex:
+    """Código -> VariantCode de las variantes activas, compartido por todo el proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._records: Dict[int, VariantCode] = {}
+        self._barcodes: Dict[str, int] = {}
+        self._codes: Dict[str, int] = {}  # SKU y código corto, en mayúsculas
+        self._components: Dict[Tuple[str, str, str, str], int] = {}
+        self._prefixes: List[Tuple[str, int]] = []  # (clave, variant_id) ordenada
+        self._keys: Dict[int, Tuple[str, ...]] = {}  # claves de autocompletado de cada variante
+        self._available: Dict[int, int] = {}
+        # Los códigos toleran una edición (sin índice de borrados); las palabras del nombre, hasta dos
+        self._fuzzy_codes = FuzzyIndex(max_distance=1)
+        self._fuzzy_words = FuzzyIndex(max_distance=2)
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    # Consultas (solo diccionarios: no tocan la base de datos)
+
+    def by_barcode(self, barcode: str) -> Optional[VariantCode]:
+        return self._get(self._barcodes.get(barcode))
+
+    def by_code(self, code: str) -> Optional[VariantCode]:
+        """SKU o código corto exacto"""
+        return self._get(self._codes.get(_normalize(code)))
+
+    def by_components(self, category_code: str, internal_number: str, size: str, color: str) -> Optional[VariantCode]:
+        return self._get(self._components.get((category_code, internal_number, size, color)))
+
+    def available(self, variant_id: int) -> int:
+        return self._available.get(variant_id, 0)
+
+    def autocomplete(self, term: str, limit: int = 10) -> List[VariantCode]:
+        """Variantes (de productos activos) con un código o palabra del nombre que empieza por el término
+
+        Con varias palabras se recorre la que tiene menos coincidencias en la lista ordenada y las
+        demás deben ser prefijo de alguna clave de la misma variante.
+        """
+        words = fold(term).split()
+        if not words:
+            return []
+        self._reload_if_stale()
+        with self._lock:
+            prefixes = self._prefixes
+            ranges = {word: (bisect_left(prefixes, (word,)), bisect_left(prefixes, (word + '\uffff',))) for word in words}
+            first = min(words, key=lambda word: ranges[word][1] - ranges[word][0])
+            others = [word for word in words if word != first]
+
+            results, seen = [], set()
+            for position in range(*ranges[first]):
+                if len(results) == limit:
+                    break
+                variant_id = prefixes[position][1]
+                record = self._records.get(variant_id)
+                if record is None or variant_id in seen or not record.product_active:
+                    continue
+                seen.add(variant_id)
+                keys = self._keys.get(variant_id, ())
+                if all(any(key.startswith(word) for key in keys) for word in others):
+                    results.append(record)
+        return results
+
+    def fuzzy(self, query: str, limit: int = 10) -> List[Tuple[VariantCode, int]]:
+        """(variante, ediciones) con SKU, código corto o palabras del nombre parecidos a la consulta
+
+        Cada palabra (de al menos FUZZY_MIN_LENGTH letras) tolera 1 edición, o 2 desde 6 letras
+        si no es un código; con varias palabras todas deben coincidir y se suman sus ediciones.
+        Ordenado de la más parecida a la menos (y por id).
+        """
+        words = [_fuzzy_term(word) for word in fold(query).split()]
+        words = [word for word in words if len(word) >= FUZZY_MIN_LENGTH]
+        if not words:
+            return []
+        self._reload_if_stale()
+        with self._lock:
+            matches = []
+            for word in words:
+                index = self._fuzzy_index(word)
+                matches.append([(index, term, distance) for term, distance in index.search(word, _max_distance(word))])
+            if len(matches) == 1:
+                return self._closest(matches[0], limit)
+            return self._closest_to_all(matches, limit)
+
+    def _closest(self, terms: List[Tuple[FuzzyIndex, str, int]], limit: int) -> List[Tuple[VariantCode, int]]:
+        """Las primeras `limit` variantes por (distancia, id); los ids de cada término ya vienen ordenados"""
+        found, seen = [], set()
+        for distance, group in groupby(terms, key=itemgetter(2)):
+            for variant_id in merge(*(index.ids(term) for index, term, _ in group)):
+                record = self._records.get(variant_id)
+                if variant_id in seen or record is None or not record.product_active:
+                    continue
+                seen.add(variant_id)
+                found.append((record, distance))
+                if len(found) == limit:
+                    return found
+        return found
+
+    def _closest_to_all(self, matches: List[List[Tuple[FuzzyIndex, str, int]]], limit: int) -> List[Tuple[VariantCode, int]]:
+        """Variantes que coinciden con todas las palabras: se recorren las de la palabra con menos
+        variantes y se buscan en los términos de las demás"""
+        matches = sorted(matches, key=lambda terms: sum(len(index.ids(term)) for index, term, _ in terms))
+        totals: Dict[int, int] = {}
+        for index, term, distance in matches[0]:
+            for variant_id in index.ids(term):
+                totals.setdefault(variant_id, distance)
+
+        found = []
+        for variant_id, total in totals.items():
+            for terms in matches[1:]:
+                # Los términos vienen del más cercano al más lejano: el primero que la tiene es el mejor
+                distance = next((d for index, term, d in terms if index.contains(term, variant_id)), None)
+                if distance is None:
+                    break
+                total += distance
+            else:
+                record = self._records.get(variant_id)
+                if record is not None and record.product_active:
+                    found.append((record, total))
+        found.sort(key=lambda match: (match[1], match[0].id))
+        return found[:limit]
+
+    def _fuzzy_index(self, term: str) -> FuzzyIndex:
+        return self._fuzzy_codes if _is_code(term) else self._fuzzy_words
+
+    def _get(self, variant_id: Optional[int]) -> Optional[VariantCode]:
+        if variant_id is None:
+            return None
+        self._reload_if_stale()
+        return self._records.get(variant_id)
+
+    # Carga y mantenimiento
+
+    def load(self, db: Session) -> Dict[str, float]:
+        """Carga completa en una consulta; reemplaza el índice de una vez al terminar"""
+        started = time.perf_counter()
+        rows = [_record(row) for row in self._query(db)]
+        self.load_records(rows)
+        return {'variants': len(rows), 'duration_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+    def load_records(self, rows: List[Tuple[VariantCode, int]]) -> None:
+        """Reemplaza el índice con esos (registro, disponible)"""
+        index = CodeIndex()
+        for record, available in rows:
+            index._put(record, available, sort=False)
+        index._prefixes.sort()
+
+        with self._lock:
+            self._records, self._barcodes = index._records, index._barcodes
+            self._codes, self._components = index._codes, index._components
+            self._prefixes, self._keys, self._available = index._prefixes, index._keys, index._available
+            self._fuzzy_codes, self._fuzzy_words = index._fuzzy_codes, index._fuzzy_words
+            self.loaded_at = time.monotonic()
+
+    def refresh(self, db: Session, variant_ids: Iterable[int] = (), product_ids: Iterable[int] = ()) -> None:
+        """Recarga esas variantes (y las de esos productos); las inactivas o borradas salen del índice"""
+        variant_ids, product_ids = set(variant_ids), set(product_ids)
+        if product_ids:
+            variant_ids |= {record.id for record in self._records.values() if record.product_id in product_ids}
+        if not variant_ids and not product_ids:
+            return
+
+        query = self._query(db)
+        filters = []
+        if variant_ids:
+            filters.append(ProductVariant.id.in_(variant_ids))
+        if product_ids:
+            filters.append(ProductVariant.product_id.in_(product_ids))
+        rows = [_record(row) for row in query.filter(or_(*filters))]
+
+        with self._lock:
+            for variant_id in variant_ids - {record.id for record, _ in rows}:
+                self._remove(variant_id)
+            for record, available in rows:
+                self._remove(record.id)
+                self._put(record, available)
+
+    def refresh_stock(self, db: Session, variant_ids: Iterable[int]) -> None:
+        """Relee el disponible de esas variantes (movimientos de stock confirmados en otro proceso)"""
+        variant_ids = set(variant_ids)
+        if not variant_ids:
+            return
+        rows = db.query(VariantStock.variant_id, VariantStock.available).filter(
+            VariantStock.variant_id.in_(variant_ids)
+        ).all()
+        with self._lock:
+            for variant_id, available in rows:
+                if variant_id in self._records:
+                    self._available[variant_id] = available or 0
+
+    def add(self, record: VariantCode) -> None:
+        """Agrega una variante encontrada en la base de datos (p. ej. creada por otro proceso)"""
+        if not self.loaded:
+            return
+        with self._lock:
+            available = self._available.get(record.id, 0)
+            self._remove(record.id)
+            self._put(record, available)
+
+    def apply_stock(self, changes: Dict[int, Tuple[Optional[int], int]]) -> None:
+        """Aplica movimientos de stock: variant_id -> (disponible conocido o None, cambio posterior)"""
+        with self._lock:
+            for variant_id, (value, delta) in changes.items():
+                base = self._available.get(variant_id, 0) if value is None else value
+                self._available[variant_id] = base + delta
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            'loaded': self.loaded,
+            'variants': len(self._records),
+            'barcodes': len(self._barcodes),
+            'codes': len(self._codes),
+            'prefixes': len(self._prefixes),
+            'fuzzy_codes': len(self._fuzzy_codes),
+            'fuzzy_words': len(self._fuzzy_words),
+            'age_seconds': round(time.monotonic() - self.loaded_at, 1) if self.loaded else None
+        }
+
+    @staticmethod
+    def _query(db: Session):
+        return db.query(*_COLUMNS).join(Product, ProductVariant.product_id == Product.id).outerjoin(
+            VariantStock, VariantStock.variant_id == ProductVariant.id
+        ).filter(ProductVariant.is_active == True)
+
+    def _put(self, record: VariantCode, available: int, sort: bool = True) -> None:
+        self._records[record.id] = record
+        self._available[record.id] = available
+        if record.barcode:
+            self._barcodes[record.barcode] = record.id
+        for code in (record.sku, record.short_code):
+            if code:
+                self._codes[_normalize(code)] = record.id
+        self._components[(record.category_code, record.internal_number, record.size, record.color)] = record.id
+        self._keys[record.id] = keys = _prefix_keys(record)
+        for key in keys:
+            if sort:
+                insort(self._prefixes, (key, record.id))
+            else:
+                self._prefixes.append((key, record.id))
+        for term in _fuzzy_terms(record):
+            self._fuzzy_index(term).add(term, record.id)
+
+    def _remove(self, variant_id: int) -> None:
+        record = self._records.pop(variant_id, None)
+        self._available.pop(variant_id, None)
+        keys = self._keys.pop(variant_id, ())
+        if record is None:
+            return
+        codes = [
+            (self._barcodes, record.barcode),
+            (self._codes, _normalize(record.sku)),
+            (self._codes, _normalize(record.short_code)),
+            (self._components, (record.category_code, record.internal_number, record.size, record.color))
+        ]
+        for mapping, key in codes:
+            # Otra variante pudo haber tomado el código
+            if key is not None and mapping.get(key) == variant_id:
+                del mapping[key]
+        for key in keys:
+            position = bisect_left(self._prefixes, (key, variant_id))
+            if position < len(self._prefixes) and self._prefixes[position] == (key, variant_id):
+                del self._prefixes[position]
+        for term in _fuzzy_terms(record):
+            self._fuzzy_index(term).remove(term, variant_id)
+
+    def _reload_if_stale(self) -> None:
+        """Recarga completa en segundo plano (un solo hilo) cuando el índice supera code_index_max_age"""
+        max_age = settings.code_index_max_age
+        if not max_age or not self.loaded or time.monotonic() - self.loaded_at < max_age:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        # Evita que otras consultas lancen otra recarga mientras esta termina
+        self.loaded_at = time.monotonic()
+        threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self) -> None:
+        from ..database import run_with_session
+        try:
+            run_with_session(self.load, read_only=True)
+        except Exception as e:
+            logger.error(f"Code index reload failed: {e}")
+        finally:
+            self._reload_lock.release()
+
+
+code_index = CodeIndex()
+
+
+def get_code_index() -> CodeIndex:
+    """Índice de códigos compartido por todo el proceso"""
+    return code_index
+
+
+# === Eventos de la sesión ===
+
+_CHANGES_KEY = 'code_index_changes'
+
+# Canal entre procesos (Redis pub/sub); None si el índice solo se mantiene en este proceso
+_bus = None
+_ORIGIN = uuid.uuid4().hex[:12]
+
+
+def _syncing() -> bool:
+    """Hay que anotar cambios si el índice está cargado o si hay otros procesos a quienes avisar"""
+    return code_index.loaded or _bus is not None
+
+
+def _changes(session: Session) -> Tuple[set, set, dict]:
+    """(variantes, productos, stock) pendientes de aplicar al confirmar la transacción"""
+    return session.info.setdefault(_CHANGES_KEY, (set(), set(), {}))
+
+
+def note_stock_change(session: Session, variant_id: int, available_change: int) -> None:
+    """Anota un cambio relativo del disponible hecho con UPDATE (sin objetos que vea el flush)"""
+    if not _syncing():
+        return
+    stock = _changes(session)[2]
+    value, delta = stock.get(variant_id, (None, 0))
+    stock[variant_id] = (value, delta + available_change)
+
+
+def _collect_changes(session: Session, flush_context) -> None:
+    """Anota las variantes, productos y totales de stock escritos en el flush; se aplican al confirmar"""
+    if not _syncing():
+        return
+    variant_ids, product_ids, stock = _changes(session)
+    dirty = (obj for obj in session.dirty if session.is_modified(obj, include_collections=False))
+    for obj in chain(session.new, dirty, session.deleted):
+        if isinstance(obj, ProductVariant):
+            variant_ids.add(obj.id)
+        elif isinstance(obj, Product):
+            product_ids.add(obj.id)
+        elif isinstance(obj, VariantStock) and obj not in session.deleted:
+            stock[obj.variant_id] = (obj.available, 0)
+
+
+def _apply_changes(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes or not any(changes):
+        return
+    variant_ids, product_ids, stock = changes
+    _publish_changes(variant_ids, product_ids, stock)
+    if not code_index.loaded:
+        return
+    try:
+        code_index.apply_stock(stock)
+        if variant_ids or product_ids:
+            with Session(bind=session.get_bind()) as db:
+                code_index.refresh(db, variant_ids, product_ids)
+    except Exception as e:
+        # El índice queda desactualizado hasta la próxima recarga; los escaneos no fallan por esto
+        logger.error(f"Code index refresh failed: {e}")
+
+
+def _discard_changes(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_CHANGES_KEY, None)
+
+
+def _publish_changes(variant_ids: set, product_ids: set, stock: dict) -> None:
+    """Anuncia a los demás procesos lo que confirmó esta transacción (solo ids: cada uno relee)"""
+    if _bus is None:
+        return
+    try:
+        _bus.publish(json.dumps({
+            'origin': _ORIGIN,
+            'variants': sorted(variant_ids),
+            'products': sorted(product_ids),
+            'stock': sorted(set(stock) - variant_ids)
+        }).encode())
+    except Exception as e:
+        # Los demás procesos se ponen al día con la recarga completa
+        logger.error(f"Code index publish error: {e}")
+
+
+def _on_remote_changes(message: bytes) -> None:
+    event = json.loads(message)
+    if event.get('origin') == _ORIGIN or not code_index.loaded:
+        return
+    from ..database import run_with_session
+
+    def refresh(db: Session) -> None:
+        code_index.refresh(db, event.get('variants', ()), event.get('products', ()))
+        code_index.refresh_stock(db, event.get('stock', ()))
+
+    try:
+        # Sesión de escritura: una réplica podría no tener todavía lo recién confirmado
+        run_with_session(refresh)
+    except Exception as e:
+        logger.error(f"Code index remote refresh failed: {e}")
+
+
+def connect_code_index_bus(bus, subscribe: bool = True) -> None:
+    """Anuncia por `bus` los cambios confirmados en este proceso y, con subscribe, aplica los de
+    los demás (los scripts solo publican)"""
+    global _bus
+    _bus = bus
+    if subscribe:
+        bus.subscribe(_on_remote_changes)
+
+
+def install_code_index_hooks() -> None:
+    """Mantiene el índice al confirmar transacciones que tocan el catálogo (una sola vez)"""
+    if event.contains(Session, "after_flush", _collect_changes):
+        return
+    event.listen(Session, "after_flush", _collect_changes)
+    event.listen(Session, "after_commit", _apply_changes)
+    event.listen(Session, "after_rollback", _discard_changes)
@@ -1,34 +1,59 @@
 # backend/app/services/inventory_manager.py
 from typing import Dict, List, Optional, Any, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import event, func, and_, or_
 from datetime import datetime, timedelta
-from ..models.inventory import Inventory, Location, InventoryMovement, Reservation
+from ..models.inventory import Inventory, Location, InventoryMovement, Reservation, VariantStock
 from ..models.product import ProductVariant, Product
-from ..services.cache_service import CacheService
+from ..models.profiles import inventory_with_location, inventory_with_variant_product_location, movement_with_inventory
+from ..services.cache_service import CacheService, get_cache_service
+from ..services.code_index import note_stock_change
+from ..utils.pagination import keyset_page
 import json
 
 class InventoryManager:
     """Gestión centralizada de inventario"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[CacheService] = None):
         self.db = db
-        self.cache = CacheService()
+        self.cache = cache if cache is not None else get_cache_service()
     
     def get_inventory_info(self, variant_id: int) -> Dict[str, Any]:
         """Obtiene información completa de inventario para una variante"""
         # Verificar caché primero
         cache_key = f"inventory_info:{variant_id}"
-        cached = self.cache.get(cache_key)
-        if cached:
-            return json.loads(cached)
+        cached = self.cache.get_value(cache_key)
+        if cached is not None:
+            return cached
         
         # Consultar inventario por ubicaciones
         inventory_items = self.db.query(Inventory).filter(
             Inventory.variant_id == variant_id,
             Inventory.is_active == True
-        ).join(Location).all()
+        ).join(Location).options(*inventory_with_location(joined=True)).all()
         
+        result = self._summarize_inventory(variant_id, inventory_items)
+        
+        # Guardar en caché por 5 minutos
+        self.cache.set_value(cache_key, result, 300, [f"inventory:variant:{variant_id}"])
+        return result
+    
+    def get_inventory_info_many(self, variant_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """get_inventory_info de muchas variantes: las que no están en caché, en un solo SELECT"""
+        result, missing = {}, []
+        for variant_id in dict.fromkeys(variant_ids):
+            cached = self.cache.get_value(f"inventory_info:{variant_id}")
+            if cached is not None:
+                result[variant_id] = cached
+            else:
+                missing.append(variant_id)
+
+        if missing:
+            result.update(self._load_inventory_info(missing))
+        return result
+
+    def _summarize_inventory(self, variant_id: int, inventory_items: List[Inventory]) -> Dict[str, Any]:
+        """Arma la información de inventario de una variante a partir de sus registros"""
         # Calcular totales
         total_stock = sum(item.quantity for item in inventory_items)
         total_reserved = sum(item.reserved_quantity for item in inventory_items)
@@ -62,8 +87,35 @@ class InventoryManager:
             'storage_locations': [loc for loc in locations if loc['location_type'] == 'storage' and loc['quantity'] > 0]
         }
         
-        # Guardar en caché por 5 minutos
-        self.cache.setex(cache_key, 300, json.dumps(result))
+        return result
+    
+    def preload_inventory_info(self, variant_ids: List[int], chunk_size: int = 500) -> int:
+        """Carga en caché inventory_info de muchas variantes con consultas en bloque"""
+        loaded = 0
+        for start in range(0, len(variant_ids), chunk_size):
+            loaded += len(self._load_inventory_info(variant_ids[start:start + chunk_size]))
+        
+        return loaded
+    
+    def _load_inventory_info(self, variant_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Consulta el inventario de las variantes en un solo SELECT y guarda cada resumen en caché"""
+        inventory_items = self.db.query(Inventory).join(Location).options(
+            *inventory_with_location(joined=True)
+        ).filter(
+            Inventory.variant_id.in_(variant_ids),
+            Inventory.is_active == True
+        ).all()
+        
+        items_by_variant = {variant_id: [] for variant_id in variant_ids}
+        for item in inventory_items:
+            items_by_variant[item.variant_id].append(item)
+        
+        result = {}
+        for variant_id, items in items_by_variant.items():
+            result[variant_id] = self._summarize_inventory(variant_id, items)
+            self.cache.set_value(f"inventory_info:{variant_id}", result[variant_id], 300,
+                                 [f"inventory:variant:{variant_id}"])
+        
         return result
     
     def update_stock(self, variant_id: int, location_id: int, quantity_change: int,
@@ -97,6 +149,7 @@ class InventoryManager:
             
             # Actualizar la cantidad
             inventory_item.quantity = new_quantity
+            self._apply_stock_delta(inventory_item, on_hand_change=quantity_change)
             
             # Registrar el movimiento
             movement = InventoryMovement(
@@ -149,6 +202,7 @@ class InventoryManager:
             
             # Actualizar cantidad reservada
             inventory_item.reserved_quantity += quantity
+            self._apply_stock_delta(inventory_item, reserved_change=quantity)
             
             # Limpiar caché
             self._clear_inventory_cache(variant_id)
@@ -173,6 +227,7 @@ class InventoryManager:
             # Actualizar cantidad reservada
             inventory_item = reservation.inventory_item
             inventory_item.reserved_quantity -= reservation.quantity
+            self._apply_stock_delta(inventory_item, reserved_change=-reservation.quantity)
             
             # Actualizar estado de la reserva
             if complete_sale:
@@ -180,6 +235,7 @@ class InventoryManager:
                 reservation.completed_at = datetime.now()
                 # También actualizar el stock real
                 inventory_item.quantity -= reservation.quantity
+                self._apply_stock_delta(inventory_item, on_hand_change=-reservation.quantity)
                 
                 # Registrar movimiento de venta
                 movement = InventoryMovement(
@@ -251,6 +307,7 @@ class InventoryManager:
             # Actualizar cantidad
             inventory_item.quantity = new_quantity
             inventory_item.needs_recount = False
+            self._apply_stock_delta(inventory_item, on_hand_change=quantity_change)
             
             # Registrar movimiento
             movement = InventoryMovement(
@@ -282,7 +339,7 @@ class InventoryManager:
         if location_id:
             query = query.filter(Inventory.location_id == location_id)
         
-        low_stock_items = query.all()
+        low_stock_items = query.options(*inventory_with_variant_product_location(joined=True)).all()
         
         alerts = []
         for item in low_stock_items:
@@ -309,6 +366,20 @@ class InventoryManager:
                            movement_type: Optional[str] = None,
                            limit: int = 100) -> List[Dict[str, Any]]:
         """Obtiene historial de movimientos"""
+        movements, _ = self.get_movement_page(
+            variant_id=variant_id, location_id=location_id, start_date=start_date,
+            end_date=end_date, movement_type=movement_type, limit=limit
+        )
+        return movements
+    
+    def get_movement_page(self, variant_id: Optional[int] = None,
+                          location_id: Optional[int] = None,
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None,
+                          movement_type: Optional[str] = None,
+                          limit: int = 100,
+                          cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Una página del historial (más recientes primero) y el cursor de la siguiente"""
         query = self.db.query(InventoryMovement).join(Inventory)
         
         if variant_id:
@@ -326,7 +397,10 @@ class InventoryManager:
         if movement_type:
             query = query.filter(InventoryMovement.movement_type == movement_type)
         
-        movements = query.order_by(InventoryMovement.created_at.desc()).limit(limit).all()
+        movements, next_cursor = keyset_page(
+            query.options(*movement_with_inventory(joined=True)),
+            (InventoryMovement.created_at, InventoryMovement.id), cursor, limit, descending=True
+        )
         
         result = []
         for movement in movements:
@@ -343,12 +417,14 @@ class InventoryManager:
                 'reference_type': movement.reference_type
             })
         
-        return result
+        return result, next_cursor
     
     def cleanup_expired_reservations(self) -> int:
         """Limpia reservas expiradas automáticamente"""
         try:
-            expired_reservations = self.db.query(Reservation).filter(
+            expired_reservations = self.db.query(Reservation).options(
+                joinedload(Reservation.inventory_item)
+            ).filter(
                 Reservation.status == 'active',
                 Reservation.expires_at <= datetime.now()
             ).all()
@@ -358,6 +434,7 @@ class InventoryManager:
                 # Liberar cantidad reservada
                 inventory_item = reservation.inventory_item
                 inventory_item.reserved_quantity -= reservation.quantity
+                self._apply_stock_delta(inventory_item, reserved_change=-reservation.quantity)
                 
                 # Marcar como expirada
                 reservation.status = 'expired'
@@ -376,6 +453,98 @@ class InventoryManager:
             self.db.rollback()
             raise e
     
+    def _apply_stock_delta(self, inventory_item: Inventory, on_hand_change: int = 0,
+                           reserved_change: int = 0) -> None:
+        """Aplica un movimiento a variant_stock dentro de la misma transacción"""
+        if inventory_item.is_active is False:
+            return
+        
+        # UPDATE relativo: dos ventas simultáneas de la misma variante no se pisan
+        updated = self.db.query(VariantStock).filter(
+            VariantStock.variant_id == inventory_item.variant_id
+        ).update({
+            VariantStock.on_hand: VariantStock.on_hand + on_hand_change,
+            VariantStock.reserved: VariantStock.reserved + reserved_change,
+            VariantStock.available: VariantStock.available + on_hand_change - reserved_change
+        }, synchronize_session=False)
+        
+        if not updated:
+            # Variante sin fila todavía: se calcula desde el inventario, que ya incluye este movimiento
+            self.db.flush()
+            self.recalculate_variant_stock([inventory_item.variant_id])
+        else:
+            # El índice de autocompletado lleva el disponible; se aplica al confirmar
+            note_stock_change(self.db, inventory_item.variant_id, on_hand_change - reserved_change)
+    
+    def _stock_totals(self, variant_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, int]]:
+        """(on_hand, reserved) por variante sumando el inventario activo"""
+        query = self.db.query(
+            Inventory.variant_id,
+            func.coalesce(func.sum(Inventory.quantity), 0),
+            func.coalesce(func.sum(Inventory.reserved_quantity), 0)
+        ).filter(Inventory.is_active == True)
+        
+        if variant_ids is not None:
+            query = query.filter(Inventory.variant_id.in_(variant_ids))
+        
+        return {variant_id: (on_hand, reserved) for variant_id, on_hand, reserved in query.group_by(Inventory.variant_id)}
+    
+    def recalculate_variant_stock(self, variant_ids: List[int], chunk_size: int = 500) -> None:
+        """Recalcula variant_stock desde el inventario (sin commit: queda en la transacción actual)"""
+        for start in range(0, len(variant_ids), chunk_size):
+            chunk = variant_ids[start:start + chunk_size]
+            totals = self._stock_totals(chunk)
+            rows = {
+                row.variant_id: row
+                for row in self.db.query(VariantStock).filter(VariantStock.variant_id.in_(chunk))
+            }
+            
+            for variant_id in chunk:
+                on_hand, reserved = totals.get(variant_id, (0, 0))
+                row = rows.get(variant_id)
+                if row is None:
+                    row = VariantStock(variant_id=variant_id)
+                    self.db.add(row)
+                row.on_hand = on_hand
+                row.reserved = reserved
+                row.available = on_hand - reserved
+    
+    def reconcile_variant_stock(self, fix: bool = True) -> Dict[str, Any]:
+        """Verifica variant_stock contra el inventario; con fix=True corrige las diferencias"""
+        try:
+            expected = self._stock_totals()
+            actual = {
+                row.variant_id: (row.on_hand, row.reserved, row.available)
+                for row in self.db.query(VariantStock)
+            }
+            
+            variant_ids = sorted(set(expected) | set(actual))
+            mismatches = []
+            for variant_id in variant_ids:
+                on_hand, reserved = expected.get(variant_id, (0, 0))
+                if actual.get(variant_id) != (on_hand, reserved, on_hand - reserved):
+                    current = actual.get(variant_id)
+                    mismatches.append({
+                        'variant_id': variant_id,
+                        'expected': {'on_hand': on_hand, 'reserved': reserved, 'available': on_hand - reserved},
+                        'actual': dict(zip(('on_hand', 'reserved', 'available'), current)) if current else None
+                    })
+            
+            if fix and mismatches:
+                self.recalculate_variant_stock([mismatch['variant_id'] for mismatch in mismatches])
+                self.db.commit()
+            
+            return {
+                'checked': len(variant_ids),
+                'mismatches': len(mismatches),
+                'fixed': fix and bool(mismatches),
+                'details': mismatches[:100]
+            }
+            
+        except Exception as e:
+            self.db.rollback()
+            raise e
+    
     def get_stock_value_report(self, location_id: Optional[int] = None) -> Dict[str, Any]:
         """Genera reporte de valor de inventario"""
         query = self.db.query(
@@ -404,16 +573,16 @@ class InventoryManager:
         }
     
     def _clear_inventory_cache(self, variant_id: int):
-        """Limpia el caché relacionado con inventario"""
-        cache_keys = [
-            f"inventory_info:{variant_id}",
-            f"scan:{variant_id}",
-            "inventory_alerts",
-            "inventory_summary"
-        ]
-        
-        for key in cache_keys:
-            self.cache.delete(key)
+        """Limpia el caché relacionado con inventario cuando se confirme la transacción
+
+        Invalidar antes del commit dejaría que otra petición vuelva a guardar el stock viejo
+        (todavía visible en la base de datos) hasta que venza su TTL.
+        """
+        if not self.db.in_transaction():
+            _invalidate_inventory(self.cache, {variant_id})
+            return
+        pending = self.db.info.setdefault(_PENDING_KEY, {})
+        pending.setdefault(id(self.cache), (self.cache, set()))[1].add(variant_id)
     
     def find_product_locations(self, variant_id: int, customer_visible_only: bool = True) -> List[Dict[str, Any]]:
         """Encuentra todas las ubicaciones donde está disponible un producto"""
@@ -427,7 +596,7 @@ class InventoryManager:
         if customer_visible_only:
             query = query.filter(Location.is_visible_to_customer == True)
         
-        inventory_items = query.all()
+        inventory_items = query.options(*inventory_with_location(joined=True)).all()
         
         locations = []
         for item in inventory_items:
@@ -446,4 +615,36 @@ class InventoryManager:
         # Ordenar por prioridad (display primero) y luego por cantidad disponible
         locations.sort(key=lambda x: (x['priority'], -x['available_quantity']))
         
-        return locations
\ No newline at end of file
+        return locations
+
+
+# Variantes con stock modificado en la transacción: {id(caché): (caché, variant_ids)}
+_PENDING_KEY = "inventory_cache_pending"
+
+
+def _invalidate_inventory(cache: CacheService, variant_ids) -> None:
+    # Invalida inventory_info y los escaneos de las variantes, y las alertas de stock.
+    # Con caché en dos niveles ambos cambios se difunden al L1 de todos los workers.
+    cache.invalidate_tags([f"inventory:variant:{variant_id}" for variant_id in variant_ids] + ["inventory"])
+    for variant_id in variant_ids:
+        cache.delete(f"inventory_info:{variant_id}")
+
+
+def _invalidate_after_commit(session: Session) -> None:
+    for cache, variant_ids in session.info.pop(_PENDING_KEY, {}).values():
+        _invalidate_inventory(cache, variant_ids)
+
+
+def _discard_pending(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def install_inventory_cache_hooks() -> None:
+    """Invalida el caché de inventario al confirmar las transacciones que movieron stock (una sola vez)"""
+    if event.contains(Session, "after_commit", _invalidate_after_commit):
+        return
+    event.listen(Session, "after_commit", _invalidate_after_commit)
+    event.listen(Session, "after_rollback", _discard_pending)
+
+
+install_inventory_cache_hooks()
@@ -1,34 +1,48 @@
 # backend/app/services/product_handler.py
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from ..models.product import Product, ProductVariant
+from ..models.inventory import VariantStock
+from ..models.profiles import variant_with_product, variant_with_product_and_stock
 from ..services.inventory_manager import InventoryManager
+from ..services.cache_service import CacheService
+from ..services.code_index import VariantCode, get_code_index
+from ..config import settings
 
 class ProductCodeHandler:
-    """Manejador de códigos de productos"""
+    """Manejador de códigos de productos
+
+    Las variantes encontradas se retornan como VariantCode. Con el índice de códigos cargado,
+    los códigos de barras, códigos cortos y SKU exactos se resuelven sin consultar la base de datos.
+    """
+    
+    # Patrones para diferentes tipos de códigos
+    patterns = {
+        'barcode': re.compile(r'^(\d{8,13})$'),
+        'shortcode': re.compile(r'^([A-Z]{2,3})-(\d{3})-([A-Z]{1,2})-([A-Z]{3,4})$')
+    }
+    
+    # Mapeos de códigos cortos
+    size_map = {
+        'S': 'Small', 'M': 'Medium', 'L': 'Large',
+        'XL': 'Extra Large', 'XXL': 'Extra Extra Large'
+    }
     
-    def __init__(self, db: Session):
+    color_map = {
+        'NEG': 'Negro', 'BLA': 'Blanco', 'AZU': 'Azul',
+        'ROJ': 'Rojo', 'VER': 'Verde', 'GRI': 'Gris',
+        'NAR': 'Naranja', 'AMA': 'Amarillo', 'MOR': 'Morado'
+    }
+    
+    def __init__(self, db: Session, cache: Optional[CacheService] = None):
         self.db = db
-        self.inventory_manager = InventoryManager(db)
-        
-        # Patrones para diferentes tipos de códigos
-        self.patterns = {
-            'barcode': re.compile(r'^(\d{8,13})$'),
-            'shortcode': re.compile(r'^([A-Z]{2,3})-(\d{3})-([A-Z]{1,2})-([A-Z]{3,4})$')
-        }
-        
-        # Mapeos de códigos cortos
-        self.size_map = {
-            'S': 'Small', 'M': 'Medium', 'L': 'Large',
-            'XL': 'Extra Large', 'XXL': 'Extra Extra Large'
-        }
+        self.inventory_manager = InventoryManager(db, cache)
+        self.cache = self.inventory_manager.cache
         
-        self.color_map = {
-            'NEG': 'Negro', 'BLA': 'Blanco', 'AZU': 'Azul',
-            'ROJ': 'Rojo', 'VER': 'Verde', 'GRI': 'Gris',
-            'NAR': 'Naranja', 'AMA': 'Amarillo', 'MOR': 'Morado'
-        }
+        index = get_code_index()
+        self.code_index = index if settings.code_index_enabled and index.loaded else None
     
     def process_code(self, code: str) -> Dict[str, Any]:
         """Procesa cualquier tipo de código"""
@@ -42,6 +56,55 @@ class ProductCodeHandler:
         else:
             return self._handle_flexible_search(code)
     
+    def process_codes(self, codes: List[str]) -> List[Dict[str, Any]]:
+        """Procesa muchos códigos a la vez; un resultado por código, en el mismo orden
+
+        Los códigos de barras, códigos cortos y SKU exactos que no están en el índice se buscan con
+        un SELECT por tipo (IN) y las sugerencias de los códigos cortos inexistentes con otro; solo
+        lo que no es un código exacto pasa por la búsqueda flexible, uno por uno. Los resultados
+        no traen 'inventory': quien los usa lo consulta en bloque
+        (InventoryManager.get_inventory_info_many).
+        """
+        normalized = [code.strip().upper() for code in codes]
+        by_type = {'barcode': [], 'shortcode': [], 'flexible': []}
+        for code in dict.fromkeys(normalized):
+            by_type[self._identify_code_type(code)].append(code)
+        
+        results = {}
+        results.update(self._resolve_barcodes(by_type['barcode']))
+        results.update(self._resolve_shortcodes(by_type['shortcode']))
+        results.update(self._resolve_flexible(by_type['flexible']))
+        
+        return [results[code] for code in normalized]
+    
+    def _resolve_flexible(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultado de cada código flexible: los SKU y códigos cortos exactos en un solo SELECT,
+        el resto con la búsqueda flexible"""
+        results, missing = {}, []
+        for code in codes:
+            variant = self.code_index and self.code_index.by_code(code)
+            if variant:
+                results[code] = {'found': True, 'type': 'flexible', 'variants': [variant], 'count': 1}
+            elif code:
+                missing.append(code)
+            else:
+                # Un código vacío buscaría todo el catálogo
+                results[code] = {'found': False, 'type': 'flexible', 'code': code}
+        
+        if missing:
+            found = {}
+            for variant in self._all_from_db(self.db.query(ProductVariant).join(Product).filter(
+                ProductVariant.sku.in_(missing) | ProductVariant.short_code.in_(missing),
+                ProductVariant.is_active == True
+            )):
+                found[variant.sku] = found[variant.short_code] = variant
+            for code in missing:
+                if code in found:
+                    results[code] = {'found': True, 'type': 'flexible', 'variants': [found[code]], 'count': 1}
+                else:
+                    results[code] = self._handle_flexible_search(code)
+        return results
+    
     def _identify_code_type(self, code: str) -> str:
         """Identifica el tipo de código"""
         if self.patterns['barcode'].match(code):
@@ -53,10 +116,17 @@ class ProductCodeHandler:
     
     def _handle_barcode(self, barcode: str) -> Dict[str, Any]:
         """Maneja búsqueda por código de barras"""
-        variant = self.db.query(ProductVariant).filter(
-            ProductVariant.barcode == barcode,
-            ProductVariant.is_active == True
-        ).first()
+        # Códigos dañados o ajenos se responden sin consultar la base de datos
+        variant = self.code_index and self.code_index.by_barcode(barcode)
+        if variant is None:
+            missing = self.cache.get_cached_scan_miss(barcode)
+            if missing is not None:
+                return missing
+            
+            variant = self._from_db(self.db.query(ProductVariant).join(Product).filter(
+                ProductVariant.barcode == barcode,
+                ProductVariant.is_active == True
+            ))
         
         if variant:
             return {
@@ -66,7 +136,9 @@ class ProductCodeHandler:
                 'inventory': self.inventory_manager.get_inventory_info(variant.id)
             }
         
-        return {'found': False, 'type': 'barcode', 'code': barcode}
+        result = {'found': False, 'type': 'barcode', 'code': barcode}
+        self.cache.cache_scan_miss(barcode, result)
+        return result
     
     def _handle_shortcode(self, code: str) -> Dict[str, Any]:
         """Maneja búsqueda por código corto"""
@@ -80,14 +152,20 @@ class ProductCodeHandler:
         size_full = self.size_map.get(size, size)
         color_full = self.color_map.get(color, color)
         
-        # Buscar producto
-        variant = self.db.query(ProductVariant).join(Product).filter(
-            Product.category_code == category,
-            Product.internal_number == number,
-            ProductVariant.size == size_full,
-            ProductVariant.color == color_full,
-            ProductVariant.is_active == True
-        ).first()
+        variant = self.code_index and self.code_index.by_components(category, number, size_full, color_full)
+        if variant is None:
+            missing = self.cache.get_cached_scan_miss(code)
+            if missing is not None:
+                return missing
+            
+            # Buscar producto
+            variant = self._from_db(self.db.query(ProductVariant).join(Product).filter(
+                Product.category_code == category,
+                Product.internal_number == number,
+                ProductVariant.size == size_full,
+                ProductVariant.color == color_full,
+                ProductVariant.is_active == True
+            ))
         
         if variant:
             return {
@@ -97,23 +175,115 @@ class ProductCodeHandler:
                 'inventory': self.inventory_manager.get_inventory_info(variant.id)
             }
         
-        # Si no se encuentra, buscar productos similares
-        similar = self._find_similar_products(category, number)
-        return {
+        return self._shortcode_miss(code, self._find_similar_products(category, number))
+    
+    def _shortcode_miss(self, code: str, similar: List[Dict]) -> Dict[str, Any]:
+        """Resultado de un código corto inexistente: las demás variantes del producto o, si no hay,
+        códigos parecidos; se recuerda como código inexistente"""
+        similar = similar or self._fuzzy_suggestions(code)
+        result = {
             'found': False,
             'type': 'shortcode',
             'code': code,
             'suggestions': similar
         }
+        # Las sugerencias incluyen stock, así que caducan con el inventario de cada variante
+        self.cache.cache_scan_miss(
+            code, result, tags=["catalog"] + [f"inventory:variant:{s['variant_id']}" for s in similar]
+        )
+        return result
+    
+    def _resolve_barcodes(self, barcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultado de cada código de barras; los que no están en el índice, en un solo SELECT"""
+        results, missing = {}, []
+        for barcode in barcodes:
+            variant = self.code_index and self.code_index.by_barcode(barcode)
+            if variant is not None:
+                results[barcode] = {'found': True, 'type': 'barcode', 'variant': variant}
+                continue
+            cached = self.cache.get_cached_scan_miss(barcode)
+            if cached is not None:
+                results[barcode] = cached
+            else:
+                missing.append(barcode)
+        
+        if missing:
+            found = {variant.barcode: variant for variant in self._all_from_db(
+                self.db.query(ProductVariant).join(Product).filter(
+                    ProductVariant.barcode.in_(missing),
+                    ProductVariant.is_active == True
+                )
+            )}
+            for barcode in missing:
+                if barcode in found:
+                    results[barcode] = {'found': True, 'type': 'barcode', 'variant': found[barcode]}
+                else:
+                    results[barcode] = {'found': False, 'type': 'barcode', 'code': barcode}
+                    self.cache.cache_scan_miss(barcode, results[barcode])
+        return results
+    
+    def _resolve_shortcodes(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultado de cada código corto; los que no están en el índice, en un solo SELECT por
+        (categoría, número, talla, color)"""
+        results, missing = {}, []
+        for code in codes:
+            category, number, size, color = self.patterns['shortcode'].match(code).groups()
+            components = (category, number, self.size_map.get(size, size), self.color_map.get(color, color))
+            variant = self.code_index and self.code_index.by_components(*components)
+            if variant is not None:
+                results[code] = {'found': True, 'type': 'shortcode', 'variant': variant}
+                continue
+            cached = self.cache.get_cached_scan_miss(code)
+            if cached is not None:
+                results[code] = cached
+            else:
+                missing.append((code, components))
+        
+        if not missing:
+            return results
+        
+        found = {
+            (variant.category_code, variant.internal_number, variant.size, variant.color): variant
+            for variant in self._all_from_db(self.db.query(ProductVariant).join(Product).filter(
+                tuple_(Product.category_code, Product.internal_number, ProductVariant.size, ProductVariant.color).in_(
+                    [components for _, components in missing]
+                ),
+                ProductVariant.is_active == True
+            ))
+        }
+        not_found = [(code, components) for code, components in missing if components not in found]
+        similar = self._find_similar_products_many({components[:2] for _, components in not_found})
+        for code, components in missing:
+            if components in found:
+                results[code] = {'found': True, 'type': 'shortcode', 'variant': found[components]}
+            else:
+                results[code] = self._shortcode_miss(code, similar.get(components[:2], []))
+        return results
     
     def _handle_flexible_search(self, query: str) -> Dict[str, Any]:
         """Búsqueda flexible en múltiples campos"""
-        results = self.db.query(ProductVariant).join(Product).filter(
+        # Un SKU o código corto exacto es un escaneo: se resuelve a esa variante
+        variant = self.code_index and self.code_index.by_code(query)
+        if variant:
+            return {'found': True, 'type': 'flexible', 'variants': [variant], 'count': 1}
+        
+        results = [VariantCode.from_variant(v) for v in self.db.query(ProductVariant).join(Product).options(
+            *variant_with_product(joined=True)
+        ).filter(
             (ProductVariant.sku.ilike(f'%{query}%')) |
             (ProductVariant.short_code.ilike(f'%{query}%')) |
             (Product.name.ilike(f'%{query}%')),
             ProductVariant.is_active == True
-        ).limit(10).all()
+        ).limit(10)]
+        
+        if not results and self.code_index:
+            # Nada lo contiene: se sugieren las variantes con códigos o nombres parecidos (errores de digitación)
+            return {
+                'found': False,
+                'type': 'flexible',
+                'code': query,
+                'suggestions': self._fuzzy_suggestions(query)
+            }
         
         return {
             'found': len(results) > 0,
@@ -122,20 +292,63 @@ class ProductCodeHandler:
             'count': len(results)
         }
     
+    def _from_db(self, query) -> Optional[VariantCode]:
+        """Primera variante de la consulta; si el índice no la tenía (otro proceso la creó), la agrega"""
+        variant = query.options(*variant_with_product(joined=True)).first()
+        if variant is None:
+            return None
+        record = VariantCode.from_variant(variant)
+        if self.code_index:
+            self.code_index.add(record)
+        return record
+    
+    def _all_from_db(self, query) -> List[VariantCode]:
+        """Todas las variantes de la consulta; las agrega al índice como _from_db"""
+        records = [VariantCode.from_variant(variant) for variant in query.options(*variant_with_product(joined=True))]
+        if self.code_index:
+            for record in records:
+                self.code_index.add(record)
+        return records
+    
+    def _fuzzy_suggestions(self, query: str) -> List[Dict]:
+        """Variantes con SKU, código corto o nombre a una o dos ediciones de la consulta"""
+        if not self.code_index:
+            return []
+        return [
+            {
+                'variant_id': record.id,
+                'product_name': record.product_name,
+                'sku': record.sku,
+                'size': record.size,
+                'color': record.color,
+                'price': record.price,
+                'available': self.code_index.available(record.id),
+                'distance': distance
+            }
+            for record, distance in self.code_index.fuzzy(query)
+        ]
+
     def _find_similar_products(self, category: str, number: str) -> List[Dict]:
         """Encuentra productos similares"""
-        variants = self.db.query(ProductVariant).join(Product).filter(
-            Product.category_code == category,
-            Product.internal_number == number,
+        return self._find_similar_products_many({(category, number)}).get((category, number), [])
+    
+    def _find_similar_products_many(self, products: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Dict]]:
+        """Variantes activas de cada (categoría, número), en un solo SELECT"""
+        if not products:
+            return {}
+        variants = self.db.query(ProductVariant).join(Product).outerjoin(VariantStock).options(
+            *variant_with_product_and_stock(joined=True)
+        ).filter(
+            tuple_(Product.category_code, Product.internal_number).in_(list(products)),
             ProductVariant.is_active == True
         ).all()
         
-        return [
-            {
+        similar = {}
+        for v in variants:
+            similar.setdefault((v.product.category_code, v.product.internal_number), []).append({
                 'variant_id': v.id,
                 'size': v.size,
                 'color': v.color,
-                'available': self.inventory_manager.get_inventory_info(v.id)['total_available']
-            }
-            for v in variants
-        ]
\ No newline at end of file
+                'available': v.stock.available if v.stock else 0
+            })
+        return similar
\ No newline at end of file
@@ -0,0 +1,93 @@
+# backend/app/services/product_search.py
+"""Índice de texto completo de las variantes (tabla product_search)
+
+Una fila por variante con el nombre, la marca, los códigos (SKU, código corto y de barras), el
+color, la talla y la categoría. La crea la migración 0006 y la mantienen triggers de la base de
+datos en cada escritura de products y product_variants (también las de scripts o importaciones):
+  - SQLite: tabla virtual FTS5 (rowid = id de la variante) con el tokenizador unicode61, que
+    quita tildes al indexar y al consultar; ranking con bm25().
+  - PostgreSQL: columna tsvector con índice GIN, sin tildes vía la extensión unaccent; ranking
+    con ts_rank().
+
+Cada palabra de la búsqueda se busca por prefijo ("chaq term" encuentra "Chaqueta Térmica") y
+todas deben aparecer en la variante.
+"""
+import re
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.orm import Session
+
+SEARCH_TABLE = "product_search"
+
+# Peso de cada columna de la tabla FTS5 en bm25 (name, codes, brand, attributes)
+_BM25_WEIGHTS = "10.0, 10.0, 4.0, 2.0"
+
+_TOKEN_RE = re.compile(r'\w+')
+
+_SQLITE_REBUILD = [
+    f"DELETE FROM {SEARCH_TABLE}",
+    f"""INSERT INTO {SEARCH_TABLE} (rowid, name, codes, brand, attributes)
+        SELECT v.id, p.name,
+               coalesce(v.sku, '') || ' ' || coalesce(v.short_code, '') || ' ' || coalesce(v.barcode, ''),
+               coalesce(p.brand, ''),
+               v.color || ' ' || v.size || ' ' || p.category
+        FROM product_variants v JOIN products p ON p.id = v.product_id""",
+]
+
+_POSTGRES_REBUILD = [
+    f"DELETE FROM {SEARCH_TABLE}",
+    "SELECT product_search_refresh(ARRAY(SELECT id FROM product_variants))",
+]
+
+
+def _search_terms(query: str) -> List[List[str]]:
+    """Tokens de cada palabra de la búsqueda ("CH-001" -> ["CH", "001"])"""
+    terms = (_TOKEN_RE.findall(term) for term in query.split())
+    return [tokens for tokens in terms if tokens]
+
+
+def match_expression(query: str, dialect: str) -> Optional[str]:
+    """Consulta FTS5 (MATCH) o tsquery para la búsqueda; None si no tiene palabras"""
+    terms = _search_terms(query)
+    if not terms:
+        return None
+    if dialect == 'postgresql':
+        return ' & '.join(f"{token}:*" for tokens in terms for token in tokens)
+    # Frase con prefijo en su último token: "ch 001 m" * encuentra CH-001-M-NEG
+    return ' '.join(f'"{" ".join(tokens)}" *' for tokens in terms)
+
+
+def search_ranking(db: Session, query: str):
+    """Subconsulta (variant_id, rank) de las variantes que coinciden; menor rank = más relevante
+
+    None si la búsqueda no tiene palabras.
+    """
+    dialect = db.get_bind().dialect.name
+    expression = match_expression(query, dialect)
+    if expression is None:
+        return None
+
+    if dialect == 'postgresql':
+        statement = text(
+            f"SELECT variant_id, -ts_rank(document, to_tsquery('simple', unaccent(:match))) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', unaccent(:match))"
+        )
+    else:
+        statement = text(
+            f"SELECT rowid AS variant_id, bm25({SEARCH_TABLE}, {_BM25_WEIGHTS}) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+        )
+    return statement.bindparams(match=expression).columns(variant_id=Integer, rank=Float).subquery("search_matches")
+
+
+def rebuild_product_search(db: Session) -> Dict[str, float]:
+    """Regenera el índice completo (los triggers lo mantienen; esto es para repararlo)"""
+    started = time.perf_counter()
+    dialect = db.get_bind().dialect.name
+    for statement in _POSTGRES_REBUILD if dialect == 'postgresql' else _SQLITE_REBUILD:
+        db.execute(text(statement))
+    db.commit()
+
+    rows = db.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+    return {'variants': rows, 'duration_ms': round((time.perf_counter() - started) * 1000, 2)}
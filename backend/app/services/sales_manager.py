@@ -1,23 +1,156 @@
 # backend/app/services/sales_manager.py
 from typing import Dict, List, Optional, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import func, and_, or_, desc, insert
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime, timedelta
 from decimal import Decimal
-from ..models.sale import Sale, SaleItem, Payment, Refund, RefundItem
+from ..models.sale import Sale, SaleItem, Payment, Refund, RefundItem, SalesRollupHourly, SalesRollupDaily
 from ..models.product import ProductVariant, Product
 from ..models.inventory import Inventory, Location
 from ..services.inventory_manager import InventoryManager
-from ..services.cache_service import CacheService
+from ..services.cache_service import CacheService, get_cache_service
 import json
 
+def sales_totals(sales_query) -> Dict[str, Any]:
+    """Cantidad, ingresos, ganancia y artículos de las ventas de la consulta, en un solo SELECT"""
+    count, revenue, profit, items = sales_query.with_entities(
+        func.count(Sale.id),
+        func.coalesce(func.sum(Sale.total_amount), 0),
+        func.coalesce(func.sum(Sale.profit), 0),
+        func.coalesce(func.sum(Sale.total_items), 0)
+    ).one()
+    return {'count': count, 'revenue': revenue, 'profit': profit, 'items': items}
+
+# Claves por las que sales_rollup() puede agrupar
+ROLLUP_KEYS = ('hour', 'day', 'hour_of_day', 'payment_method', 'cashier_id')
+
+# Dialectos con INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def _floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _ceil_hour(moment: datetime) -> datetime:
+    floor = _floor_hour(moment)
+    return floor if floor == moment else floor + timedelta(hours=1)
+
+def _floor_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _ceil_day(moment: datetime) -> datetime:
+    floor = _floor_day(moment)
+    return floor if floor == moment else floor + timedelta(days=1)
+
+def _rollup_segments(start: datetime, end: datetime, hourly_only: bool) -> List[Tuple[Any, datetime, datetime]]:
+    """Divide [start, end) en días completos, horas completas y bordes que se leen de sales"""
+    hour_start, hour_end = _ceil_hour(start), _floor_hour(end)
+    if hour_start >= hour_end:
+        return [(Sale, start, end)]
+    
+    segments = [(Sale, start, hour_start), (Sale, hour_end, end)]
+    day_start, day_end = _ceil_day(hour_start), _floor_day(hour_end)
+    if hourly_only or day_start >= day_end:
+        segments.append((SalesRollupHourly, hour_start, hour_end))
+    else:
+        segments += [
+            (SalesRollupHourly, hour_start, day_start),
+            (SalesRollupDaily, day_start, day_end),
+            (SalesRollupHourly, day_end, hour_end)
+        ]
+    return [segment for segment in segments if segment[1] < segment[2]]
+
+def _rollup_rows(db: Session, source, start: datetime, end: datetime, group_by: Tuple[str, ...],
+                 cashier_id: Optional[str], payment_method: Optional[str]):
+    """Filas (claves..., count, revenue, profit, items) de un tramo"""
+    if source is Sale:
+        # Bordes de menos de una hora: pocas ventas, se suman una por una
+        columns = [Sale.created_at if key in ('hour', 'day', 'hour_of_day') else getattr(Sale, key) for key in group_by]
+        query = db.query(*columns, Sale.total_amount, Sale.profit, Sale.total_items).filter(
+            Sale.created_at >= start,
+            Sale.created_at < end,
+            Sale.status == 'completed'
+        )
+        if cashier_id:
+            query = query.filter(Sale.cashier_id == cashier_id)
+        if payment_method:
+            query = query.filter(Sale.payment_method == payment_method)
+        return [(*row[:len(group_by)], 1, *row[len(group_by):]) for row in query]
+    
+    columns = [
+        func.extract('hour', source.bucket) if key == 'hour_of_day'
+        else source.bucket if key in ('hour', 'day')
+        else getattr(source, key)
+        for key in group_by
+    ]
+    bounds = (start, end) if source is SalesRollupHourly else (start.date(), end.date())
+    query = db.query(
+        *columns,
+        func.sum(source.sales_count),
+        func.sum(source.revenue),
+        func.sum(source.profit),
+        func.sum(source.items)
+    ).filter(source.bucket >= bounds[0], source.bucket < bounds[1])
+    if cashier_id:
+        query = query.filter(source.cashier_id == cashier_id)
+    if payment_method:
+        query = query.filter(source.payment_method == payment_method)
+    if columns:
+        query = query.group_by(*columns)
+    return query.all()
+
+def _rollup_key(key: str, value):
+    if key == 'hour':
+        return _floor_hour(value)
+    if key == 'day':
+        return value.date() if isinstance(value, datetime) else value
+    if key == 'hour_of_day':
+        return value.hour if isinstance(value, datetime) else int(value)
+    if key == 'cashier_id':
+        return value or None
+    return value
+
+def sales_rollup(db: Session, start: datetime, end: datetime, group_by: Tuple[str, ...] = (),
+                 cashier_id: Optional[str] = None, payment_method: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Totales de las ventas completadas con start <= created_at < end, agrupados por group_by
+    
+    Los días completos se leen de sales_rollup_daily y las horas completas de sales_rollup_hourly;
+    solo los bordes que no caen en una hora exacta se suman desde sales. Cada fila trae las claves
+    pedidas (ver ROLLUP_KEYS) y count, revenue, profit e items.
+    """
+    group_by = tuple(group_by)
+    unknown = set(group_by) - set(ROLLUP_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown rollup keys: {', '.join(sorted(unknown))}")
+    
+    # Los días no se pueden partir por hora
+    hourly_only = 'hour' in group_by or 'hour_of_day' in group_by
+    grouped = {}
+    for source, segment_start, segment_end in _rollup_segments(start, end, hourly_only):
+        for row in _rollup_rows(db, source, segment_start, segment_end, group_by, cashier_id, payment_method):
+            key = tuple(_rollup_key(name, value) for name, value in zip(group_by, row))
+            count, revenue, profit, items = row[len(group_by):]
+            entry = grouped.setdefault(key, {**dict(zip(group_by, key)), 'count': 0, 'revenue': 0, 'profit': 0, 'items': 0})
+            entry['count'] += count or 0
+            entry['revenue'] += revenue or 0
+            entry['profit'] += profit or 0
+            entry['items'] += items or 0
+    
+    # Una fila puede quedar en cero si se cancelaron todas sus ventas
+    return [entry for entry in grouped.values() if entry['count']]
+
+def sales_rollup_totals(db: Session, start: datetime, end: datetime, **filters) -> Dict[str, Any]:
+    """Como sales_totals() para la ventana [start, end), leyendo los rollups"""
+    rows = sales_rollup(db, start, end, **filters)
+    return rows[0] if rows else {'count': 0, 'revenue': 0, 'profit': 0, 'items': 0}
+
 class SalesManager:
     """Gestión centralizada de ventas"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[CacheService] = None):
         self.db = db
-        self.inventory_manager = InventoryManager(db)
-        self.cache = CacheService()
+        self.cache = cache if cache is not None else get_cache_service()
+        self.inventory_manager = InventoryManager(db, self.cache)
     
     def create_sale(self, sale_data: Dict[str, Any], items_data: List[Dict[str, Any]], 
                    payments_data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
@@ -44,6 +177,7 @@ class SalesManager:
                 notes=sale_data.get('notes'),
                 cashier_id=sale_data.get('cashier_id'),
                 pos_terminal=sale_data.get('pos_terminal'),
+                total_amount=0,  # Se calcula después de crear los items
                 status='pending'
             )
             
@@ -53,6 +187,8 @@ class SalesManager:
             # Crear items de venta
             subtotal = 0
             total_cost = 0
+            total_profit = 0
+            total_items = 0
             
             for item_data in items_data:
                 variant = self.db.query(ProductVariant).get(item_data['variant_id'])
@@ -84,6 +220,8 @@ class SalesManager:
                 self.db.add(sale_item)
                 subtotal += total_price
                 total_cost += unit_cost * quantity
+                total_profit += sale_item.profit
+                total_items += quantity
             
             # Calcular totales
             total_discount = sale.discount_amount
@@ -98,6 +236,8 @@ class SalesManager:
             sale.discount_amount = total_discount
             sale.tax_amount = tax_amount
             sale.total_amount = total_amount
+            sale.profit = total_profit
+            sale.total_items = total_items
             
             # Procesar pagos
             if payments_data:
@@ -140,6 +280,7 @@ class SalesManager:
             # Marcar venta como completada
             sale.status = 'completed'
             sale.completed_at = datetime.now()
+            self._rollup_sale(sale)
             
             self.db.commit()
             
@@ -230,9 +371,13 @@ class SalesManager:
                     user_id=user_id
                 )
             
-            # Actualizar estado de la venta
+            # Actualizar estado de la venta; sin artículos ni ganancia después de restaurar el inventario
+            if sale.status == 'completed':
+                self._rollup_sale(sale, sign=-1)
             sale.status = 'cancelled'
             sale.cancelled_at = datetime.now()
+            sale.profit = 0
+            sale.total_items = 0
             if reason:
                 sale.notes = f"{sale.notes or ''}\nCancelled: {reason}".strip()
             
@@ -275,6 +420,7 @@ class SalesManager:
                 refund_method=refund_data.get('refund_method', 'original_method'),
                 notes=refund_data.get('notes'),
                 processed_by=refund_data.get('processed_by'),
+                refund_amount=0,  # Se calcula después de procesar los items
                 status='completed'
             )
             
@@ -283,6 +429,8 @@ class SalesManager:
             
             # Procesar items devueltos
             total_refund_amount = 0
+            refunded_items = 0
+            refunded_profit = 0
             
             for item_data in refund_items:
                 sale_item = self.db.query(SaleItem).get(item_data['sale_item_id'])
@@ -310,6 +458,10 @@ class SalesManager:
                 self.db.add(refund_item)
                 total_refund_amount += total_item_refund
                 
+                # Artículos y margen devueltos: se descuentan de la venta y de sus rollups
+                refunded_items += quantity_refunded
+                refunded_profit += (unit_refund_amount - sale_item.unit_cost) * quantity_refunded
+                
                 # Restaurar inventario si está en buenas condiciones
                 if refund_item.return_to_inventory:
                     # Buscar ubicación apropiada
@@ -339,6 +491,9 @@ class SalesManager:
             
             # Actualizar total de devolución
             refund.refund_amount = total_refund_amount
+            sale.total_items -= refunded_items
+            sale.profit -= refunded_profit
+            self._apply_rollup_delta(sale, profit=-refunded_profit, items=-refunded_items)
             
             self.db.commit()
             
@@ -376,19 +531,12 @@ class SalesManager:
         start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = start_date + timedelta(days=1)
         
-        # Consulta base para ventas del día
-        sales_query = self.db.query(Sale).filter(
-            Sale.created_at >= start_date,
-            Sale.created_at < end_date,
-            Sale.status == 'completed'
-        )
-        
-        # Estadísticas básicas
-        sales = sales_query.all()
-        total_sales = len(sales)
-        total_revenue = sum(sale.total_amount for sale in sales)
-        total_items_sold = sum(sale.total_items for sale in sales)
-        total_profit = sum(sale.profit for sale in sales)
+        # Estadísticas básicas (un día completo: filas de sales_rollup_daily)
+        totals = sales_rollup_totals(self.db, start_date, end_date)
+        total_sales = totals['count']
+        total_revenue = totals['revenue']
+        total_items_sold = totals['items']
+        total_profit = totals['profit']
         
         # Promedio por venta
         avg_sale_amount = total_revenue / total_sales if total_sales > 0 else 0
@@ -398,42 +546,44 @@ class SalesManager:
         for hour in range(24):
             hourly_sales[f"{hour:02d}:00"] = 0
         
-        for sale in sales:
-            hour_key = f"{sale.created_at.hour:02d}:00"
-            hourly_sales[hour_key] += sale.total_amount
+        for row in sales_rollup(self.db, start_date, end_date, ('hour_of_day',)):
+            hourly_sales[f"{row['hour_of_day']:02d}:00"] += row['revenue']
         
         # Métodos de pago
-        payment_methods = {}
-        for sale in sales:
-            method = sale.payment_method
-            if method not in payment_methods:
-                payment_methods[method] = {'count': 0, 'amount': 0}
-            payment_methods[method]['count'] += 1
-            payment_methods[method]['amount'] += sale.total_amount
-        
-        # Productos más vendidos
-        product_sales = {}
-        for sale in sales:
-            for item in sale.items:
-                key = f"{item.product_name} - {item.product_size} - {item.product_color}"
-                if key not in product_sales:
-                    product_sales[key] = {
-                        'name': item.product_name,
-                        'sku': item.product_sku,
-                        'size': item.product_size,
-                        'color': item.product_color,
-                        'quantity': 0,
-                        'revenue': 0
-                    }
-                product_sales[key]['quantity'] += item.quantity
-                product_sales[key]['revenue'] += item.total_price
+        payment_methods = {
+            row['payment_method']: {'count': row['count'], 'amount': row['revenue']}
+            for row in sales_rollup(self.db, start_date, end_date, ('payment_method',))
+        }
         
-        # Ordenar productos por cantidad vendida
-        top_products = sorted(
-            product_sales.values(),
-            key=lambda x: x['quantity'],
-            reverse=True
-        )[:10]
+        # Productos más vendidos (agrupados en SQL, sin cargar los items de cada venta)
+        top_products_query = self.db.query(
+            SaleItem.product_name,
+            func.min(SaleItem.product_sku).label('sku'),
+            SaleItem.product_size,
+            SaleItem.product_color,
+            func.sum(SaleItem.quantity).label('quantity'),
+            func.sum(SaleItem.total_price).label('revenue')
+        ).join(Sale).filter(
+            Sale.created_at >= start_date,
+            Sale.created_at < end_date,
+            Sale.status == 'completed'
+        ).group_by(
+            SaleItem.product_name,
+            SaleItem.product_size,
+            SaleItem.product_color
+        ).order_by(desc('quantity')).limit(10)
+        
+        top_products = [
+            {
+                'name': row.product_name,
+                'sku': row.sku,
+                'size': row.product_size,
+                'color': row.product_color,
+                'quantity': row.quantity,
+                'revenue': row.revenue
+            }
+            for row in top_products_query
+        ]
         
         summary = {
             'date': date_str,
@@ -455,7 +605,7 @@ class SalesManager:
             # Para el día actual, cachear por menos tiempo
             cache_expire = 300  # 5 minutos
         
-        self.cache.cache_daily_stats(date_str, summary)
+        self.cache.cache_daily_stats(date_str, summary, cache_expire)
         
         return summary
     
@@ -483,16 +633,15 @@ class SalesManager:
         if filters.get('max_amount'):
             query = query.filter(Sale.total_amount <= filters['max_amount'])
         
-        sales = query.all()
+        # Calcular métricas generales
+        totals = sales_totals(query)
+        total_sales = totals['count']
+        total_revenue = totals['revenue']
+        total_profit = totals['profit']
+        total_items = totals['items']
         
         # Agrupar datos según el parámetro group_by
-        grouped_data = self._group_sales_data(sales, group_by)
-        
-        # Calcular métricas generales
-        total_sales = len(sales)
-        total_revenue = sum(sale.total_amount for sale in sales)
-        total_profit = sum(sale.profit for sale in sales)
-        total_items = sum(sale.total_items for sale in sales)
+        grouped_data = self._group_sales_data(query.all(), group_by)
         
         return {
             'period': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
@@ -509,6 +658,111 @@ class SalesManager:
             'filters_applied': filters
         }
     
+    def sync_sale_rollups(self, sale: Sale, previous_status: Optional[str]) -> None:
+        """Ajusta los rollups si una venta entra o sale del estado 'completed' fuera de create/cancel"""
+        if previous_status != 'completed' and sale.status == 'completed':
+            self._rollup_sale(sale)
+        elif previous_status == 'completed' and sale.status != 'completed':
+            self._rollup_sale(sale, sign=-1)
+    
+    def rebuild_sales_rollups(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                              chunk_size: int = 1000) -> Dict[str, Any]:
+        """Recalcula los rollups desde sales para los días completos entre start y end (sin fechas, todo el historial)"""
+        start = _floor_day(start) if start else None
+        end = _ceil_day(end) if end else None
+        
+        query = self.db.query(
+            Sale.created_at, Sale.payment_method, Sale.cashier_id,
+            Sale.total_amount, Sale.profit, Sale.total_items
+        ).filter(Sale.status == 'completed')
+        if start:
+            query = query.filter(Sale.created_at >= start)
+        if end:
+            query = query.filter(Sale.created_at < end)
+        
+        hourly, daily = {}, {}
+        sales_count = 0
+        for created_at, payment_method, cashier_id, total_amount, profit, items in query.yield_per(chunk_size):
+            sales_count += 1
+            for buckets, bucket in ((hourly, _floor_hour(created_at)), (daily, created_at.date())):
+                totals = buckets.setdefault((bucket, payment_method, cashier_id or ''), [0, 0, 0, 0])
+                totals[0] += 1
+                totals[1] += total_amount
+                totals[2] += profit
+                totals[3] += items
+        
+        for model, buckets, bounds in (
+            (SalesRollupHourly, hourly, (start, end)),
+            (SalesRollupDaily, daily, (start and start.date(), end and end.date()))
+        ):
+            stale = self.db.query(model)
+            if bounds[0]:
+                stale = stale.filter(model.bucket >= bounds[0])
+            if bounds[1]:
+                stale = stale.filter(model.bucket < bounds[1])
+            stale.delete(synchronize_session=False)
+            
+            rows = [
+                {
+                    'bucket': bucket, 'payment_method': payment_method, 'cashier_id': cashier_id,
+                    'sales_count': count, 'revenue': revenue, 'profit': profit, 'items': items
+                }
+                for (bucket, payment_method, cashier_id), (count, revenue, profit, items) in buckets.items()
+            ]
+            if rows:
+                self.db.execute(insert(model), rows)
+        
+        self.db.commit()
+        self._clear_sales_cache()
+        
+        return {
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'sales': sales_count,
+            'hourly_rows': len(hourly),
+            'daily_rows': len(daily)
+        }
+    
+    def _rollup_sale(self, sale: Sale, sign: int = 1) -> None:
+        """Suma (o resta, con sign=-1) una venta completada a los rollups"""
+        self._apply_rollup_delta(
+            sale,
+            sales_count=sign,
+            revenue=sign * sale.total_amount,
+            profit=sign * sale.profit,
+            items=sign * sale.total_items
+        )
+    
+    def _apply_rollup_delta(self, sale: Sale, sales_count: int = 0, revenue: float = 0,
+                            profit: float = 0, items: int = 0) -> None:
+        """Aplica un cambio de la venta a su hora y su día dentro de la misma transacción"""
+        created_at = sale.created_at
+        deltas = {'sales_count': sales_count, 'revenue': revenue, 'profit': profit, 'items': items}
+        for model, bucket in ((SalesRollupHourly, _floor_hour(created_at)), (SalesRollupDaily, created_at.date())):
+            keys = {'bucket': bucket, 'payment_method': sale.payment_method, 'cashier_id': sale.cashier_id or ''}
+            make_insert = _UPSERT_INSERTS.get(self.db.get_bind().dialect.name)
+            
+            if make_insert:
+                # Sumas relativas: dos ventas simultáneas en la misma hora no se pisan
+                statement = make_insert(model).values(**keys, **deltas)
+                statement = statement.on_conflict_do_update(
+                    index_elements=list(keys),
+                    set_={
+                        **{name: getattr(model, name) + statement.excluded[name] for name in deltas},
+                        'updated_at': func.now()
+                    }
+                )
+                self.db.execute(statement)
+                continue
+            
+            updated = self.db.query(model).filter_by(**keys).update(
+                {getattr(model, name): getattr(model, name) + value for name, value in deltas.items()},
+                synchronize_session=False
+            )
+            if not updated:
+                self.db.add(model(**keys, **deltas))
+                self.db.flush()
+    
     def _validate_stock_availability(self, items_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Valida que hay stock suficiente para todos los items"""
         insufficient_stock = []
@@ -644,7 +898,5 @@ class SalesManager:
         return sorted(grouped.values(), key=lambda x: x['period'])
     
     def _clear_sales_cache(self):
-        """Limpia caché relacionado con ventas"""
-        self.cache.delete_pattern("daily_stats:*")
-        self.cache.delete_pattern("sales_report:*")
-        self.cache.delete("current_metrics")
\ No newline at end of file
+        """Limpia caché relacionado con ventas (reportes, conteos y métricas en tiempo real)"""
+        self.cache.invalidate_tag("sales")
\ No newline at end of file
@@ -0,0 +1,151 @@
+# backend/app/utils/fuzzy.py
+"""Búsqueda aproximada de términos con distancia de edición acotada
+
+Una edición es una letra de menos, de más, cambiada o dos letras invertidas.
+
+  - 1 edición: se generan todas las variantes de la consulta a una edición (unas centenas) y se
+    buscan tal cual en el diccionario de términos. El costo depende del largo de la consulta, no
+    del tamaño del índice.
+  - 2 ediciones: las variantes con letras del alfabeto serían demasiadas, así que se indexan
+    solo las que borran letras: cada término se guarda bajo sus textos con hasta 2 letras de
+    menos ("chaqueta" -> "chaqeta", "chqeta", ...). Dos textos a k ediciones tienen un texto en
+    común borrando a lo sumo k letras de cada uno (una letra de más o de menos es un borrado de
+    un lado, una cambiada o dos invertidas, uno de cada lado), así que los candidatos son los
+    términos guardados bajo los borrados de la consulta y se verifican con la distancia de
+    edición. Son unas decenas de búsquedas en un diccionario, según el largo de la consulta, y
+    los candidatos son los vecinos reales de la consulta: ni unas ni otros crecen con el índice.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+def deletions(term: str, count: int) -> Set[str]:
+    """term y los textos que resultan de borrarle hasta count letras"""
+    result, frontier = {term}, {term}
+    for _ in range(count):
+        frontier = {text[:i] + text[i + 1:] for text in frontier for i in range(len(text))}
+        result |= frontier
+    return result
+
+
+def one_edit(term: str, alphabet: Iterable[str]) -> Iterator[str]:
+    """Textos a una edición de term (con repetidos) usando las letras de alphabet"""
+    for i in range(len(term) + 1):
+        left, right = term[:i], term[i:]
+        if right:
+            yield left + right[1:]
+        if len(right) > 1:
+            yield left + right[1] + right[0] + right[2:]
+        for char in alphabet:
+            yield left + char + right
+            if right:
+                yield left + char + right[1:]
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Distancia de edición contando dos letras invertidas como una sola edición
+
+    Cualquier valor mayor que max_distance se retorna como max_distance + 1.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) > len(b):
+        a, b = b, a
+
+    before, previous = None, list(range(len(a) + 1))
+    for j, char_b in enumerate(b, 1):
+        current = [j]
+        for i, char_a in enumerate(a, 1):
+            cost = min(
+                previous[i] + 1,
+                current[i - 1] + 1,
+                previous[i - 1] + (char_a != char_b)
+            )
+            if before is not None and i > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[i - 2] + 1)
+            current.append(cost)
+        # Las inversiones miran dos filas atrás: solo se corta cuando ambas ya se pasaron
+        if min(current) > max_distance and min(previous) > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class FuzzyIndex:
+    """Término -> ids (ordenados), con búsqueda de los términos a distancia de edición acotada
+
+    max_distance es el máximo que se podrá pedir en search(); los borrados solo se mantienen si
+    es mayor que 1. No es seguro para hilos: quien lo comparte debe serializar escrituras y
+    búsquedas.
+    """
+
+    def __init__(self, max_distance: int = 2):
+        self.max_distance = max_distance
+        self._deletions: Dict[str, Set[str]] = {}
+        self._ids: Dict[str, List[int]] = {}
+        self._alphabet: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, term: str, item_id: int) -> None:
+        ids = self._ids.get(term)
+        if ids is None:
+            ids = self._ids[term] = []
+            self._alphabet.update(term)
+            if self.max_distance > 1:
+                for key in deletions(term, self.max_distance):
+                    self._deletions.setdefault(key, set()).add(term)
+        position = bisect_left(ids, item_id)
+        if position == len(ids) or ids[position] != item_id:
+            ids.insert(position, item_id)
+
+    def remove(self, term: str, item_id: int) -> None:
+        ids = self._ids.get(term)
+        if ids is None:
+            return
+        position = bisect_left(ids, item_id)
+        if position < len(ids) and ids[position] == item_id:
+            del ids[position]
+        if ids:
+            return
+        del self._ids[term]
+        for key in deletions(term, self.max_distance) if self.max_distance > 1 else ():
+            terms = self._deletions.get(key)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._deletions[key]
+
+    def ids(self, term: str) -> List[int]:
+        """Ids del término, de menor a mayor (no modificar)"""
+        return self._ids.get(term, [])
+
+    def contains(self, term: str, item_id: int) -> bool:
+        ids = self._ids.get(term, ())
+        position = bisect_left(ids, item_id)
+        return position < len(ids) and ids[position] == item_id
+
+    def search(self, query: str, max_distance: int) -> List[Tuple[str, int]]:
+        """(término, distancia) a distancia <= max_distance, de la más cercana a la más lejana"""
+        if max_distance > self.max_distance:
+            raise ValueError(f"El índice admite hasta {self.max_distance} ediciones")
+        if max_distance <= 1:
+            matches = [(query, 0)] if query in self._ids else []
+            if max_distance == 1:
+                near = {term for term in one_edit(query, self._alphabet) if term in self._ids}
+                near.discard(query)
+                matches.extend((term, 1) for term in sorted(near))
+            return matches
+
+        candidates = set()
+        for key in deletions(query, max_distance):
+            candidates.update(self._deletions.get(key, ()))
+
+        matches = []
+        for term in candidates:
+            distance = edit_distance(query, term, max_distance)
+            if distance <= max_distance:
+                matches.append((term, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
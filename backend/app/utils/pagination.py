@@ -0,0 +1,75 @@
+# backend/app/utils/pagination.py
+"""Paginación por cursor (keyset)
+
+En vez de OFFSET, cada página continúa después de la última fila de la anterior:
+
+    rows, next_cursor = keyset_page(query, (Sale.created_at, Sale.id), cursor, limit, descending=True)
+
+El costo de una página no depende de qué tan profunda sea. La última columna de la clave debe
+ser única (id) para que el orden sea total. El cursor es opaco para el cliente: base64 de los
+valores de la clave de la última fila.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import DateTime, String, literal, tuple_, type_coerce
+
+
+class InvalidCursorError(ValueError):
+    """El cursor no corresponde a la clave del listado"""
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    """Valores del cursor convertidos a los tipos de la clave"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursorError("Invalid cursor")
+    try:
+        return tuple(
+            datetime.fromisoformat(value) if expected is datetime else expected(value)
+            for value, expected in zip(values, types)
+        )
+    except (TypeError, ValueError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def keyset_page(query, columns: Sequence, cursor: Optional[str] = None, limit: int = 50,
+                descending: bool = False, offset: int = 0) -> Tuple[List[Any], Optional[str]]:
+    """Una página de `query` (una sola entidad) ordenada por `columns` a partir del cursor
+
+    Sin cursor se aplica `offset` (compatibilidad con clientes que paginan por offset).
+    Retorna (filas, next_cursor); next_cursor es None en la última página.
+    """
+    # SQLite guarda las fechas como texto y las compara como texto: el cursor lleva el valor
+    # exactamente como está en la tabla (CURRENT_TIMESTAMP no tiene microsegundos)
+    sqlite = query.session.get_bind().dialect.name == 'sqlite'
+    keys = [
+        type_coerce(column, String) if sqlite and isinstance(column.type, DateTime) else column
+        for column in columns
+    ]
+
+    if cursor:
+        values = decode_cursor(cursor, *(key.type.python_type for key in keys))
+        bound = tuple_(*(literal(value, key.type) for value, key in zip(values, keys)))
+        query = query.filter(tuple_(*keys) < bound if descending else tuple_(*keys) > bound)
+
+    query = query.add_columns(*keys).order_by(*(key.desc() if descending else key.asc() for key in keys))
+    if offset and not cursor:
+        query = query.offset(offset)
+
+    # Una fila de más indica si hay otra página
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = encode_cursor(*rows[limit - 1][1:]) if len(rows) > limit else None
+    return [row[0] for row in rows[:limit]], next_cursor
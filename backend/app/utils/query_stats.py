@@ -0,0 +1,111 @@
+# backend/app/utils/query_stats.py
+import re
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)|\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)*\s*\)")
+_SPACES = re.compile(r"\s+")
+_SELECT_LIST = re.compile(r"^SELECT .*? FROM ", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    """Forma de la sentencia sin literales ni largo de listas IN, para detectar repeticiones"""
+    shape = _LITERALS.sub("?", statement)
+    shape = _PARAM_LISTS.sub("(?)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+def _abbreviate(shape: str, limit: int = 300) -> str:
+    """Omite la lista de columnas para que el log muestre FROM/WHERE"""
+    return _SELECT_LIST.sub("SELECT ... FROM ", shape)[:limit]
+
+
+class QueryStats:
+    """Sentencias y tiempo de base de datos acumulados durante una petición"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.db_time += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int):
+        """Formas de sentencia ejecutadas más de `threshold` veces (posible N+1)"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+# Los handlers síncronos corren en el threadpool con una copia del contexto: ven el mismo objeto
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Estadísticas de la petición en curso (None fuera de una petición)"""
+    return _current_stats.get()
+
+
+def install_query_instrumentation(*engines: Engine) -> None:
+    """Registra los eventos que miden cada sentencia en los engines (una sola vez por engine)"""
+    for engine in {id(engine): engine for engine in engines}.values():
+        if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            continue
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    """Cuenta sentencias y tiempo de DB por petición; los expone en headers y en el log"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+
+    total_ms = (time.perf_counter() - started) * 1000
+    db_time_ms = stats.db_time * 1000
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{db_time_ms:.2f}"
+
+    threshold = settings.db_repeated_query_threshold
+    repeated = stats.repeated(threshold)
+    if repeated:
+        response.headers["X-DB-Repeated-Queries"] = str(len(repeated))
+        for shape, count in repeated:
+            logger.warning(
+                f"event=repeated_query method={request.method} path={request.url.path} "
+                f"count={count} threshold={threshold} statement=\"{_abbreviate(shape)}\""
+            )
+
+    if stats.count:
+        logger.info(
+            f"event=db_request method={request.method} path={request.url.path} "
+            f"status={response.status_code} queries={stats.count} db_time_ms={db_time_ms:.2f} "
+            f"total_ms={total_ms:.2f}"
+        )
+    return response
@@ -4,14 +4,15 @@ import os
 sys.path.append(os.path.dirname(__file__))
 
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine
-from app.models.base import Base
+from app.database import SessionLocal
+from app.migrations import upgrade_to_head
+from app.services.inventory_manager import InventoryManager
 from app.models.product import Product, ProductVariant
 from app.models.inventory import Location, Inventory
 from datetime import datetime
 
-# Crear todas las tablas
-Base.metadata.create_all(bind=engine)
+# Crear o actualizar las tablas con las migraciones
+upgrade_to_head()
 
 def crear_datos_almacen():
     """Crear datos iniciales para el almacén de chaquetas y gorras"""
@@ -356,6 +357,8 @@ def crear_datos_almacen():
             db.add(inv_bodega)
         
         db.commit()
+        # Totales por variante del inventario recién creado
+        InventoryManager(db).reconcile_variant_stock()
         print("✅ Datos del almacén creados exitosamente!")
         print(f"   - {len(ubicaciones)} ubicaciones")
         print(f"   - 4 productos base")
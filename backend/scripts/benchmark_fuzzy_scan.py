@@ -0,0 +1,169 @@
+# backend/scripts/benchmark_fuzzy_scan.py
+"""Latencia de la búsqueda aproximada (errores de digitación) según el tamaño del catálogo
+
+Arma en memoria el índice de códigos con catálogos sintéticos de distinto tamaño (sin base de
+datos) y busca códigos cortos, SKU y palabras del nombre con un error de digitación: una letra
+de menos, de más, cambiada o dos letras invertidas ("CH-01-M-NEG", "chaketa").
+
+Reporta p50/p99 por consulta y qué porcentaje de las veces la variante buscada (o, para
+palabras del nombre, un producto con esa palabra) quedó entre los 10 resultados. El costo de una
+búsqueda depende del largo de la consulta, no del catálogo: el script termina con error si el p50
+del catálogo más grande supera --max-ratio veces el del más chico.
+
+Los códigos del catálogo están muy juntos ("CH-001-M-NEG", "CH-007-M-NEG", ...): a medida que
+crece, más errores de digitación caen sobre otro código real o quedan a la misma distancia de más
+de 10 códigos, y no hay cómo saber cuál se quiso escribir. Esos casos se reportan como empates
+(los 10 resultados están al menos tan cerca de la consulta como la variante buscada) y no como
+fallos; un fallo que no es empate también termina con error.
+
+Uso: python scripts/benchmark_fuzzy_scan.py --sizes 1000 10000 100000 --queries 500 --max-ratio 3
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+os.environ["DEBUG"] = "false"
+os.environ["CODE_INDEX_MAX_AGE"] = "0"  # Sin recargas desde la base de datos
+
+# Agregar el directorio padre al path para poder importar los módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.code_index import FUZZY_MIN_LENGTH, CodeIndex, VariantCode, _fuzzy_term, fold
+from app.utils.fuzzy import edit_distance
+
+LIMIT = 10
+
+NOUNS = ["Chaqueta", "Gorra", "Parka", "Buzo", "Guantes", "Bufanda", "Chaleco", "Pantalón", "Camiseta", "Medias"]
+ADJECTIVES = ["Térmica", "Andina", "Impermeable", "Polar", "Deportiva", "Clásica", "Urbana", "Liviana"]
+SYLLABLES = ["ka", "lu", "ri", "mon", "tea", "sol", "var", "ne", "qui", "pa", "dor", "le", "zan", "to"]
+SIZES = (("Medium", "M"), ("Large", "L"), ("Small", "S"), ("Extra Large", "XL"))
+COLORS = (("Negro", "NEG"), ("Azul", "AZU"), ("Rojo", "ROJ"), ("Verde", "VER"))
+
+
+def catalog(variant_count: int) -> list:
+    """(VariantCode, disponible) de un catálogo sintético: 8 variantes por producto"""
+    rng = random.Random(variant_count)
+    records = []
+    product_id = 0
+    while len(records) < variant_count:
+        product_id += 1
+        category_code = chr(65 + product_id // 26000 % 26) + chr(65 + product_id // 1000 % 26)
+        number = f"{product_id % 1000:03d}"
+        # Un nombre de modelo inventado por producto: el vocabulario crece con el catálogo
+        model = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        name = f"{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {model}"
+        for size, size_code in SIZES[:2]:
+            for color, color_code in COLORS:
+                short_code = f"{category_code}-{number}-{size_code}-{color_code}"
+                records.append((VariantCode(
+                    len(records) + 1, product_id, name, category_code, number,
+                    short_code.replace("-", ""), f"77{len(records):011d}", short_code,
+                    size, color, None, 120000.0, False, True
+                ), 10))
+    return records[:variant_count]
+
+
+def typo(rng: random.Random, text: str, alphabet: str) -> str:
+    """Una letra de menos, de más, cambiada o dos letras invertidas"""
+    position = rng.randrange(len(text) - 1)
+    kind = rng.choice(("delete", "insert", "replace", "swap"))
+    letter = rng.choice(alphabet)
+    if kind == "delete":
+        return text[:position] + text[position + 1:]
+    if kind == "insert":
+        return text[:position] + letter + text[position:]
+    if kind == "replace":
+        return text[:position] + letter + text[position + 1:]
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+def distance(query: str, target: str) -> int:
+    """Ediciones entre la consulta y el texto buscado, como las cuenta el índice"""
+    return edit_distance(_fuzzy_term(fold(query)), _fuzzy_term(fold(target)), 3)
+
+
+def queries(records: list, count: int) -> list:
+    """(tipo, consulta, ¿acierto?, ediciones hasta lo buscado) con un error de digitación"""
+    rng = random.Random(count)
+    result = []
+    for index in range(count):
+        record, _ = rng.choice(records)
+        kind = ("código corto", "sku", "nombre")[index % 3]
+        if kind == "nombre":
+            # Palabras que sigan siendo buscables (FUZZY_MIN_LENGTH letras) aun con una letra de menos
+            words = record.product_name.split()
+            word = rng.choice([w for w in words if len(w) >= 6] or [w for w in words if len(w) > FUZZY_MIN_LENGTH])
+            hit = lambda found, word=fold(word): any(word in fold(r.product_name).split() for r, _ in found)
+            query = typo(rng, word, string.ascii_lowercase)
+            result.append((kind, query, hit, distance(query, word)))
+        else:
+            code = record.short_code if kind == "código corto" else record.sku
+            hit = lambda found, variant_id=record.id: any(r.id == variant_id for r, _ in found)
+            query = typo(rng, code, string.ascii_uppercase + string.digits)
+            result.append((kind, query, hit, distance(query, code)))
+    return result
+
+
+def outcome(found: list, hit, target_distance: int) -> str:
+    if hit(found):
+        return "acierto"
+    if len(found) == LIMIT and all(edits <= target_distance for _, edits in found):
+        return "empate"
+    return "fallo"
+
+
+def main(args):
+    print(f"{'variantes':>10}{'palabras':>10}{'carga s':>10}{'tipo':>14}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'aciertos':>10}{'empates':>10}")
+    p50s, failures = {}, 0
+    for size in args.sizes:
+        records = catalog(size)
+        index = CodeIndex()
+        started = time.perf_counter()
+        index.load_records(records)
+        load_seconds = time.perf_counter() - started
+        words = index.stats()['fuzzy_words']
+
+        timings = {}
+        for kind, query, hit, target_distance in queries(records, args.queries):
+            started = time.perf_counter()
+            found = index.fuzzy(query, LIMIT)
+            elapsed = (time.perf_counter() - started) * 1000
+            timings.setdefault(kind, []).append((elapsed, outcome(found, hit, target_distance)))
+
+        for kind, samples in timings.items():
+            latencies = sorted(elapsed for elapsed, _ in samples)
+            outcomes = [result for _, result in samples]
+            hits = outcomes.count("acierto") / len(samples) * 100
+            ties = outcomes.count("empate") / len(samples) * 100
+            failures += outcomes.count("fallo")
+            p50s.setdefault(kind, []).append(statistics.median(latencies))
+            print(f"{size:>10}{words:>10}{load_seconds:>10.1f}{kind:>14}{statistics.median(latencies):>10.3f}"
+                  f"{latencies[int(len(latencies) * 0.99) - 1]:>10.3f}{hits:>9.0f}%{ties:>9.0f}%")
+
+    failed = failures > 0
+    if failed:
+        print(f"{failures} consultas no encontraron lo buscado sin que hubiera empate")
+    if len(args.sizes) > 1:
+        for kind, values in p50s.items():
+            ratio = values[-1] / values[0]
+            print(f"p50 {kind}: {args.sizes[-1]} / {args.sizes[0]} variantes = {ratio:.1f}x")
+            if ratio > args.max_ratio:
+                print(f"  supera el máximo de {args.max_ratio:.1f}x")
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia de la búsqueda aproximada según el tamaño del catálogo")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="Máximo p50 del catálogo más grande / p50 del más chico")
+    main(parser.parse_args())
@@ -0,0 +1,167 @@
+# backend/scripts/benchmark_scan_latency.py
+"""Latencia de escaneos mientras corre un reporte pesado
+
+Crea una base SQLite temporal con catálogo y ventas, y mide la latencia de /products/scan:
+  - sin carga,
+  - mientras /reports/sales/summary corre en el threadpool (handlers síncronos),
+  - mientras el mismo reporte corre dentro del event loop (como un handler `async def`).
+
+Uso: python scripts/benchmark_scan_latency.py --variants 1000 --sales 1000 --scans 100
+
+El último escenario toma pocas muestras (--blocking-scans): cada escaneo espera varios reportes completos.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Base temporal y caché local: se configuran antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_scan_"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DEBUG"] = "false"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["CACHE_WARMUP_ENABLED"] = "false"
+
+# Agregar el directorio padre al path para poder importar los módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from app.main import app
+from app.database import SessionLocal, run_with_session
+from app.api import reports
+from app.models.product import Product, ProductVariant
+from app.models.inventory import Location, Inventory
+from app.models.sale import Sale, SaleItem
+from app.services.cache_service import get_cache_service
+from app.services.inventory_manager import InventoryManager
+from app.services.sales_manager import SalesManager
+
+REPORT_START = datetime.now() - timedelta(days=400)
+
+
+def seed(variant_count: int, sale_count: int) -> list:
+    """Crea catálogo, inventario y ventas; retorna los códigos de barras"""
+    db = SessionLocal()
+    location = Location(name="Bodega", type="storage", section="General")
+    db.add(location)
+    db.flush()
+
+    barcodes = []
+    variants = []
+    for product_index in range(variant_count // 10 + 1):
+        product = Product(name=f"Producto {product_index}", category="General", category_code="GE",
+                          internal_number=f"{product_index:03d}"[-3:], base_price=100000)
+        db.add(product)
+        db.flush()
+        for variant_index in range(10):
+            if len(variants) == variant_count:
+                break
+            barcode = f"77{len(variants):011d}"
+            variant = ProductVariant(product_id=product.id, sku=f"SKU-{len(variants)}", barcode=barcode,
+                                     size="M", color="Negro", color_code="NEG", price=120000, cost=70000)
+            variants.append(variant)
+            barcodes.append(barcode)
+    db.add_all(variants)
+    db.flush()
+    db.add_all([Inventory(variant_id=v.id, location_id=location.id, quantity=10, min_stock=2) for v in variants])
+
+    for sale_index in range(sale_count):
+        created_at = datetime.now() - timedelta(minutes=random.randint(0, 300 * 24 * 60))
+        sale = Sale(sale_number=f"B-{sale_index:08d}", subtotal=240000, total_amount=240000,
+                    profit=100000, total_items=2, payment_method="cash",
+                    created_at=created_at, completed_at=created_at)
+        variant = random.choice(variants)
+        sale.items = [SaleItem(variant_id=variant.id, quantity=2, unit_price=120000, unit_cost=70000,
+                               total_price=240000, product_name="Producto", product_sku=variant.sku,
+                               product_size="M", product_color="Negro")]
+        db.add(sale)
+    db.commit()
+    InventoryManager(db).reconcile_variant_stock()
+    SalesManager(db).rebuild_sales_rollups()
+    db.close()
+    return barcodes
+
+
+@app.get("/_bench/blocking-report")
+async def blocking_report():
+    """El reporte ejecutado dentro del event loop, como lo hacían los handlers `async def`"""
+    run_with_session(lambda db: reports.get_sales_summary(
+        start_date=REPORT_START, end_date=datetime.now(), group_by="day",
+        category=None, cashier_id=None, db=db
+    ))
+    return {}
+
+
+async def measure_scans(client: httpx.AsyncClient, barcodes: list, count: int) -> list:
+    latencies = []
+    for barcode in random.sample(barcodes, min(count, len(barcodes))):
+        started = time.perf_counter()
+        response = await client.post("/api/products/scan", json={"code": barcode})
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+async def run_reports(client: httpx.AsyncClient, path: str, params: dict, stop: asyncio.Event) -> int:
+    completed = 0
+    while not stop.is_set():
+        await client.get(path, params=params)
+        completed += 1
+        # Sin red de por medio la petición no cede el event loop; uvicorn sí lo haría al escribir el socket
+        await asyncio.sleep(0)
+    return completed
+
+
+async def scenario(client, barcodes, scans, report_path=None) -> dict:
+    get_cache_service().clear()  # Cada escaneo pasa por la base de datos
+    stop = asyncio.Event()
+    params = {"start_date": REPORT_START.isoformat(), "end_date": datetime.now().isoformat()}
+    report_task = asyncio.create_task(run_reports(client, report_path, params, stop)) if report_path else None
+    await asyncio.sleep(0.05)
+
+    latencies = await measure_scans(client, barcodes, scans)
+
+    stop.set()
+    reports_completed = await report_task if report_task else 0
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        'max_ms': round(latencies[-1], 2),
+        'reports': reports_completed
+    }
+
+
+async def main(args):
+    from app.migrations import upgrade_to_head
+    upgrade_to_head()
+
+    print(f"Creando {args.variants} variantes y {args.sales} ventas en {DB_PATH}...")
+    barcodes = seed(args.variants, args.sales)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            results = {
+                'sin carga': await scenario(client, barcodes, args.scans),
+                'reporte en threadpool': await scenario(client, barcodes, args.scans, "/api/reports/sales/summary"),
+                'reporte en event loop': await scenario(client, barcodes, args.blocking_scans, "/_bench/blocking-report"),
+            }
+
+    print(f"\n{'escenario':<24}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'reportes':>10}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['p50_ms']:>10}{result['p99_ms']:>10}{result['max_ms']:>10}{result['reports']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia de escaneos con un reporte pesado en paralelo")
+    parser.add_argument("--variants", type=int, default=1000)
+    parser.add_argument("--sales", type=int, default=1000)
+    parser.add_argument("--scans", type=int, default=100)
+    parser.add_argument("--blocking-scans", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,166 @@
+# backend/scripts/benchmark_scan_throughput.py
+"""Escaneos por segundo con y sin el índice de códigos en memoria
+
+Crea una base SQLite temporal con un catálogo y resuelve códigos de barras, códigos cortos y SKU
+exactos (mezclados) de dos formas:
+  - ProductCodeHandler.process_code, con el inventario ya en caché (solo la resolución del código),
+  - POST /products/scan, un código distinto por petición (sin el caché de escaneos),
+  - POST /products/scan/batch, los mismos códigos en lotes de --batch.
+
+Cada medición se hace consultando la base de datos (code_index_enabled=false, como antes del
+índice) y con el índice cargado.
+
+Uso: python scripts/benchmark_scan_throughput.py --variants 20000 --scans 3000 --batch 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Base temporal y caché local: se configuran antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_index_"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DEBUG"] = "false"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["CACHE_MAX_ENTRIES"] = "0"
+os.environ["CACHE_MAX_BYTES"] = "0"
+os.environ["CACHE_WARMUP_ENABLED"] = "false"
+os.environ["CODE_INDEX_ENABLED"] = "false"
+os.environ["DB_QUERY_STATS_ENABLED"] = "false"
+
+# Agregar el directorio padre al path para poder importar los módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.database import SessionLocal
+from app.models.product import Product, ProductVariant
+from app.models.inventory import Location, Inventory
+from app.services.cache_service import get_cache_service
+from app.services.code_index import get_code_index, install_code_index_hooks
+from app.services.inventory_manager import InventoryManager
+from app.services.product_handler import ProductCodeHandler
+
+SIZES = (("Medium", "M"), ("Large", "L"))
+COLORS = (("Negro", "NEG"), ("Azul", "AZU"))
+KINDS = ("barras", "corto", "sku")
+
+
+def seed(variant_count: int) -> list:
+    """Crea el catálogo; retorna un código (de barras, corto o SKU, alternados) por variante"""
+    db = SessionLocal()
+    location = Location(name="Bodega", type="storage", section="General")
+    db.add(location)
+    db.flush()
+
+    variants = []
+    product_index = 0
+    while len(variants) < variant_count:
+        # Mil números internos por código de categoría: AA-000 ... AA-999, AB-000 ...
+        category_code = chr(65 + product_index // 26000 % 26) + chr(65 + product_index // 1000 % 26)
+        product = Product(name=f"Producto {product_index}", category="General", category_code=category_code,
+                          internal_number=f"{product_index % 1000:03d}", base_price=100000)
+        db.add(product)
+        db.flush()
+        for size, size_code in SIZES:
+            for color, color_code in COLORS:
+                code = f"{category_code}-{product_index % 1000:03d}-{size_code}-{color_code}"
+                variants.append(ProductVariant(
+                    product_id=product.id, sku=f"SKU{len(variants):07d}", barcode=f"77{len(variants):011d}",
+                    short_code=code, size=size, color=color, color_code=color_code, price=120000, cost=70000
+                ))
+        product_index += 1
+    variants = variants[:variant_count]
+    db.add_all(variants)
+    db.flush()
+    db.add_all([Inventory(variant_id=v.id, location_id=location.id, quantity=10, min_stock=2) for v in variants])
+    db.commit()
+    InventoryManager(db).reconcile_variant_stock()
+
+    codes = [(KINDS[i % 3], (v.barcode, v.short_code, v.sku)[i % 3]) for i, v in enumerate(variants)]
+    db.close()
+    return codes
+
+
+def measure_handler(codes: list) -> dict:
+    """process_code por segundo de cada tipo de código (el inventario ya está en caché)"""
+    db = SessionLocal()
+    try:
+        handler = ProductCodeHandler(db, get_cache_service())
+        rates = {}
+        for kind in KINDS:
+            kind_codes = [code for code_kind, code in codes if code_kind == kind]
+            started = time.perf_counter()
+            for code in kind_codes:
+                if not handler.process_code(code)['found']:
+                    raise RuntimeError(f"Código no encontrado: {code}")
+            rates[kind] = len(kind_codes) / (time.perf_counter() - started)
+        return rates
+    finally:
+        db.close()
+
+
+def measure_endpoint(client: TestClient, codes: list) -> float:
+    """POST /products/scan por segundo, cada código una vez"""
+    cache = get_cache_service()
+    for _, code in codes:
+        cache.forget_scan_codes(code)
+    started = time.perf_counter()
+    for _, code in codes:
+        response = client.post("/api/products/scan", json={"code": code})
+        if not response.json().get("success"):
+            raise RuntimeError(f"Escaneo fallido: {code}")
+    return len(codes) / (time.perf_counter() - started)
+
+
+def measure_batch(client: TestClient, codes: list, batch_size: int) -> float:
+    """Códigos por segundo con POST /products/scan/batch"""
+    started = time.perf_counter()
+    for start in range(0, len(codes), batch_size):
+        batch = [code for _, code in codes[start:start + batch_size]]
+        response = client.post("/api/products/scan/batch", json={"codes": batch}).json()
+        if response["not_found"]:
+            raise RuntimeError(f"Escaneo en lote fallido: {response['not_found']} códigos no encontrados")
+    return len(codes) / (time.perf_counter() - started)
+
+
+def main(args):
+    from app.migrations import upgrade_to_head
+    upgrade_to_head()
+
+    print(f"Creando {args.variants} variantes en {DB_PATH}...")
+    codes = seed(args.variants)
+    sample = random.sample(codes, min(args.scans, len(codes)))
+
+    db = SessionLocal()
+    InventoryManager(db, get_cache_service()).preload_inventory_info(list(range(1, args.variants + 1)))
+    loaded = get_code_index().load(db)
+    db.close()
+    install_code_index_hooks()
+    print(f"Índice: {loaded['variants']} variantes en {loaded['duration_ms']} ms")
+
+    results = {}
+    with TestClient(app) as client:
+        for name, enabled in (("base de datos", False), ("índice", True)):
+            settings.code_index_enabled = enabled
+            results[name] = (
+                measure_handler(sample), measure_endpoint(client, sample), measure_batch(client, sample, args.batch)
+            )
+
+    print(f"\n{'resolución':<16}" + "".join(f"{kind + '/s':>12}" for kind in KINDS)
+          + f"{'POST /scan/s':>16}{'/scan/batch/s':>16}")
+    for name, (handler_rates, endpoint_rate, batch_rate) in results.items():
+        print(f"{name:<16}" + "".join(f"{handler_rates[kind]:>12.0f}" for kind in KINDS)
+              + f"{endpoint_rate:>16.0f}{batch_rate:>16.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escaneos por segundo con y sin el índice de códigos")
+    parser.add_argument("--variants", type=int, default=20000)
+    parser.add_argument("--scans", type=int, default=3000)
+    parser.add_argument("--batch", type=int, default=200, help="Códigos por POST /scan/batch (máximo 500)")
+    main(parser.parse_args())
@@ -5,8 +5,12 @@ from pathlib import Path
 # Agregar el directorio padre al path para poder importar los módulos
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.database import engine, SessionLocal
-from app.models.base import Base
+from app.config import settings
+from app.database import SessionLocal
+from app.migrations import upgrade_to_head
+from app.services.cache_service import create_pubsub
+from app.services.code_index import connect_code_index_bus, install_code_index_hooks
+from app.services.inventory_manager import InventoryManager
 from app.models.product import Product, ProductVariant, ProductImage
 from app.models.inventory import Location, Inventory, InventoryMovement, Reservation
 from app.models.sale import Sale, SaleItem, Payment, Refund, RefundItem
@@ -19,10 +23,10 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def create_tables():
-    """Crear todas las tablas"""
-    logger.info("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    logger.info("✓ Tables created successfully")
+    """Crear o actualizar las tablas con las migraciones de Alembic"""
+    logger.info("Applying database migrations...")
+    upgrade_to_head()
+    logger.info("✓ Database schema is up to date")
 
 def create_default_locations(db: Session):
     """Crear ubicaciones por defecto"""
@@ -293,6 +297,12 @@ def main():
         # Crear tablas
         create_tables()
         
+        # Avisar a los workers en marcha (con Redis) de las variantes creadas
+        bus = create_pubsub(settings.code_index_channel)
+        if bus is not None:
+            install_code_index_hooks()
+            connect_code_index_bus(bus, subscribe=False)
+        
         # Crear sesión de base de datos
         db = SessionLocal()
         
@@ -301,6 +311,7 @@ def main():
             create_default_locations(db)
             create_sample_products(db)
             create_sample_inventory(db)
+            InventoryManager(db).reconcile_variant_stock()
             
             logger.info("✅ Database initialization completed successfully!")
             
@@ -0,0 +1,34 @@
+# backend/scripts/rebuild_sales_rollups.py
+"""Recalcula sales_rollup_hourly y sales_rollup_daily desde la tabla sales
+
+Uso:
+    python scripts/rebuild_sales_rollups.py                                  # todo el historial
+    python scripts/rebuild_sales_rollups.py --start 2024-01-01 --end 2024-02-01
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Agregar el directorio padre al path para poder importar los módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import run_with_session
+from app.services.sales_manager import SalesManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir los rollups de ventas")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Primer día (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Día siguiente al último (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    result = run_with_session(lambda db: SalesManager(db).rebuild_sales_rollups(args.start, args.end))
+
+    print(f"Rango: {result['start'] or 'inicio'} - {result['end'] or 'fin'}")
+    print(f"Ventas procesadas: {result['sales']}")
+    print(f"Filas por hora: {result['hourly_rows']}, filas por día: {result['daily_rows']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# backend/scripts/reconcile_variant_stock.py
+"""Verifica los totales de variant_stock contra el inventario por ubicación
+
+Uso (por ejemplo desde cron, cada noche):
+    python scripts/reconcile_variant_stock.py            # corrige las diferencias
+    python scripts/reconcile_variant_stock.py --check    # solo reporta; sale con código 1 si hay diferencias
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio padre al path para poder importar los módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import run_with_session
+from app.services.inventory_manager import InventoryManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliar variant_stock con el inventario")
+    parser.add_argument("--check", action="store_true", help="Solo verificar, sin corregir")
+    args = parser.parse_args()
+
+    result = run_with_session(lambda db: InventoryManager(db).reconcile_variant_stock(fix=not args.check))
+
+    print(f"Variantes verificadas: {result['checked']}")
+    print(f"Diferencias: {result['mismatches']}{' (corregidas)' if result['fixed'] else ''}")
+    for mismatch in result['details']:
+        print(f"  variante {mismatch['variant_id']}: esperado {mismatch['expected']}, actual {mismatch['actual']}")
+
+    if args.check and result['mismatches']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/tests/conftest.py
+"""Base de datos SQLite temporal y caché en memoria para las pruebas
+
+Las variables de entorno se fijan antes de importar la aplicación: la configuración se lee una
+sola vez al importar app.config.
+"""
+import os
+import tempfile
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="inventario_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["CACHE_WARMUP_ENABLED"] = "false"
+os.environ["DEBUG"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import upgrade_to_head  # noqa: E402
+from app.models.inventory import Inventory, Location  # noqa: E402
+from app.models.product import Product, ProductVariant  # noqa: E402
+from app.services.cache_service import get_cache_service  # noqa: E402
+from app.services.code_index import get_code_index  # noqa: E402
+from app.services.inventory_manager import InventoryManager  # noqa: E402
+
+upgrade_to_head()
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Cada prueba empieza con las tablas, el caché y el índice de códigos vacíos"""
+    yield
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    get_cache_service().clear()
+    # El índice de códigos es del proceso: vacío y sin cargar, como antes del arranque
+    index = get_code_index()
+    index.load_records([])
+    index.loaded_at = None
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def catalog(db):
+    """Un producto con dos variantes y stock en exhibición (3) y bodega (5)"""
+    display = Location(name="Exhibición", type="display", section="General", is_visible_to_customer=True)
+    storage = Location(name="Bodega", type="storage", section="Almacén", is_visible_to_customer=False)
+    db.add_all([display, storage])
+    db.flush()
+
+    product = Product(
+        name="Chaqueta Térmica", category="Chaquetas", category_code="CH",
+        internal_number="001", base_price=100000, brand="Andes"
+    )
+    db.add(product)
+    db.flush()
+
+    variants = []
+    for color, color_code, barcode in (("Negro", "NEG", "7700100100001"), ("Azul", "AZU", "7700100100002")):
+        code = f"CH-001-M-{color_code}"
+        variant = ProductVariant(
+            product_id=product.id, sku=code, barcode=barcode, short_code=code, size="Medium",
+            color=color, color_code=color_code, price=120000, cost=70000
+        )
+        db.add(variant)
+        db.flush()
+        db.add(Inventory(variant_id=variant.id, location_id=display.id, quantity=3, reserved_quantity=0, min_stock=1))
+        db.add(Inventory(variant_id=variant.id, location_id=storage.id, quantity=5, reserved_quantity=0, min_stock=1))
+        variants.append(variant)
+    db.commit()
+    InventoryManager(db).reconcile_variant_stock()
+
+    return {
+        "product_id": product.id,
+        "variant_ids": [variant.id for variant in variants],
+        "display_id": display.id,
+        "storage_id": storage.id,
+    }
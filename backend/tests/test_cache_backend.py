@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.cache_service import FakeCacheBackend, MemoryCacheBackend
+
+
+def test_lru_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2, policy="lru")
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1" and backend.get("c") == b"3"
+    assert backend.evictions == 1
+
+
+def test_lfu_evicts_least_frequently_used():
+    backend = MemoryCacheBackend(max_entries=2, policy="lfu")
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    for _ in range(3):
+        backend.get("a")
+    backend.get("b")
+    backend.set("c", b"3")
+
+    # "c" entra con frecuencia 1: sale antes que "b" (2) y "a" (4)
+    assert backend.get("c") is None
+    assert backend.get("a") == b"1" and backend.get("b") == b"2"
+
+
+def test_byte_limit_evicts_and_tracks_usage():
+    backend = MemoryCacheBackend(max_bytes=30)
+    backend.set("scan:1", b"x" * 10)
+    backend.set("scan:2", b"x" * 10)
+    assert backend.get("scan:1") is None
+    assert backend.memory_usage() == 16
+    assert backend.namespace_usage()["scan"] == {'entries': 1, 'bytes': 16, 'evictions': 1}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        MemoryCacheBackend(policy="fifo")
+
+
+def test_timing_wheel_expires_keys_without_reads():
+    backend = FakeCacheBackend()
+    backend.set("a", b"1", expire=5)
+    backend.set("b", b"2", expire=5)
+    backend.set("b", b"2", expire=100)  # Reprogramada: su slot anterior no la borra
+    backend.set("c", b"3")
+
+    backend.advance(6)
+    assert backend.sweep_expired() == 1
+    assert backend.size() == 2 and backend.exists("b")
+
+
+def test_timing_wheel_keeps_keys_scheduled_past_a_full_turn():
+    backend = FakeCacheBackend(wheel_slots=10)
+    backend.set("a", b"1", expire=25)
+
+    backend.advance(11)  # La rueda ya pasó por el slot de "a", que vence en la vuelta siguiente
+    assert backend.sweep_expired() == 0
+    backend.advance(15)
+    assert backend.sweep_expired() == 1
+
+
+def test_incr_keeps_expiration():
+    backend = FakeCacheBackend()
+    backend.set("gen:sales", b"1", expire=10)
+    assert backend.incr("gen:sales") == 2
+    assert backend.ttl("gen:sales") == 10
+    backend.advance(11)
+    assert backend.get("gen:sales") is None
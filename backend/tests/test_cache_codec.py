@@ -0,0 +1,57 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.services import cache_codec
+from app.services.cache_codec import JsonCodec, create_codec
+from app.services.cache_service import CacheService, MemoryCacheBackend
+
+VALUE = {
+    "variant_id": 7,
+    "price": Decimal("120000.50"),
+    "scanned_at": datetime(2026, 10, 17, 9, 30),
+    "name": "Chaqueta Térmica",
+    "sizes": ["M", "L"],
+    "stock": {"1": 3, "2": 5},
+}
+# Lo que respondería FastAPI con ese valor
+EXPECTED = {**VALUE, "price": 120000.5, "scanned_at": "2026-10-17T09:30:00"}
+
+
+def _codec(name):
+    if name != "json":
+        pytest.importorskip(name)
+    return create_codec(name)
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+def test_round_trip_and_json_output(name):
+    codec = _codec(name)
+    payload = codec.encode(VALUE)
+    assert codec.decode(payload) == EXPECTED
+    assert json.loads(codec.to_json(payload)) == EXPECTED
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_json_codecs_pass_payload_through(name, monkeypatch):
+    codec = _codec(name)
+    payload = codec.encode(VALUE)
+    monkeypatch.setattr(codec, "decode", lambda payload: pytest.fail("to_json no debe decodificar"))
+    assert codec.to_json(payload) is payload
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+def test_get_json_returns_response_ready_bytes(name):
+    cache = CacheService(MemoryCacheBackend(), _codec(name))
+    cache.set_value("scan:CH-001-M-NEG", VALUE, 60, ["catalog"])
+    assert json.loads(cache.get_json("scan:CH-001-M-NEG")) == EXPECTED
+    assert cache.get_value("scan:CH-001-M-NEG") == EXPECTED
+
+
+def test_missing_codec_falls_back_to_json(monkeypatch):
+    monkeypatch.setattr(cache_codec, "msgpack", None)
+    assert isinstance(create_codec("msgpack"), JsonCodec)
+    with pytest.raises(ValueError):
+        create_codec("pickle")
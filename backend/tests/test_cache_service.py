@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.services.cache_service import CacheService, FakeCacheBackend, MemoryCacheBackend, stable_digest
+
+
+class CountingBackend(MemoryCacheBackend):
+    """Cuenta las lecturas al backend (cada una sería un viaje a Redis)"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+
+def _invalidations(cache: CacheService, namespace: str) -> int:
+    return cache.metrics.snapshot(histograms=False)['namespaces'][namespace]['invalidations']
+
+
+def test_invalidated_entry_is_dropped_and_counted_once():
+    backend = CountingBackend()
+    cache = CacheService(backend)
+    cache.set_value("report:1", {"total": 1}, 60, ["sales"])
+    assert cache.get_value("report:1") == {"total": 1}
+
+    cache.invalidate_tag("sales")
+    assert cache.get_value("report:1") is None
+    assert not backend.exists("report:1")
+
+    backend.reads = 0
+    assert cache.get_value("report:1") is None
+    assert cache.get_value("report:1") is None
+    assert backend.reads == 2  # Solo la clave: ya no se consultan generaciones
+    assert _invalidations(cache, "report") == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = CacheService(MemoryCacheBackend())
+    calls, started = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.wait(1)
+        return {"total": 42}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get_or_compute, "report:1", compute, 60) for _ in range(8)]
+        time.sleep(0.05)
+        started.set()
+        results = [future.result() for future in futures]
+
+    assert results == [{"total": 42}] * 8
+    assert len(calls) == 1
+
+
+def test_stale_value_is_served_while_refreshing():
+    backend = FakeCacheBackend()
+    cache = CacheService(backend)
+    assert cache.get_or_compute("report:1", lambda: {"version": 1}, expire=10, stale_ttl=30) == {"version": 1}
+
+    backend.advance(11)
+    refreshed = threading.Event()
+
+    def refresh():
+        refreshed.set()
+        return {"version": 2}
+
+    # Vencido pero dentro de stale_ttl: responde el valor anterior y recalcula en segundo plano
+    assert cache.get_or_compute("report:1", refresh, expire=10, stale_ttl=30) == {"version": 1}
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get_value("report:1") == {"version": 2}:
+            break
+        time.sleep(0.01)
+    assert cache.get_value("report:1") == {"version": 2}
+
+    # Pasado stale_ttl la entrada ya no existe y se calcula en la petición
+    backend.advance(41)
+    assert cache.get_or_compute("report:1", lambda: {"version": 3}, expire=10, stale_ttl=30) == {"version": 3}
+
+
+def test_stable_digest_ignores_key_order_and_hash_seed():
+    payload = {"query": "chaqueta", "filters": {"size": "M", "color": "negro", "limit": 20}}
+    reordered = {"filters": {"limit": 20, "color": "negro", "size": "M"}, "query": "chaqueta"}
+    assert stable_digest(payload) == stable_digest(reordered)
+    assert stable_digest(payload) != stable_digest({**payload, "query": "gorra"})
+
+    # Otro proceso (otra semilla de hash()) obtiene la misma huella
+    script = (
+        "import json, sys; from app.services.cache_service import stable_digest; "
+        "print(stable_digest(json.loads(sys.argv[1])))"
+    )
+    for seed in ("1", "2"):
+        output = subprocess.run(
+            [sys.executable, "-c", script, json.dumps(payload)], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent.parent, env={**os.environ, "PYTHONHASHSEED": seed}
+        ).stdout.split()[-1]
+        assert output == stable_digest(payload)
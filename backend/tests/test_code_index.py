@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+from app.models.product import Product, ProductVariant
+from app.services import code_index as code_index_module
+from app.services.cache_service import LocalPubSub
+from app.services.code_index import CodeIndex, connect_code_index_bus, get_code_index
+
+
+@pytest.fixture
+def bus(monkeypatch, db, catalog):
+    """Índice cargado y conectado a un canal en memoria; `messages` recibe lo que se publica"""
+    monkeypatch.setattr(code_index_module, "_bus", None)
+    get_code_index().load(db)
+    channel = LocalPubSub()
+    messages = []
+    channel.subscribe(lambda message: messages.append(json.loads(message)))
+    connect_code_index_bus(channel)
+    yield channel, messages
+    channel.close()
+
+
+def test_commit_publishes_changed_variants(db, catalog, bus):
+    _, messages = bus
+    variant = db.query(ProductVariant).get(catalog["variant_ids"][0])
+    variant.price = 99000
+    db.commit()
+
+    assert messages[-1]["variants"] == [variant.id]
+    assert get_code_index().by_code("CH-001-M-NEG").price == 99000
+
+
+def test_remote_changes_refresh_index(catalog, bus):
+    channel, _ = bus
+    first, second = catalog["variant_ids"]
+    # Cambios confirmados por otro proceso: no pasan por las sesiones de este
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE product_variants SET price = 99000 WHERE id = :id"), {"id": first})
+        connection.execute(text("UPDATE product_variants SET is_active = 0 WHERE id = :id"), {"id": second})
+        connection.execute(text("UPDATE variant_stock SET available = 2 WHERE variant_id = :id"), {"id": first})
+
+    index = get_code_index()
+    assert index.by_code("CH-001-M-NEG").price == 120000
+
+    channel.publish(json.dumps({"origin": "otro-worker", "variants": [second], "products": [],
+                                "stock": []}).encode())
+    channel.publish(json.dumps({"origin": "otro-worker", "variants": [], "products": [catalog["product_id"]],
+                                "stock": [first]}).encode())
+
+    assert index.by_code("CH-001-M-NEG").price == 99000
+    assert index.available(first) == 2
+    assert index.by_code("CH-001-M-AZU") is None
+
+
+def test_scan_sees_price_changed_by_another_worker(client, catalog, bus):
+    channel, _ = bus
+    first = catalog["variant_ids"][0]
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE product_variants SET price = 99000 WHERE id = :id"), {"id": first})
+    channel.publish(json.dumps({"origin": "otro-worker", "variants": [first]}).encode())
+
+    scan = client.post("/api/products/scan", json={"code": "CH-001-M-NEG"}).json()
+    assert scan["product"]["price"] == 99000
+
+
+def _quick_search(client, term):
+    return sorted(result["variant_id"] for result in client.get(f"/api/products/quick-search/{term}").json()["results"])
+
+
+def test_reindex_drops_old_prefix_keys(client, db, catalog):
+    index = get_code_index()
+    index.load(db)
+    negro, azul = catalog["variant_ids"]
+    assert _quick_search(client, "chaq") == [negro, azul]
+
+    db.query(Product).get(catalog["product_id"]).name = "Abrigo Impermeable"
+    db.query(ProductVariant).get(negro).sku = "AB-900-M-NEG"
+    db.commit()
+
+    assert _quick_search(client, "chaq") == []
+    assert _quick_search(client, "abrigo imp") == [negro, azul]
+    assert _quick_search(client, "ab-900") == [negro]
+    # Quedan las mismas claves que en una carga completa, sin las anteriores ni duplicadas
+    fresh = CodeIndex()
+    fresh.load(db)
+    assert index._prefixes == fresh._prefixes
+    index.refresh(db, variant_ids=[negro, azul])
+    assert index._prefixes == fresh._prefixes
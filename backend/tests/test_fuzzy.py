@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.code_index import get_code_index
+from app.utils.fuzzy import FuzzyIndex, edit_distance
+
+WORDS = ["chaqueta", "chaleco", "camiseta", "camisa", "gorra", "termica", "pantalon"]
+
+
+def _index(max_distance=2):
+    index = FuzzyIndex(max_distance=max_distance)
+    for item_id, word in enumerate(WORDS):
+        index.add(word, item_id)
+    return index
+
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("chaqueta", "chaqueta", 2) == 0
+    assert edit_distance("chaqueta", "chaketa", 2) == 2
+    assert edit_distance("chaqueta", "hcaqueta", 2) == 1
+    assert edit_distance("camisa", "camiseta", 2) == 2
+    assert edit_distance("gorra", "pantalon", 2) == 3
+
+
+@pytest.mark.parametrize("max_distance", [1, 2])
+@pytest.mark.parametrize("query", ["chaqueta", "chaketa", "chaquta", "hcaqueta", "camisa", "camsia", "gora", "xyz"])
+def test_search_matches_brute_force(query, max_distance):
+    expected = sorted(
+        ((word, distance) for word in WORDS
+         if (distance := edit_distance(query, word, max_distance)) <= max_distance),
+        key=lambda match: (match[1], match[0])
+    )
+    assert _index().search(query, max_distance) == expected
+    if max_distance == 1:
+        assert _index(max_distance=1).search(query, 1) == expected
+
+
+def test_one_and_two_edits():
+    index = _index()
+    assert index.search("chaquta", 1) == [("chaqueta", 1)]
+    assert index.search("chaketa", 1) == []
+    assert index.search("chaketa", 2) == [("chaqueta", 2)]
+    assert index.search("camisa", 2) == [("camisa", 0), ("camiseta", 2)]
+    with pytest.raises(ValueError):
+        _index(max_distance=1).search("chaketa", 2)
+
+
+def test_remove_cleans_terms_and_deletions():
+    index = FuzzyIndex(max_distance=2)
+    index.add("chaqueta", 3)
+    index.add("chaqueta", 1)
+    index.add("chaqueta", 3)
+    assert index.ids("chaqueta") == [1, 3]
+
+    index.remove("chaqueta", 3)
+    assert index.search("chaketa", 2) == [("chaqueta", 2)]
+    index.remove("chaqueta", 1)
+    assert len(index) == 0
+    assert index._deletions == {}
+    assert index.search("chaketa", 2) == []
+
+
+def test_code_index_fuzzy_matches_typos(db, catalog):
+    index = get_code_index()
+    index.load(db)
+    negro, azul = catalog["variant_ids"]
+
+    assert [(record.id, distance) for record, distance in index.fuzzy("chaquta")] == [(negro, 1), (azul, 1)]
+    assert [(record.id, distance) for record, distance in index.fuzzy("chqeta")] == [(negro, 2), (azul, 2)]
+    # Los códigos toleran una sola edición y se comparan sin separadores
+    assert [(record.id, distance) for record, distance in index.fuzzy("CH-01-M-NEG")] == [(negro, 1)]
+    assert index.fuzzy("CH-01-M-NGE") == []
+    # Con varias palabras se suman las ediciones
+    assert [(record.id, distance) for record, distance in index.fuzzy("chaquta termca")] == [(negro, 2), (azul, 2)]
+    assert index.fuzzy("chaquta gorra") == []
@@ -0,0 +1,36 @@
+from app.database import SessionLocal
+from app.services.inventory_manager import InventoryManager
+
+
+def test_stock_change_invalidates_cache_after_commit(db, catalog):
+    variant_id = catalog["variant_ids"][0]
+    assert InventoryManager(db).get_inventory_info(variant_id)["total_stock"] == 8
+
+    assert InventoryManager(db).update_stock(variant_id, catalog["display_id"], -2, "sale")
+
+    # Otra petición lee antes del commit: ve (y vuelve a cachear) el stock anterior
+    reader = SessionLocal()
+    try:
+        assert InventoryManager(reader).get_inventory_info(variant_id)["total_stock"] == 8
+    finally:
+        reader.close()
+
+    db.commit()
+
+    reader = SessionLocal()
+    try:
+        assert InventoryManager(reader).get_inventory_info(variant_id)["total_stock"] == 6
+    finally:
+        reader.close()
+
+
+def test_rolled_back_stock_change_keeps_cache(db, catalog):
+    variant_id = catalog["variant_ids"][0]
+    manager = InventoryManager(db)
+    manager.get_inventory_info(variant_id)
+
+    assert manager.update_stock(variant_id, catalog["display_id"], -2, "sale")
+    db.rollback()
+
+    assert "inventory_cache_pending" not in db.info
+    assert manager.get_inventory_info(variant_id)["total_stock"] == 8
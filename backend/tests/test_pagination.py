@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def _create_sale(client, variant_id):
+    response = client.post("/api/sales/", json={
+        "payment_method": "cash",
+        "items": [{"variant_id": variant_id, "quantity": 1, "unit_price": 120000}],
+        "payments": [{"payment_method": "cash", "amount": 120000}],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _walk(client, limit):
+    """Ids de todas las páginas; un cursor que no avanza falla en vez de ciclar"""
+    ids, cursor = [], None
+    for _ in range(20):
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/sales/search", params=params).json()
+        ids.extend(sale["id"] for sale in page["results"])
+        cursor = page["next_cursor"]
+        assert page["has_more"] == (cursor is not None)
+        if cursor is None:
+            return ids
+    raise AssertionError(f"la paginación no termina: {ids}")
+
+
+def test_cursor_walks_ties_on_sqlite_text_datetimes(client, catalog):
+    sale_ids = [_create_sale(client, variant_id) for variant_id in catalog["variant_ids"] * 2]
+
+    # Fechas como las deja CURRENT_TIMESTAMP (sin microsegundos), con empates, y una con microsegundos
+    created = ("2026-03-01 10:00:00", "2026-03-01 10:00:00", "2026-03-01 09:00:00", "2026-03-01 10:00:00.500000")
+    with engine.begin() as connection:
+        for sale_id, created_at in zip(sale_ids, created):
+            connection.execute(text("UPDATE sales SET created_at = :created_at WHERE id = :id"),
+                               {"created_at": created_at, "id": sale_id})
+
+    expected = [sale_id for _, sale_id in sorted(zip(created, sale_ids), reverse=True)]
+    for limit in (1, 2, 3):
+        assert _walk(client, limit) == expected, limit
+
+
+def test_invalid_cursor_is_rejected(client, catalog):
+    _create_sale(client, catalog["variant_ids"][0])
+
+    assert client.get("/api/sales/search", params={"cursor": "no-es-un-cursor"}).status_code == 400
+    assert client.get("/api/sales/search", params={"cursor": encode_cursor(1)}).status_code == 400
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor("ayer", 1), datetime, int)
+    assert decode_cursor(encode_cursor(datetime(2026, 3, 1, 10), 7), datetime, int) == (datetime(2026, 3, 1, 10), 7)
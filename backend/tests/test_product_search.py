@@ -0,0 +1,51 @@
+from sqlalchemy import select
+
+from app.models.product import Product, ProductVariant
+from app.services.product_search import match_expression, rebuild_product_search, search_ranking
+
+
+def _matches(db, query):
+    ranking = search_ranking(db, query)
+    return sorted(db.execute(select(ranking.c.variant_id)).scalars())
+
+
+def test_match_expression_quotes_every_term():
+    assert match_expression("chaq term", "sqlite") == '"chaq" * "term" *'
+    assert match_expression("CH-001-M", "sqlite") == '"CH 001 M" *'
+    # Comillas y operadores de FTS5 del usuario no llegan a la consulta
+    assert match_expression('chaq" OR "x* NEAR(', "sqlite") == '"chaq" * "OR" * "x" * "NEAR" *'
+    assert match_expression("CH-001 azul", "postgresql") == "CH:* & 001:* & azul:*"
+    assert match_expression(' -- "" * ', "sqlite") is None
+
+
+def test_prefix_and_accent_matching(db, catalog):
+    negro, azul = catalog["variant_ids"]
+    assert _matches(db, "chaq term") == [negro, azul]
+    # unicode61 quita tildes al indexar y al consultar
+    assert _matches(db, "TERMICA") == [negro, azul]
+    assert _matches(db, "térmíca andes") == [negro, azul]
+    assert _matches(db, "CH-001-M-NE") == [negro]
+    assert _matches(db, "7700100100002") == [azul]
+    assert _matches(db, 'chaq" OR "gorra') == []
+    assert search_ranking(db, "--") is None
+
+
+def test_triggers_follow_product_and_variant_updates(db, catalog):
+    negro, azul = catalog["variant_ids"]
+    db.get(Product, catalog["product_id"]).name = "Abrigo Impermeable"
+    db.get(ProductVariant, azul).color = "Rojo"
+    db.commit()
+
+    assert _matches(db, "termica") == []
+    assert _matches(db, "abrig imper") == [negro, azul]
+    assert _matches(db, "rojo") == [azul]
+    assert _matches(db, "azul") == []
+
+    # Regenerar el índice deja las mismas filas que mantienen los triggers
+    assert rebuild_product_search(db)["variants"] == 2
+    assert _matches(db, "abrig rojo") == [azul]
+
+
+def test_search_endpoint_matches_without_accents(client, catalog):
+    search = client.get("/api/products/search", params={"query": "TERMICA chaq", "in_stock": False}).json()
+    assert sorted(result["variant_id"] for result in search["results"]) == catalog["variant_ids"]
@@ -0,0 +1,107 @@
+from app.schemas.product import ProductSearchFilters
+from app.services.cache_service import get_cache_service
+from app.services.inventory_manager import InventoryManager
+
+
+def test_new_variant_keeps_other_cached_scans(client, catalog):
+    cache = get_cache_service()
+    assert client.post("/api/products/scan", json={"code": "CH-001-M-NEG"}).json()["success"]
+    assert not client.post("/api/products/scan", json={"code": "CH-001-M-ROJ"}).json()["success"]
+    search = client.get("/api/products/search", params={"query": "chaqueta", "in_stock": False}).json()
+    assert search["total_results"] == 2
+    assert cache.get_cached_scan_json("CH-001-M-NEG") is not None
+
+    response = client.post(f"/api/products/{catalog['product_id']}/variants", json={
+        "product_id": catalog["product_id"], "sku": "CH-001-M-ROJ", "short_code": "CH-001-M-ROJ",
+        "barcode": "7700100100003", "size": "Medium", "color": "Rojo", "color_code": "ROJ",
+        "price": 120000, "cost": 70000,
+    })
+    assert response.status_code == 200, response.text
+
+    # Los escaneos de los demás códigos siguen en caché; el código nuevo ya no figura como inexistente
+    assert cache.get_cached_scan_json("CH-001-M-NEG") is not None
+    scan = client.post("/api/products/scan", json={"code": "CH-001-M-ROJ"}).json()
+    assert scan["success"] and scan["product"]["variant_id"] == response.json()["id"]
+
+    search = client.get("/api/products/search", params={"query": "chaqueta", "in_stock": False}).json()
+    assert search["total_results"] == 3
+
+
+def test_new_variant_clears_misses_for_other_spellings(client, catalog):
+    # Cualquier código corto con las mismas partes resuelve a la variante, aunque no sea su SKU
+    assert not client.post("/api/products/scan", json={"code": "CH-001-M-ROJ"}).json()["success"]
+    flexible = client.post("/api/products/scan", json={"code": "chaqueta"}).json()
+    assert len(flexible["suggestions"]) == 2
+
+    response = client.post(f"/api/products/{catalog['product_id']}/variants", json={
+        "product_id": catalog["product_id"], "sku": "CHQ-ROJO-M", "size": "Medium", "color": "Rojo",
+        "color_code": "ROJ", "price": 120000, "cost": 70000,
+    })
+    assert response.status_code == 200, response.text
+
+    scan = client.post("/api/products/scan", json={"code": "CH-001-M-ROJ"}).json()
+    assert scan["success"] and scan["product"]["variant_id"] == response.json()["id"]
+    flexible = client.post("/api/products/scan", json={"code": "chaqueta"}).json()
+    assert len(flexible["suggestions"]) == 3
+
+
+def test_in_stock_search_keeps_fully_reserved_variants(client, db, catalog):
+    manager = InventoryManager(db)
+    variant_id = catalog["variant_ids"][0]
+    for location_id, quantity in ((catalog["display_id"], 3), (catalog["storage_id"], 5)):
+        assert manager.reserve_stock(variant_id, location_id, quantity, {"name": "Cliente"})
+    db.commit()
+    assert manager.get_inventory_info(variant_id)["total_available"] == 0
+
+    # in_stock significa con existencias, aunque estén reservadas
+    search = client.get("/api/products/search", params={"query": "chaqueta"}).json()
+    assert variant_id in [result["variant_id"] for result in search["results"]]
+
+
+def test_equivalent_search_filters_normalize_alike():
+    first = ProductSearchFilters(query="  Chaqueta   TÉRMICA chaqueta", category="Chaquetas ", color="")
+    second = ProductSearchFilters(query="térmica chaqueta", category="chaquetas")
+    assert first.normalized() == second.normalized()
+    assert first.normalized().query == "chaqueta térmica"
+    assert first.normalized().color is None
+    # Normalizar dos veces no cambia nada
+    assert first.normalized().normalized() == first.normalized()
+    assert ProductSearchFilters(query="gorra").normalized() != second.normalized()
+
+
+def test_search_variants_share_cache_entry(client, catalog):
+    cache = get_cache_service()
+    client.get("/api/products/search", params={"query": "Chaqueta  TÉRMICA"})
+    sets = cache.metrics.snapshot(histograms=False)["namespaces"]["search"]["sets"]
+
+    response = client.get("/api/products/search", params={"query": "térmica chaqueta"})
+    assert response.status_code == 200
+    assert cache.metrics.snapshot(histograms=False)["namespaces"]["search"]["sets"] == sets
+
+
+def test_batch_scan_keeps_order_and_duplicates(client, catalog):
+    negro, azul = catalog["variant_ids"]
+    codes = ["7700100100002", "NO-EXISTE-999", "CH-001-M-NEG", "7700100100002", "ch-001-m-azu"]
+    response = client.post("/api/products/scan/batch", json={"codes": codes})
+    assert response.status_code == 200, response.text
+    batch = response.json()
+
+    assert [result["code"] for result in batch["results"]] == codes
+    assert [result["product"]["variant_id"] if result["success"] else None for result in batch["results"]] == [
+        azul, None, negro, azul, azul
+    ]
+    assert (batch["total_codes"], batch["found"], batch["not_found"]) == (5, 4, 1)
+
+    # Cada resultado es el mismo que da /scan con ese código
+    for code, result in zip(codes, batch["results"]):
+        single = client.post("/api/products/scan", json={"code": code}).json()
+        assert {key: value for key, value in result.items() if key != "code"} == single, code
+
+
+def test_batch_scan_limits_codes(client, catalog):
+    codes = ["CH-001-M-NEG"] * 500
+    batch = client.post("/api/products/scan/batch", json={"codes": codes}).json()
+    assert batch["found"] == 500
+
+    assert client.post("/api/products/scan/batch", json={"codes": codes + ["CH-001-M-AZU"]}).status_code == 422
+    assert client.post("/api/products/scan/batch", json={"codes": []}).status_code == 422
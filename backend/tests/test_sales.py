@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from app.api.reports import _summary_period
+
+
+def _create_sale(client, variant_id):
+    response = client.post("/api/sales/", json={
+        "payment_method": "cash",
+        "items": [{"variant_id": variant_id, "quantity": 1, "unit_price": 120000}],
+        "payments": [{"payment_method": "cash", "amount": 120000}],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_status_change_refreshes_daily_report(client, catalog):
+    sale = _create_sale(client, catalog["variant_ids"][0])
+    assert sale["status"] == "completed"
+
+    # El reporte queda en caché con la venta completada
+    assert client.get("/api/sales/reports/daily").json()["total_sales"] == 1
+
+    response = client.put(f"/api/sales/{sale['id']}", json={"status": "pending"})
+    assert response.status_code == 200, response.text
+
+    report = client.get("/api/sales/reports/daily").json()
+    assert report["total_sales"] == 0
+    assert report["total_revenue"] == 0
+
+
+def test_new_sale_refreshes_realtime_metrics(client, catalog):
+    assert client.get("/api/sales/metrics/realtime").json()["today_sales_count"] == 0
+
+    _create_sale(client, catalog["variant_ids"][0])
+
+    assert client.get("/api/sales/metrics/realtime").json()["today_sales_count"] == 1
+
+
+def test_summary_counts_distinct_customers_per_period(client, catalog):
+    phones = ("3001112233", "3001112233", "3104445566", None)
+    for variant_id, phone in zip(catalog["variant_ids"] * 2, phones):
+        response = client.post("/api/sales/", json={
+            "payment_method": "cash", "customer_phone": phone,
+            "items": [{"variant_id": variant_id, "quantity": 1, "unit_price": 120000}],
+            "payments": [{"payment_method": "cash", "amount": 120000}],
+        })
+        assert response.status_code == 200, response.text
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for group_by in ("hour", "day", "week", "month"):
+        summary = client.get("/api/reports/sales/summary", params={
+            "start_date": today.isoformat(), "end_date": (today + timedelta(days=1)).isoformat(),
+            "group_by": group_by,
+        }).json()
+        assert [period["unique_customers"] for period in summary["data"]] == [2], group_by
+        assert summary["data"][0]["period"] == _summary_period(datetime.now(), group_by)
+        assert summary["totals"]["total_sales"] == 4
@@ -16,6 +16,11 @@ export const inventoryService = {
         offset: pagination.offset || 0
       };
 
+      // Página siguiente: next_cursor de la respuesta anterior (más rápido que offset)
+      if (pagination.cursor) {
+        params.cursor = pagination.cursor;
+      }
+
       const response = await apiService.get('/inventory/search', { params });
       return response.data;
     } catch (error) {
@@ -55,6 +55,11 @@ export const salesService = {
         offset: pagination.offset || 0
       };
 
+      // Página siguiente: next_cursor de la respuesta anterior (más rápido que offset)
+      if (pagination.cursor) {
+        params.cursor = pagination.cursor;
+      }
+
       // Formatear fechas si existen
       if (filters.startDate) {
         params.start_date = filters.startDate.toISOString();